@@ -0,0 +1,27 @@
+# atomic_io.py - 本地存储文件的原子写入（FRED / HIBOR / 报告缓存 / 新闻索引 / 历史锚点共用）
+
+import os
+import threading
+from typing import Union
+
+
+def atomic_write(path: str, data: Union[bytes, str]) -> None:
+    """
+    先写同目录临时文件再 os.replace 到 path，读方只会看到旧文件或完整的新文件
+
+    临时文件名带进程号和线程号，多进程、多线程同时写同一路径互不覆盖（后替换者生效）；
+    str 按 UTF-8 编码写入。写入失败时删除临时文件并重新抛出异常。
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,101 @@
+# bench_import.py - 模块导入耗时基准（对比延迟导入前后的冷启动开销）
+#
+# 用法：
+#   python benchmarks/bench_import.py                      # 测量当前工作区
+#   python benchmarks/bench_import.py --git-ref baseline   # 同时测量某个 git 版本作为对照
+#   python benchmarks/bench_import.py --json out.json      # 结果另存为 JSON
+#
+# 每次测量都在全新的 Python 子进程中执行 import，取多次运行的中位数，
+# 同时记录导入后 openai / pandas / akshare / fredapi 是否已被加载。
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from typing import Dict, List, Optional
+
+MODULES = ["config", "data_retriever", "prompt_templates", "report_generator"]
+HEAVY_MODULES = ["openai", "pandas", "numpy", "akshare", "fredapi"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(source_dir: str, module: str, runs: int) -> Dict[str, object]:
+    """在 source_dir 下用新进程导入 module，返回中位耗时（毫秒）及已加载的重量级模块"""
+    env = dict(os.environ)
+    # 旧版本在导入 config 时就要求 API Key，这里给一个占位值，保证两边都能完成导入
+    env.setdefault("DEEPSEEK_API_KEY", "bench-placeholder")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    samples: List[float] = []
+    loaded: List[str] = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=source_dir, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed"}
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        samples.append(result["seconds"] * 1000)
+        loaded = result["loaded"]
+    return {"median_ms": round(statistics.median(samples), 1), "loaded": loaded}
+
+
+def export_git_ref(ref: str, repo_dir: str) -> str:
+    """把 git 版本导出到临时目录，返回目录路径"""
+    target = tempfile.mkdtemp(prefix="fxfuel-bench-")
+    archive = os.path.join(target, "src.tar")
+    subprocess.run(["git", "archive", "--format=tar", "-o", archive, ref], cwd=repo_dir, check=True)
+    with tarfile.open(archive) as tar:
+        tar.extractall(target)
+    os.remove(archive)
+    return target
+
+
+def run(source_dirs: Dict[str, str], runs: int) -> Dict[str, Dict[str, object]]:
+    return {
+        label: {module: measure(path, module, runs) for module in MODULES}
+        for label, path in source_dirs.items()
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="FXFuel 模块导入耗时基准")
+    parser.add_argument("--runs", type=int, default=5, help="每个模块的测量次数（取中位数）")
+    parser.add_argument("--git-ref", help="作为对照的 git 版本（如 baseline 提交）")
+    parser.add_argument("--json", help="结果输出的 JSON 文件路径")
+    args = parser.parse_args(argv)
+
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sources = {"current": repo_dir}
+    if args.git_ref:
+        sources[args.git_ref] = export_git_ref(args.git_ref, repo_dir)
+
+    results = run(sources, args.runs)
+
+    print(f"{'module':<20}" + "".join(f"{label:>28}" for label in sources))
+    for module in MODULES:
+        row = f"{module:<20}"
+        for label in sources:
+            r = results[label][module]
+            cell = r.get("error", f"{r['median_ms']} ms [{','.join(r['loaded']) or '-'}]")
+            row += f"{cell:>28}"
+        print(row)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"runs": args.runs, "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
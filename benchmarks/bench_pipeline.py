@@ -0,0 +1,245 @@
+# bench_pipeline.py - 采集 + 报告全链路基准（回放录制响应，注入可配置延迟）
+#
+# 用法：
+#   python benchmarks/bench_pipeline.py                                  # 默认延迟，每项 5 次
+#   python benchmarks/bench_pipeline.py --runs 10 --json out.json        # 结果另存为 JSON
+#   python benchmarks/bench_pipeline.py --latency perplexity=2.0,akshare=0.5
+#   python benchmarks/bench_pipeline.py --compare baseline.json          # 与上一版本的结果对比
+#
+# 所有上游都由本地替身提供：Yahoo / 金管局 / FRED / Perplexity / DeepSeek 走 standin_server，
+# akshare 由 replay_akshare 在进程内替换。数据目录使用临时目录，不影响本地真实数据。
+# 录制文件位于 benchmarks/fixtures（初始版本为按线上响应格式构造的样本，数值与报告正文相互一致），
+# 可用 record_fixtures.py 从线上重新录制。
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from standin_server import StandinServer, parse_latency  # noqa: E402
+
+# 对比时中位数变慢超过该比例、且绝对差超过 REGRESSION_MIN_MS 视为回归（过滤亚毫秒项的抖动）
+REGRESSION_THRESHOLD = 0.10
+REGRESSION_MIN_MS = 5.0
+
+
+def _prepare_environment(server: StandinServer, data_dir: str) -> None:
+    """在导入项目模块之前设置环境变量：上游地址指向替身服务、占位密钥、临时数据目录"""
+    os.environ.update(server.endpoint_env())
+    os.environ.update({
+        "DEEPSEEK_API_KEY": "bench-placeholder",
+        "PERPLEXITY_API_KEY": "bench-placeholder",
+        "FRED_API_KEY": "bench-placeholder",
+        "FXFUEL_DATA_DIR": data_dir,
+        "NO_PROXY": "127.0.0.1,localhost",
+    })
+    # 代理与磁盘缓存会引入本机环境差异，基准中一律关闭
+    for name in ("SOCKS5_PROXY", "HTTP_PROXY", "HTTPS_PROXY", "http_proxy", "https_proxy",
+                 "ALL_PROXY", "all_proxy", "FXFUEL_CACHE_DB"):
+        os.environ.pop(name, None)
+
+
+def _git_revision() -> Dict[str, Any]:
+    def _git(*args: str) -> str:
+        proc = subprocess.run(["git", *args], cwd=REPO_DIR, capture_output=True, text=True)
+        return proc.stdout.strip() if proc.returncode == 0 else ""
+    return {"commit": _git("rev-parse", "HEAD") or None, "dirty": bool(_git("status", "--porcelain"))}
+
+
+def _summarize(samples: List[float]) -> Dict[str, Any]:
+    ordered = sorted(samples)
+    p95_index = min(len(ordered) - 1, max(0, round(0.95 * len(ordered)) - 1))
+    return {
+        "median_ms": round(statistics.median(ordered), 2),
+        "p95_ms": round(ordered[p95_index], 2),
+        "min_ms": round(ordered[0], 2),
+        "max_ms": round(ordered[-1], 2),
+        "samples_ms": [round(s, 2) for s in samples],
+    }
+
+
+class PipelineBench:
+    """逐项计时；每项运行前可执行 setup（不计入耗时），记录最后一次运行的上游请求次数"""
+
+    def __init__(self, server: StandinServer, akshare_module, runs: int):
+        self.server = server
+        self.akshare = akshare_module
+        self.runs = runs
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def measure(self, name: str, func: Callable[[], Any],
+                setup: Optional[Callable[[], None]] = None) -> Any:
+        samples: List[float] = []
+        result = None
+        upstream: Dict[str, int] = {}
+        for _ in range(self.runs):
+            if setup:
+                setup()
+            self.server.reset_counts()
+            self.akshare.calls.clear()
+            start = time.perf_counter()
+            result = func()
+            samples.append((time.perf_counter() - start) * 1000)
+            upstream = dict(self.server.reset_counts())
+            akshare_calls = sum(self.akshare.calls.values())
+            if akshare_calls:
+                upstream["akshare"] = akshare_calls
+        self.results[name] = dict(_summarize(samples), upstream_requests=upstream)
+        print(f"  {name:<28} median {self.results[name]['median_ms']:>9.1f} ms"
+              f"   p95 {self.results[name]['p95_ms']:>9.1f} ms   upstream {upstream or '-'}")
+        return result
+
+
+def run(runs: int, latency: Dict[str, float]) -> Dict[str, Any]:
+    server = StandinServer(latency=latency).start()
+    data_dir = tempfile.mkdtemp(prefix="fxfuel-bench-data-")
+    _prepare_environment(server, data_dir)
+
+    import replay_akshare
+    akshare_module = replay_akshare.install(latency["akshare"])
+
+    sys.path.insert(0, REPO_DIR)
+    import data_retriever
+    from config import DEEPSEEK_MODEL, REPORT_CONFIG, get_deepseek_client
+    from prompt_templates import get_report_prompt
+    from report_generator import ReportGenerator
+    import metrics
+
+    bench = PipelineBench(server, akshare_module, runs)
+    try:
+        # 首次采集：本地没有 FRED 序列 / 锚点状态，需下载全量历史
+        first = PipelineBench(server, akshare_module, 1)
+        ctx = first.measure("collect_first_run", data_retriever.retrieve_all_data,
+                            setup=data_retriever.clear_cache)
+        bench.results.update(first.results)
+        if ctx.errors:
+            print(f"  ⚠️ 采集错误: {ctx.errors}")
+
+        # 冷缓存：内存缓存清空，本地存储已就绪（FRED 只做增量请求）
+        bench.measure("collect_cold", data_retriever.retrieve_all_data,
+                      setup=data_retriever.clear_cache)
+        bench.measure("collect_cold_sequential",
+                      lambda: data_retriever.retrieve_all_data(concurrent=False),
+                      setup=data_retriever.clear_cache)
+        # 热缓存：全部命中内存缓存
+        ctx = bench.measure("collect_warm", data_retriever.retrieve_all_data)
+
+        data_json = ctx.to_json()
+        prompts = bench.measure("get_report_prompt", lambda: get_report_prompt(data_json))
+
+        # 预先创建 DeepSeek 客户端，避免把 openai 的首次导入计入第一次报告生成
+        get_deepseek_client()
+        generator = ReportGenerator()
+        # regenerate=True：每轮都实际调用模型；命中报告缓存的路径单独计时
+        report = bench.measure("generate_report", lambda: generator.generate_report(ctx, regenerate=True))
+        bench.measure("generate_report_cached", lambda: generator.generate_report(ctx))
+        bench.measure("verify_numbers_hard_code", generator.validate_report)
+
+        def _stream_report() -> Dict[str, float]:
+            # 与 streamlit_app 的流式输出路径一致，额外记录首字延迟
+            start = time.perf_counter()
+            first_token = None
+            stream = get_deepseek_client().chat.completions.create(
+                model=DEEPSEEK_MODEL,
+                messages=[{"role": "system", "content": prompts["system"]},
+                          {"role": "user", "content": prompts["user"]}],
+                max_tokens=REPORT_CONFIG["max_tokens"],
+                temperature=REPORT_CONFIG["temperature"],
+                stream=True,
+            )
+            for chunk in stream:
+                if first_token is None and chunk.choices and chunk.choices[0].delta.content:
+                    first_token = time.perf_counter() - start
+            return {"ttft_ms": (first_token or 0) * 1000}
+
+        ttft: List[float] = []
+        bench.measure("generate_report_stream", lambda: ttft.append(_stream_report()["ttft_ms"]))
+        bench.results["generate_report_stream"]["ttft_median_ms"] = round(statistics.median(ttft), 2)
+
+        # 追问：数据与报告为稳定前缀，第二个问题起应命中（模拟的）DeepSeek 前缀缓存
+        bench.measure("answer_followup", lambda: generator.answer_followup("本周人民币中间价是多少？数据来源是什么？"))
+        ratio = metrics.prefix_hit_ratio({kind: metrics.LLM_TOKENS.value(call="followup", kind=kind)
+                                          for kind in ("prompt_cache_hit", "prompt_cache_miss")})
+        bench.results["answer_followup"]["prefix_hit_ratio"] = round(ratio, 3) if ratio is not None else None
+        print(f"  {'':28} 追问前缀缓存命中率 {bench.results['answer_followup']['prefix_hit_ratio']}")
+
+        def _end_to_end() -> Dict[str, Any]:
+            end_to_end = ReportGenerator()
+            end_to_end.generate_report()
+            return end_to_end.validate_report()
+
+        validation = bench.measure("end_to_end_cold", _end_to_end, setup=data_retriever.clear_cache)
+        failed = [entry for entry in validation.get("audit_log", []) if entry["status"] == "FAIL"]
+        if failed:
+            print(f"  ⚠️ 数字校验未通过: {json.dumps(failed, ensure_ascii=False)[:200]}")
+    finally:
+        server.stop()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": runs,
+            "latency_s": latency,
+            "report_chars": len(report or ""),
+        },
+        "results": bench.results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline_path: str) -> bool:
+    """打印与基线结果的中位数对比，返回是否存在超过阈值的回归"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressed = False
+    base_commit = (baseline.get("meta", {}).get("git", {}).get("commit") or "?")[:8]
+    print(f"\n对比基线 {baseline_path} ({base_commit}):")
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"  {name:<28} (基线中无此项)")
+            continue
+        ratio = result["median_ms"] / base["median_ms"] - 1 if base["median_ms"] else 0.0
+        flag = ""
+        if ratio > REGRESSION_THRESHOLD and result["median_ms"] - base["median_ms"] > REGRESSION_MIN_MS:
+            flag, regressed = "  ⚠️ 回归", True
+        print(f"  {name:<28} {base['median_ms']:>9.1f} -> {result['median_ms']:>9.1f} ms ({ratio:+.1%}){flag}")
+    return regressed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="FXFuel 采集与报告全链路基准")
+    parser.add_argument("--runs", type=int, default=5, help="每项的测量次数")
+    parser.add_argument("--latency", help="各上游注入延迟（秒），如 perplexity=1.0,deepseek=0.5")
+    parser.add_argument("--json", help="结果输出的 JSON 文件路径")
+    parser.add_argument("--compare", help="作为对照的历史 JSON 结果；存在回归时以非零状态退出")
+    args = parser.parse_args(argv)
+
+    latency = parse_latency(args.latency)
+    print(f"延迟注入: {latency}")
+    results = run(args.runs, latency)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.json}")
+
+    if args.compare and compare(results, args.compare):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
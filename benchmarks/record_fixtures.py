@@ -0,0 +1,148 @@
+# record_fixtures.py - 从线上上游重新录制基准回放文件
+#
+# 用法：
+#   python benchmarks/record_fixtures.py            # 录制免费上游：akshare / FRED / 金管局 / Yahoo
+#   python benchmarks/record_fixtures.py --paid     # 另外录制 Perplexity 与 DeepSeek（会产生费用）
+#
+# 录制结果覆盖 benchmarks/fixtures 下的同名文件。FRED 需要 FRED_API_KEY，
+# --paid 需要 PERPLEXITY_API_KEY 与 DEEPSEEK_API_KEY（均从 .env 读取）。
+# DeepSeek 只保留回复正文，不保存任何请求头或密钥。
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Any, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+sys.path.insert(0, REPO_DIR)
+
+# FRED 只录制最近两年（FEDFUNDS 为月度，多录几年），与 fred_client 的增量窗口足够重叠
+FRED_HISTORY_START = {"DGS10": 730, "DGS2": 730, "VIXCLS": 730, "FEDFUNDS": 365 * 6}
+
+# 金管局 HIBOR 录制最近两个月（足够计算 1 周 / 1 个月走势），替身服务按分页参数切片返回
+HKMA_HISTORY_DAYS = 60
+
+
+def _write(name: str, obj: Any) -> None:
+    path = os.path.join(FIXTURE_DIR, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=1)
+    print(f"  ✅ {name} ({os.path.getsize(path) // 1024} KB)")
+
+
+def _frame_fixture(df) -> dict:
+    df = df.astype(object).where(df.notna(), None)
+    return {"columns": [str(c) for c in df.columns],
+            "records": [[v.isoformat() if hasattr(v, "isoformat") else v for v in row]
+                        for row in df.itertuples(index=False)]}
+
+
+def record_akshare() -> None:
+    import akshare as ak
+
+    _write("akshare_forex_spot_em.json", _frame_fixture(ak.forex_spot_em()))
+    _write("akshare_currency_boc_safe.json", _frame_fixture(ak.currency_boc_safe()))
+
+
+def record_fred() -> None:
+    import requests
+    from config import ENDPOINTS
+
+    api_key = os.getenv("FRED_API_KEY")
+    if not api_key:
+        raise RuntimeError("FRED_API_KEY 未配置")
+    for series_id, days in FRED_HISTORY_START.items():
+        resp = requests.get(f"{ENDPOINTS['fred']}/series/observations", params={
+            "series_id": series_id, "api_key": api_key, "file_type": "json",
+            "observation_start": (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d"),
+        }, timeout=30)
+        resp.raise_for_status()
+        observations = [[o["date"], o["value"]] for o in resp.json()["observations"]]
+        _write(f"fred_{series_id}.json", {"series_id": series_id, "observations": observations})
+
+
+def record_hkma() -> None:
+    import data_retriever
+    from hibor_store import fetch_records
+
+    records = fetch_records(data_retriever._fetch_hibor_page,
+                            (datetime.now() - timedelta(days=HKMA_HISTORY_DAYS)).date())
+    _write("hkma_hk-interbank-ir-daily.json", {
+        "header": {"success": True, "err_code": "0000", "err_msg": "No error found"},
+        "result": {"datasize": len(records), "records": records},
+    })
+
+
+def record_yahoo() -> None:
+    import data_retriever
+
+    headers = {"User-Agent": "Mozilla/5.0"}
+    for symbol, range_ in (("DX-Y.NYB", "5d"), ("HKDUSD=X", "1d")):
+        data = data_retriever._fetch_yahoo_chart(symbol, range_, headers)
+        if data is None:
+            raise RuntimeError(f"Yahoo {symbol} 返回非 200")
+        _write(f"yahoo_{symbol}.json", data)
+
+
+def record_perplexity() -> None:
+    import requests
+    import data_retriever
+    from config import ENDPOINTS
+
+    api_key = os.getenv("PERPLEXITY_API_KEY")
+    if not api_key:
+        raise RuntimeError("PERPLEXITY_API_KEY 未配置")
+    today = datetime.now()
+    week_ago = today - timedelta(days=7)
+    payloads = {
+        "POLICY": data_retriever._get_prompt_policy(week_ago.strftime("%B %d, %Y"), today.strftime("%B %d, %Y")),
+        "MACRO": data_retriever._get_prompt_geopolitical(week_ago.strftime("%B %d, %Y"), today.strftime("%B %d, %Y")),
+        "CNY": data_retriever._get_prompt_cny_hkd(week_ago.strftime("%Y年%m月%d日"), today.strftime("%Y年%m月%d日")),
+    }
+    for category, payload in payloads.items():
+        resp = requests.post(f"{ENDPOINTS['perplexity']}/chat/completions",
+                             headers={"Authorization": f"Bearer {api_key}"}, json=payload, timeout=(30, 90))
+        resp.raise_for_status()
+        _write(f"perplexity_{category}.json", resp.json())
+
+
+def record_deepseek() -> None:
+    from config import DEEPSEEK_MODEL
+    from report_generator import ReportGenerator
+
+    generator = ReportGenerator()
+    generator.generate_report(regenerate=True)  # 录制真实响应，不使用本地报告缓存
+    _write("deepseek_report.json", {"model": DEEPSEEK_MODEL, "content": generator.generated_report,
+                                    "usage": {}})
+    answer = generator.answer_followup("本周人民币中间价是多少？数据来源是什么？")
+    _write("deepseek_followup.json", {"model": DEEPSEEK_MODEL, "content": answer, "usage": {}})
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="重新录制 FXFuel 基准回放文件")
+    parser.add_argument("--paid", action="store_true", help="同时录制 Perplexity 与 DeepSeek（会产生 API 费用）")
+    args = parser.parse_args(argv)
+
+    steps = [("akshare", record_akshare), ("FRED", record_fred),
+             ("金管局 HIBOR", record_hkma), ("Yahoo", record_yahoo)]
+    if args.paid:
+        steps += [("Perplexity", record_perplexity), ("DeepSeek", record_deepseek)]
+
+    failed = []
+    for name, func in steps:
+        print(f"📼 {name}")
+        try:
+            func()
+        except Exception as e:
+            failed.append(name)
+            print(f"  ❌ {str(e)[:100]}")
+    if failed:
+        sys.exit(f"录制失败: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# replay_akshare.py - 基准测试用的 akshare 回放模块
+#
+# akshare 直接抓取东方财富 / 外管局网页，无法通过改写 base URL 指向替身服务，
+# 因此在基准进程内用一个同名模块替换它：接口签名与 akshare 一致，
+# 返回 benchmarks/fixtures 中录制的 DataFrame，并按配置休眠模拟网络延迟。
+
+import sys
+import time
+import types
+
+import pandas as pd
+
+from standin_server import DEFAULT_LATENCY, load_fixture
+
+# 采集代码用到的 akshare 接口 -> 录制文件
+REPLAYED_FUNCTIONS = {
+    "forex_spot_em": "akshare_forex_spot_em.json",
+    "currency_boc_safe": "akshare_currency_boc_safe.json",
+}
+
+
+def _load_frame(name: str) -> pd.DataFrame:
+    fixture = load_fixture(name)
+    return pd.DataFrame(fixture["records"], columns=fixture["columns"])
+
+
+def install(latency: float = DEFAULT_LATENCY["akshare"]) -> types.ModuleType:
+    """
+    以回放模块替换 sys.modules['akshare']
+
+    每个接口返回录制 DataFrame 的副本（调用方可能原地修改），调用次数记录在 module.calls。
+    """
+    frames = {func: _load_frame(fixture) for func, fixture in REPLAYED_FUNCTIONS.items()}
+    module = types.ModuleType("akshare")
+    module.__doc__ = "FXFuel benchmark replay of akshare"
+    module.latency = latency
+    module.calls = {}
+
+    def _make(func_name: str):
+        def _replay(*args, **kwargs) -> pd.DataFrame:
+            module.calls[func_name] = module.calls.get(func_name, 0) + 1
+            time.sleep(module.latency)
+            return frames[func_name].copy()
+        _replay.__name__ = func_name
+        return _replay
+
+    for func_name in REPLAYED_FUNCTIONS:
+        setattr(module, func_name, _make(func_name))
+
+    sys.modules["akshare"] = module
+    return module
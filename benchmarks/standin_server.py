@@ -0,0 +1,275 @@
+# standin_server.py - 基准测试用的本地上游替身（回放录制响应 + 注入延迟）
+#
+# 在一个本地 HTTP 服务上模拟 Yahoo / 金管局 / FRED / Perplexity / DeepSeek 五个上游，
+# 响应内容来自 benchmarks/fixtures 下的录制文件，每个上游的延迟可单独配置。
+# 通过 config.ENDPOINTS 对应的环境变量（YAHOO_BASE_URL 等）把采集代码指向本服务。
+#
+# 单独运行（便于手工调试）：
+#   python benchmarks/standin_server.py --port 8765 --latency perplexity=1.0,deepseek=0.5
+
+import argparse
+import json
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# 各上游默认注入的延迟（秒），取自线上实测的大致量级
+DEFAULT_LATENCY = {
+    "akshare": 0.3,
+    "fred": 0.2,
+    "hkma": 0.15,
+    "yahoo": 0.1,
+    "perplexity": 1.0,
+    "deepseek": 0.5,
+}
+
+# 流式输出时每个分片之间的间隔（秒）及分片字数
+STREAM_CHUNK_DELAY = 0.005
+STREAM_CHUNK_CHARS = 16
+
+# DeepSeek 上下文缓存模拟：与之前请求的最长公共前缀按 64 个单位的块计为缓存命中（以字符数近似 Token 数）
+PREFIX_CACHE_BLOCK = 64
+
+HKMA_PATH = "/public/market-data-and-statistics/monthly-statistical-bulletin/er-ir/hk-interbank-ir-daily"
+
+
+def load_fixture(name: str) -> Any:
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse_latency(spec: Optional[str]) -> Dict[str, float]:
+    """解析 'perplexity=1.0,deepseek=0.5' 形式的延迟配置，未指定的上游使用默认值"""
+    latency = dict(DEFAULT_LATENCY)
+    if spec:
+        for item in spec.split(","):
+            name, _, value = item.partition("=")
+            if name.strip() not in latency:
+                raise ValueError(f"未知上游: {name}")
+            latency[name.strip()] = float(value)
+    return latency
+
+
+class StandinServer(ThreadingHTTPServer):
+    """多线程本地服务，记录每个上游的请求次数"""
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: Optional[Dict[str, float]] = None):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.request_counts: Dict[str, int] = {}
+        self._counts_lock = threading.Lock()
+        self._seen_prompts: List[str] = []
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def endpoint_env(self) -> Dict[str, str]:
+        """把采集代码指向本服务所需的环境变量（对应 config.ENDPOINTS）"""
+        return {
+            "YAHOO_BASE_URL": self.base_url,
+            "HKMA_BASE_URL": self.base_url,
+            "FRED_BASE_URL": f"{self.base_url}/fred",
+            "PERPLEXITY_BASE_URL": self.base_url,
+            "DEEPSEEK_BASE_URL": f"{self.base_url}/v1",
+        }
+
+    def count(self, upstream: str) -> None:
+        with self._counts_lock:
+            self.request_counts[upstream] = self.request_counts.get(upstream, 0) + 1
+
+    def reset_counts(self) -> Dict[str, int]:
+        with self._counts_lock:
+            counts, self.request_counts = self.request_counts, {}
+            return counts
+
+    def prompt_usage(self, messages: List[Dict[str, Any]]) -> Dict[str, int]:
+        """按请求前缀计算 DeepSeek 风格的 prompt_tokens / prompt_cache_hit_tokens / prompt_cache_miss_tokens"""
+        prompt = "".join(f"<{m.get('role')}>{m.get('content')}" for m in messages)
+        with self._counts_lock:
+            hit = max((len(os.path.commonprefix([prompt, seen])) for seen in self._seen_prompts), default=0)
+            self._seen_prompts.append(prompt)
+        hit -= hit % PREFIX_CACHE_BLOCK
+        return {"prompt_tokens": len(prompt), "prompt_cache_hit_tokens": hit,
+                "prompt_cache_miss_tokens": len(prompt) - hit}
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="standin-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StandinServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # 基准运行时不输出访问日志
+        pass
+
+    # ------------------------------------------------------------------
+    # 路由
+    # ------------------------------------------------------------------
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path.startswith("/v8/finance/chart/"):
+            symbol = url.path.rsplit("/", 1)[-1]
+            self._delay("yahoo")
+            self._send_fixture(f"yahoo_{symbol}.json")
+        elif url.path == HKMA_PATH:
+            self._delay("hkma")
+            self._send_hkma(query)
+        elif url.path == "/fred/series/observations":
+            self._delay("fred")
+            self._send_fred(query)
+        else:
+            self._send_json(404, {"error": f"no route for {url.path}"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = urlparse(self.path).path
+        if path == "/chat/completions":
+            self._delay("perplexity")
+            self._send_fixture(f"perplexity_{_perplexity_category(body)}.json")
+        elif path == "/v1/chat/completions":
+            self._delay("deepseek")
+            self._send_deepseek(body)
+        else:
+            self._send_json(404, {"error": f"no route for {path}"})
+
+    # ------------------------------------------------------------------
+    # 响应
+    # ------------------------------------------------------------------
+
+    def _delay(self, upstream: str) -> None:
+        self.server.count(upstream)
+        time.sleep(self.server.latency.get(upstream, 0))
+
+    def _send_bytes(self, status: int, payload: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_json(self, status: int, obj: Any) -> None:
+        self._send_bytes(status, json.dumps(obj, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    def _send_fixture(self, name: str) -> None:
+        try:
+            self._send_json(200, load_fixture(name))
+        except FileNotFoundError:
+            self._send_json(404, {"error": f"missing fixture {name}"})
+
+    def _send_fred(self, query: Dict[str, str]) -> None:
+        """按 fredapi 期望的 XML 格式返回观测值，支持 observation_start 过滤"""
+        series_id = query.get("series_id", "")
+        try:
+            fixture = load_fixture(f"fred_{series_id}.json")
+        except FileNotFoundError:
+            error = ET.Element("error", code="400", message=f"Bad Request. The series does not exist.")
+            self._send_bytes(400, ET.tostring(error), "text/xml")
+            return
+        start = query.get("observation_start", "")
+        root = ET.Element("observations", observation_start=start or "1776-07-04")
+        for date, value in fixture["observations"]:
+            if date >= start:
+                ET.SubElement(root, "observation", date=date, value=value)
+        self._send_bytes(200, ET.tostring(root, encoding="utf-8"), "text/xml; charset=utf-8")
+
+    def _send_hkma(self, query: Dict[str, str]) -> None:
+        """按金管局接口的 from / to / sortorder / offset / pagesize 参数切片返回录制的日度记录"""
+        fixture = load_fixture("hkma_hk-interbank-ir-daily.json")
+        records = [r for r in fixture["result"]["records"]
+                   if query.get("from", "") <= r["end_of_day"] <= query.get("to", "9999-12-31")]
+        records.sort(key=lambda r: r["end_of_day"], reverse=query.get("sortorder", "desc") == "desc")
+        offset = int(query.get("offset") or 0)
+        page = records[offset:offset + int(query.get("pagesize") or 100)]
+        self._send_json(200, {"header": fixture["header"], "result": {"datasize": len(page), "records": page}})
+
+    def _send_deepseek(self, body: Dict[str, Any]) -> None:
+        """报告 / 追问按消息条数区分；stream=true 时按 SSE 分片输出"""
+        system = next((m["content"] for m in body.get("messages", []) if m.get("role") == "system"), "")
+        fixture = load_fixture("deepseek_followup.json" if "追问" in system else "deepseek_report.json")
+        content = fixture["content"]
+        usage = dict(fixture["usage"], **self.server.prompt_usage(body.get("messages", [])))
+        usage["total_tokens"] = usage["prompt_tokens"] + usage.get("completion_tokens", 0)
+        completion_id = f"bench-{int(time.time() * 1000)}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created,
+                "model": fixture["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def _event(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra) -> None:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                     "model": fixture["model"],
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        _event({"role": "assistant", "content": ""})
+        for i in range(0, len(content), STREAM_CHUNK_CHARS):
+            time.sleep(STREAM_CHUNK_DELAY)
+            _event({"content": content[i:i + STREAM_CHUNK_CHARS]})
+        _event({}, "stop", usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def _perplexity_category(body: Dict[str, Any]) -> str:
+    """根据 system prompt 判断查询分类（与 data_retriever 的三个 prompt 对应）"""
+    system = next((m["content"] for m in body.get("messages", []) if m.get("role") == "system"), "")
+    if "macro strategist" in system:
+        return "MACRO"
+    if any("一" <= ch <= "鿿" for ch in system):
+        return "CNY"
+    return "POLICY"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="FXFuel 上游替身服务")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", help="各上游延迟（秒），如 perplexity=1.0,deepseek=0.5")
+    args = parser.parse_args()
+
+    server = StandinServer(args.port, parse_latency(args.latency))
+    print(f"stand-in server on {server.base_url}")
+    for name, value in server.endpoint_env().items():
+        print(f"  export {name}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
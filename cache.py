@@ -0,0 +1,429 @@
+# cache.py - 线程安全的 TTL 缓存（LRU 容量上限 + 单飞请求合并 + 过期后台刷新 + 可选磁盘层）
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, TypeVar, Union
+
+T = TypeVar('T')
+
+# 有效期：固定秒数，或按条目计算的回调 (缓存值, 写入时间戳) -> 秒数（如按数据发布时间表过期）
+TTL = Union[float, Callable[[Any, float], float]]
+
+
+class CacheResult(NamedTuple):
+    """一次缓存查询的结果"""
+    value: Any
+    status: str    # "hit" / "disk" / "miss" / "coalesced" / "stale"
+    age: float     # 返回值距写入的秒数（miss 时为 0）
+
+
+class _Flight:
+    """一次进行中的回源请求，供同 key 的并发调用方等待结果"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class DiskCacheTier:
+    """
+    基于 SQLite 的持久化缓存层（进程重启后仍可用，同一主机上的多个进程共享）
+
+    - 值使用 pickle（最高协议）序列化，DataFrame / Series 以二进制块存储
+    - 记录写入时间，TTL 语义与内存层一致，由调用方判断是否过期
+    - leases 表实现跨进程的回源租约：同一 key 只有一个进程回源，其他进程等待其写入
+
+    注意：pickle 只应读取本应用自己写入的文件，不要指向不可信的数据库。
+    任何磁盘错误都只计数、不抛出，磁盘层故障时缓存退化为纯内存。
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 30, poll_interval: float = 0.2):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.owner = f"{os.getpid()}-{id(self)}"
+        self.errors = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, stored_at REAL NOT NULL, payload BLOB NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key: str) -> Optional[tuple]:
+        """返回 (value, stored_at)，不存在或读取失败时返回 None"""
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT payload, stored_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None:
+                return None
+            return pickle.loads(row[0]), row[1]
+        except Exception:
+            self.errors += 1
+            return None
+
+    def put(self, key: str, value: Any, stored_at: float) -> None:
+        try:
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, stored_at, payload) VALUES (?, ?, ?)",
+                    (key, stored_at, payload),
+                )
+        except Exception:
+            self.errors += 1
+
+    def delete(self, key: Optional[str] = None) -> None:
+        """删除指定 key，key 为 None 时清空全部条目"""
+        try:
+            with self._connect() as conn:
+                if key is None:
+                    conn.execute("DELETE FROM entries")
+                else:
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        except Exception:
+            self.errors += 1
+
+    def acquire_lease(self, key: str) -> bool:
+        """尝试获取回源租约；其他进程持有未过期租约时返回 False"""
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                cur = conn.execute(
+                    "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                    "WHERE leases.expires_at < ? OR leases.owner = excluded.owner",
+                    (key, self.owner, now + self.lease_seconds, now),
+                )
+                return cur.rowcount > 0
+        except Exception:
+            self.errors += 1
+            return True  # 磁盘层异常时不阻塞回源
+
+    def release_lease(self, key: str) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+        except Exception:
+            self.errors += 1
+
+    def wait_for(self, key: str, newer_than: float) -> Optional[tuple]:
+        """等待持有租约的进程写入 stored_at > newer_than 的条目，超时返回 None"""
+        deadline = time.time() + self.lease_seconds
+        while time.time() < deadline:
+            stored = self.get(key)
+            if stored is not None and stored[1] > newer_than:
+                return stored
+            time.sleep(self.poll_interval)
+        return None
+
+
+class TTLCache:
+    """
+    线程安全的 TTL 缓存
+
+    特性：
+    1. 单飞（single-flight）：同一 key 同时未命中时只有一个调用方回源，其余等待同一结果
+    2. LRU 容量上限：超过 max_entries 时淘汰最久未访问的条目
+    3. 按命名空间的 TTL：key 以命名空间开头（如 "fred_us10y" -> "fred"），
+       未显式传入 ttl_seconds 时使用 namespace_ttl 中的值；ttl_seconds 也可以是回调，
+       按条目的值和写入时间计算有效期（见 release_schedule）
+    4. 过期后台刷新（stale-while-revalidate）：命名空间出现在 max_stale 中时，
+       过期但未超过 max_stale 秒的条目立即返回（状态 "stale"），同时后台回源替换；
+       超过 max_stale 的条目仍阻塞回源
+    5. 可选磁盘层（DiskCacheTier）：内存未命中时先读磁盘，回源结果写穿到磁盘，
+       多个进程通过磁盘租约合并回源
+    6. 命中 / 未命中 / 淘汰等计数器，可通过 stats() 读取
+    7. 提前刷新（refresh-ahead）：记住每个 key 最近一次查询的 fetch_func，
+       entries() 列出各条目的剩余有效期与空闲时长，refresh_ahead() 在后台提前回源（见 prefetcher）
+    """
+
+    def __init__(self, max_entries: int = 256,
+                 namespace_ttl: Optional[Dict[str, int]] = None,
+                 default_ttl: int = 300,
+                 max_stale: Optional[Dict[str, int]] = None,
+                 disk: Optional[DiskCacheTier] = None):
+        self.max_entries = max_entries
+        self.namespace_ttl = dict(namespace_ttl or {})
+        self.default_ttl = default_ttl
+        self.max_stale = dict(max_stale or {})
+        self.disk = disk
+        self._entries: "OrderedDict[str, tuple[Any, float, float]]" = OrderedDict()  # key -> (value, 写入时间, ttl)
+        self._inflight: Dict[str, _Flight] = {}
+        self._fetchers: Dict[str, Tuple[Callable[[], Any], Optional[TTL], float]] = {}  # key -> (fetch_func, ttl, 最近查询时间)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "stale": 0,
+                          "evictions": 0, "expirations": 0, "refresh_errors": 0, "prefetches": 0}
+
+    # ------------------------------------------------------------------
+    # TTL 解析
+    # ------------------------------------------------------------------
+
+    def namespace_of(self, key: str) -> Optional[str]:
+        """返回 key 所属的命名空间（最长前缀匹配），无匹配时返回 None"""
+        best = None
+        for ns in set(self.namespace_ttl) | set(self.max_stale):
+            if key == ns or key.startswith(ns + "_"):
+                if best is None or len(ns) > len(best):
+                    best = ns
+        return best
+
+    def ttl_for(self, key: str) -> float:
+        ns = self.namespace_of(key)
+        return self.namespace_ttl.get(ns, self.default_ttl) if ns is not None else self.default_ttl
+
+    def _resolve_ttl(self, key: str, ttl_seconds: Optional[TTL], value: Any, stored_at: float) -> float:
+        if ttl_seconds is None:
+            return self.ttl_for(key)
+        if callable(ttl_seconds):
+            return ttl_seconds(value, stored_at)
+        return ttl_seconds
+
+    def max_stale_for(self, key: str) -> float:
+        """过期后仍可直接返回的最长秒数，0 表示不启用后台刷新"""
+        ns = self.namespace_of(key)
+        return self.max_stale.get(ns, 0) if ns is not None else 0
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
+
+    def get_or_fetch(self, key: str, fetch_func: Callable[[], T],
+                     ttl_seconds: Optional[TTL] = None) -> T:
+        """读取缓存，未命中或过期时调用 fetch_func 回源，只返回值（见 lookup）"""
+        return self.lookup(key, fetch_func, ttl_seconds).value
+
+    def lookup(self, key: str, fetch_func: Callable[[], T],
+               ttl_seconds: Optional[TTL] = None) -> CacheResult:
+        """
+        读取缓存并返回值及命中状态
+
+        同一 key 的并发未命中会合并为一次 fetch_func 调用；
+        fetch_func 抛出的异常会传递给所有等待者，且不会写入缓存。
+        启用后台刷新的命名空间在过期后先返回旧值（status="stale"），
+        后台刷新返回 None 或抛出异常时保留旧值。
+        """
+        max_stale = self.max_stale_for(key)
+
+        with self._lock:
+            self._fetchers[key] = (fetch_func, ttl_seconds, time.time())
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at, _ = entry
+                ttl = self._resolve_ttl(key, ttl_seconds, value, stored_at)
+                age = time.time() - stored_at
+                if age < ttl:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return CacheResult(value, "hit", age)
+                self._counters["expirations"] += 1
+                if age < ttl + max_stale:
+                    self._entries.move_to_end(key)
+                    self._counters["stale"] += 1
+                    self._start_refresh_locked(key, fetch_func, ttl_seconds)
+                    return CacheResult(value, "stale", age)
+
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self._counters["coalesced"] += 1
+                leader = False
+            else:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self._counters["misses"] += 1
+                leader = True
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return CacheResult(flight.value, "coalesced", 0.0)
+
+        try:
+            result = self._fill(key, fetch_func, ttl_seconds, max_stale)
+            flight.value = result.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+        with self._lock:
+            if result.status == "disk":
+                self._counters["disk_hits"] += 1
+            elif result.status == "stale":
+                self._counters["stale"] += 1
+                self._start_refresh_locked(key, fetch_func, ttl_seconds)
+        return result
+
+    def _fill(self, key: str, fetch_func: Callable[[], Any], ttl_seconds: Optional[TTL],
+              max_stale: float) -> CacheResult:
+        """内存未命中时的回源路径：先读磁盘层，再（持有跨进程租约）调用 fetch_func"""
+        if self.disk is None:
+            value = fetch_func()
+            self.set(key, value, ttl_seconds)
+            return CacheResult(value, "miss", 0.0)
+
+        stored = self.disk.get(key)
+        if stored is not None:
+            value, stored_at = stored
+            ttl = self._resolve_ttl(key, ttl_seconds, value, stored_at)
+            age = time.time() - stored_at
+            if age < ttl + max_stale:
+                self.set(key, value, ttl_seconds, stored_at=stored_at, persist=False)
+                return CacheResult(value, "disk" if age < ttl else "stale", age)
+
+        if not self.disk.acquire_lease(key):
+            # 其他进程正在回源：等待其写入磁盘后直接复用（回调有效期无法预先换算，只接受租约期内的新写入）
+            if callable(ttl_seconds):
+                window = self.disk.lease_seconds
+            else:
+                window = self.ttl_for(key) if ttl_seconds is None else ttl_seconds
+            stored = self.disk.wait_for(key, newer_than=time.time() - window)
+            if stored is not None:
+                value, stored_at = stored
+                self.set(key, value, ttl_seconds, stored_at=stored_at, persist=False)
+                return CacheResult(value, "disk", time.time() - stored_at)
+        try:
+            value = fetch_func()
+            self.set(key, value, ttl_seconds)
+        finally:
+            self.disk.release_lease(key)
+        return CacheResult(value, "miss", 0.0)
+
+    def _start_refresh_locked(self, key: str, fetch_func: Callable[[], Any], ttl: Optional[TTL]) -> None:
+        """启动后台刷新（调用方须持有 self._lock；已有进行中的回源时不重复启动）"""
+        if key in self._inflight:
+            return
+        flight = _Flight()
+        self._inflight[key] = flight
+        threading.Thread(
+            target=self._refresh, args=(key, fetch_func, ttl, flight),
+            name=f"cache-refresh-{key}", daemon=True,
+        ).start()
+
+    def _refresh(self, key: str, fetch_func: Callable[[], Any], ttl: Optional[TTL], flight: _Flight) -> None:
+        """后台刷新过期条目，失败时保留旧值；磁盘层已有其他进程写入的更新值时直接采用"""
+        try:
+            if self._adopt_disk_entry(key, ttl):
+                return
+            flight.value = fetch_func()
+            if flight.value is not None:
+                self.set(key, flight.value, ttl)
+            else:
+                with self._lock:
+                    self._counters["refresh_errors"] += 1
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._counters["refresh_errors"] += 1
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def _adopt_disk_entry(self, key: str, ttl: Optional[TTL]) -> bool:
+        """磁盘层的条目比内存中的新且仍在有效期内时载入内存（例如独立的预取进程刚刚刷新过）"""
+        if self.disk is None:
+            return False
+        stored = self.disk.get(key)
+        if stored is None:
+            return False
+        value, stored_at = stored
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[1] >= stored_at:
+            return False
+        if time.time() - stored_at >= self._resolve_ttl(key, ttl, value, stored_at):
+            return False
+        self.set(key, value, ttl, stored_at=stored_at, persist=False)
+        return True
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[TTL] = None,
+            stored_at: Optional[float] = None, persist: bool = True) -> None:
+        """写入内存层；persist 为 True 且配置了磁盘层时同时写穿到磁盘（None 不落盘）"""
+        stored_at = time.time() if stored_at is None else stored_at
+        ttl = self._resolve_ttl(key, ttl_seconds, value, stored_at)
+        with self._lock:
+            self._entries[key] = (value, stored_at, ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._fetchers.pop(evicted, None)
+                self._counters["evictions"] += 1
+        if persist and self.disk is not None and value is not None:
+            self.disk.put(key, value, stored_at)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._fetchers.pop(key, None)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._fetchers.clear()
+        if self.disk is not None:
+            self.disk.delete()
+
+    # ------------------------------------------------------------------
+    # 提前刷新
+    # ------------------------------------------------------------------
+
+    def entries(self) -> List[Tuple[str, float, float, float]]:
+        """各内存条目的 (key, ttl, 剩余有效秒数, 距最近一次查询的秒数)，剩余秒数过期后为负"""
+        now = time.time()
+        with self._lock:
+            return [
+                (key, ttl, ttl - (now - stored_at),
+                 now - self._fetchers[key][2] if key in self._fetchers else float("inf"))
+                for key, (_, stored_at, ttl) in self._entries.items()
+            ]
+
+    def refresh_ahead(self, key: str) -> bool:
+        """
+        用该 key 最近一次查询的 fetch_func 在后台回源（查询方继续拿到当前值，刷新完成后替换）
+
+        没有记录 fetch_func 或已有进行中的回源时返回 False。
+        """
+        with self._lock:
+            fetcher = self._fetchers.get(key)
+            if fetcher is None or key in self._inflight:
+                return False
+            fetch_func, ttl_seconds, _ = fetcher
+            self._counters["prefetches"] += 1
+            self._start_refresh_locked(key, fetch_func, ttl_seconds)
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        """返回计数器快照及命中率"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["size"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+        if self.disk is not None:
+            stats["disk_errors"] = self.disk.errors
+        served = stats["hits"] + stats["disk_hits"] + stats["coalesced"] + stats["stale"]
+        lookups = served + stats["misses"]
+        stats["hit_ratio"] = round(served / lookups, 4) if lookups else None
+        return stats
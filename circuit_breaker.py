@@ -0,0 +1,197 @@
+# circuit_breaker.py - 按数据源的熔断器 + 基于实测 p95 的自适应超时
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar, Union
+
+T = TypeVar('T')
+
+Timeout = Union[float, Tuple[float, float]]
+
+# 熔断器状态
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """数据源处于熔断冷却期，调用被直接拒绝"""
+
+
+class CircuitBreaker:
+    """
+    单个数据源的熔断器
+
+    - closed：正常放行；连续失败达到 failure_threshold 次后转为 open
+    - open：冷却 cooldown_seconds 内直接拒绝（抛 CircuitOpenError），调用方立即走备选数据源，
+      不再等待超时和重试退避
+    - half_open：冷却结束后只放行一个试探请求，成功则恢复 closed，失败则重新进入 open
+
+    同时记录最近 latency_window 次成功调用的耗时，timeout() 据此把读超时收紧到
+    p95 × timeout_multiplier（不低于 min_timeout，不超过配置的超时）。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, cooldown_seconds: float = 60,
+                 latency_window: int = 50, min_samples: int = 5,
+                 timeout_multiplier: float = 3.0, min_timeout: float = 2.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.min_samples = min_samples
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self._latencies: deque = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._counters = {"calls": 0, "failures": 0, "rejected": 0, "trips": 0}
+
+    # ------------------------------------------------------------------
+    # 状态
+    # ------------------------------------------------------------------
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state_locked()
+
+    def _current_state_locked(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """是否处于冷却期（重试循环据此跳过退避等待）"""
+        return self.state == OPEN
+
+    def allow(self) -> bool:
+        """是否放行本次调用；half_open 时只放行一个试探请求"""
+        with self._lock:
+            state = self._current_state_locked()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._counters["rejected"] += 1
+            return False
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self._counters["calls"] += 1
+            self._latencies.append(latency)
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._counters["calls"] += 1
+            self._counters["failures"] += 1
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._counters["trips"] += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+            self._latencies.clear()
+
+    # ------------------------------------------------------------------
+    # 自适应超时
+    # ------------------------------------------------------------------
+
+    def p95(self) -> Optional[float]:
+        """最近成功调用耗时的 p95（秒），样本不足 min_samples 时返回 None"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+    def timeout(self, configured: Timeout) -> Timeout:
+        """
+        按实测 p95 收紧超时，configured 为 TIMEOUT_CONFIG 中的值（秒，或 (连接, 读取) 元组）
+
+        只会缩短、不会放宽：p95 × timeout_multiplier 超过配置值时仍使用配置值。
+        """
+        p95 = self.p95()
+        if p95 is None:
+            return configured
+        adaptive = max(self.min_timeout, p95 * self.timeout_multiplier)
+        if isinstance(configured, tuple):
+            connect, read = configured
+            return (min(connect, adaptive), min(read, adaptive))
+        return min(configured, adaptive)
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        with self._lock:
+            return {
+                "state": self._current_state_locked(),
+                "consecutive_failures": self._failures,
+                "p95_seconds": round(p95, 3) if p95 is not None else None,
+                **self._counters,
+            }
+
+    # ------------------------------------------------------------------
+    # 调用
+    # ------------------------------------------------------------------
+
+    def call(self, func: Callable[..., T], *args,
+             is_failure: Optional[Callable[[T], bool]] = None, **kwargs) -> T:
+        """
+        经熔断器执行 func
+
+        熔断中抛 CircuitOpenError；func 抛异常或 is_failure(result) 为真时记为失败（结果照常返回）。
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} 熔断中，{self.cooldown_seconds:.0f}秒冷却期内跳过")
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        if is_failure is not None and is_failure(result):
+            self.record_failure()
+        else:
+            self.record_success(time.perf_counter() - started)
+        return result
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_defaults: Dict[str, Any] = {}
+
+
+def configure(**defaults) -> None:
+    """设置之后新建熔断器的默认参数（对应 CircuitBreaker.__init__ 的关键字参数）"""
+    with _breakers_lock:
+        _defaults.update(defaults)
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """进程内按数据源名称共享的熔断器"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **_defaults)
+            _breakers[name] = breaker
+        return breaker
+
+
+def all_breakers() -> Dict[str, CircuitBreaker]:
+    with _breakers_lock:
+        return dict(_breakers)
@@ -1,8 +1,8 @@
 # config.py - DeepSeek 客户端配置
 
 import os
+import threading
 from dotenv import load_dotenv
-from openai import OpenAI
 
 # --- 1. 加载环境变量 ---
 load_dotenv()
@@ -12,6 +12,15 @@ DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY") or os.getenv("OPENAI_API_KEY")
 HTTP_PROXY = os.getenv("HTTP_PROXY")
 HTTPS_PROXY = os.getenv("HTTPS_PROXY")
 
+# 上游服务地址（可用环境变量覆盖，例如指向 benchmarks/ 中的本地替身服务器）
+ENDPOINTS = {
+    "deepseek": os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1"),
+    "perplexity": os.getenv("PERPLEXITY_BASE_URL", "https://api.perplexity.ai"),
+    "yahoo": os.getenv("YAHOO_BASE_URL", "https://query1.finance.yahoo.com"),
+    "hkma": os.getenv("HKMA_BASE_URL", "https://api.hkma.gov.hk"),
+    "fred": os.getenv("FRED_BASE_URL", "https://api.stlouisfed.org/fred"),
+}
+
 # --- 2. 代理设置 ---
 if HTTP_PROXY:
     os.environ['http_proxy'] = HTTP_PROXY
@@ -19,8 +28,24 @@ if HTTPS_PROXY:
     os.environ['https_proxy'] = HTTPS_PROXY
 
 # --- 3. DeepSeek 客户端 ---
+# 延迟创建：导入 config 不再构建 OpenAI 客户端（也不会因缺少 Key 调用 st.stop()），
+# 只采集数据的脚本与冷启动不承担 openai 的导入和初始化开销
+_deepseek_client = None
+_deepseek_client_lock = threading.Lock()
+
+
 def get_deepseek_client():
-    """获取 DeepSeek 客户端（单例模式）"""
+    """获取 DeepSeek 客户端（首次调用时创建，之后复用同一实例）"""
+    global _deepseek_client
+    if _deepseek_client is not None:
+        return _deepseek_client
+    with _deepseek_client_lock:
+        if _deepseek_client is None:
+            _deepseek_client = _create_deepseek_client()
+        return _deepseek_client
+
+
+def _create_deepseek_client():
     if not DEEPSEEK_API_KEY:
         # 如果在 Streamlit 环境中，显示错误并停止
         try:
@@ -32,9 +57,10 @@ def get_deepseek_client():
             raise ValueError("未找到 DeepSeek API Key，请在 .env 中设置 DEEPSEEK_API_KEY")
     
     try:
+        from openai import OpenAI
         client = OpenAI(
             api_key=DEEPSEEK_API_KEY,
-            base_url="https://api.deepseek.com/v1"
+            base_url=ENDPOINTS["deepseek"]
         )
         return client
     except Exception as e:
@@ -45,8 +71,12 @@ def get_deepseek_client():
         except ImportError:
             raise RuntimeError(f"DeepSeek 客户端初始化失败: {e}")
 
-# 向后兼容：保留全局客户端实例（用于 streamlit_app.py，后续阶段会重构）
-DEEPSEEK_CLIENT = get_deepseek_client()
+
+def __getattr__(name):
+    """向后兼容：`from config import DEEPSEEK_CLIENT` 在首次访问时才创建客户端"""
+    if name == "DEEPSEEK_CLIENT":
+        return get_deepseek_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- 4. 模型配置 ---
 DEEPSEEK_MODEL = "deepseek-chat"
@@ -59,6 +89,13 @@ REPORT_CONFIG = {
     "top_p": 0.95
 }
 
+# 报告缓存：清洗后的提示词 + 模型 + 生成参数完全相同时，直接复用已生成的报告及其数值校验结果
+# （按指纹存放在 STORAGE_CONFIG["data_dir"]/reports；FXFUEL_REPORT_CACHE=0 关闭）
+REPORT_CACHE_CONFIG = {
+    "enabled": os.getenv("FXFUEL_REPORT_CACHE", "1") != "0",
+    "max_entries": 200,
+}
+
 # --- 6. 超时配置 (P0-2 新增) ---
 TIMEOUT_CONFIG = {
     "default": (10, 30),      # (连接超时, 读取超时) 秒 - 通用默认值
@@ -163,23 +200,145 @@ CORE_INDICATORS = {
 DEFAULT_TOLERANCE = 0.05
 
 # --- 9. Token 管理配置 (P0-1 新增) ---
+# 数据 JSON 的 Token 预算：核心数值始终保留，剩余预算按相关度从高到低填充新闻（见 prompt_templates._allocate_budget）
 TOKEN_CONFIG = {
     "max_context_tokens": 6000,   # Context 最大 Token 数（保守值，留空间给输出）
-    "max_news_items": 7,          # 超限时保留的新闻条数
-    "chars_per_token": 1.5,       # 中文约 1.5 字符/token
+    # 本地 DeepSeek tokenizer.json（模型仓库中的文件，需安装 tokenizers）；未设置或不可用时按字符类别估算，从不联网下载
+    "tokenizer_path": os.getenv("FXFUEL_TOKENIZER"),
+    "count_cache_size": 4096,     # Token 计数结果的 LRU 缓存条数
+}
+
+# 新闻相关度排序（news_ranking）：本地 TF-IDF 对照 CORE_INDICATORS 关键词（+ extra_keywords）打分；
+# 填充预算时各分类（POLICY / MACRO / CNY）先轮流入选得分最高的 min_per_category 条，其余按得分排序
+NEWS_RANKING_CONFIG = {
+    "min_per_category": 2,
+    # CORE_INDICATORS 关键词以中文为主，POLICY / MACRO 新闻多为英文：补充对应的英文检索词
+    "extra_keywords": [
+        "yuan", "renminbi", "PBOC", "fixing", "Hong Kong dollar", "HIBOR", "dollar index", "DXY",
+        "Fed", "rate cut", "Treasury yields", "VIX", "euro", "yen", "sterling", "tariff", "inflation",
+    ],
+}
+
+# 新闻去重（news_dedup）：标题 + 摘要词集合的 MinHash 估计相似度 >= threshold 视为同一事件
+# - 同一次采集中跨分类（POLICY / MACRO / CNY）的重复合并为一条，分类与来源取并集（最多 max_urls 个）
+# - 跨日索引（STORAGE_CONFIG["data_dir"]/news_index.json）标注前几天已报道过的事件，连续 retention_days 天未再出现的事件移出索引
+NEWS_DEDUP_CONFIG = {
+    "threshold": 0.45,
+    "max_urls": 3,
+    "retention_days": 7,
+}
+
+# 追问多轮记忆：之前的问答在 history_tokens 预算内随新问题一起发送；
+# 超出预算时最早的一轮压缩为一行摘要（问题 + 回答开头 excerpt_chars 字），摘要超过 summary_tokens 时丢弃最早的行
+CONVERSATION_CONFIG = {
+    "history_tokens": 1500,
+    "summary_tokens": 400,
+    "excerpt_chars": 120,
 }
 
 # --- 10. 数据缓存配置 (P1 新增) ---
 CACHE_TTL = {
-    "cny_mid": 3600,        # 中间价：1小时（9:15发布后整天不变）
-    "cny_spot": 60,         # 实时汇率：1分钟
-    "hkd": 60,              # 港元汇率：1分钟
-    "fred": 300,            # FRED 数据：5分钟
-    "global_fx": 60,        # 全球外汇：1分钟
+    "cny_mid": 3600,        # 中间价：1小时（仅在 RELEASE_SCHEDULE 未配置时使用）
+    "forex_spot": 60,       # 东方财富外汇行情快照（CNY/HKD/全球外汇共用）：1分钟
+    "fred": 300,            # FRED 数据：5分钟（仅在 RELEASE_SCHEDULE 未配置时使用）
+    "yahoo": 60,            # Yahoo Finance（DXY / USDHKD 备选）：1分钟
+    "hibor": 600,           # 金管局 HIBOR：10分钟（仅在 RELEASE_SCHEDULE 未配置时使用）
     "news": 600,            # 新闻：10分钟
 }
 
-# --- 11. 辅助函数 ---
+# 过期后台刷新（stale-while-revalidate）：TTL 过期后仍可直接返回旧值的最长秒数，
+# 期间后台刷新；超过该上限则阻塞回源。未列出的命名空间（如 news）不启用
+# 按 RELEASE_SCHEDULE 过期的 cny_mid / hibor / fred 不启用：发布时刻之后旧值已是上一期数据
+# （9:15 之后仍返回前一日中间价），必须阻塞回源
+CACHE_MAX_STALE = {
+    "forex_spot": 300,
+    "yahoo": 300,
+}
+
+# 按发布时间表过期：以下缓存 key 不用 CACHE_TTL 的固定秒数，而是写入时已是最新发布值的条目
+# 一直有效到下一次发布时刻（tz 当地时间，只排除周末）；数据尚未发布 / 上游延迟时每 poll_seconds 秒重试
+# - cny_mid：中间价 9:15 定盘（北京时间）
+# - hibor：金管局接口当日定盘约 11:30 可取（香港时间）
+# - fred_us10y / fred_us2y / fred_vix：FRED 日度序列在下一个工作日发布前一日观测值（美东时间）
+# - fred_ffr：FEDFUNDS 月度，每月第一个工作日发布上月均值
+RELEASE_SCHEDULE = {
+    "cny_mid": {"tz": "Asia/Shanghai", "release_time": "09:15", "poll_seconds": 300},
+    "hibor": {"tz": "Asia/Hong_Kong", "release_time": "11:30", "poll_seconds": 600},
+    "fred_us10y": {"tz": "America/New_York", "release_time": "16:30", "lag_days": 1, "poll_seconds": 1800},
+    "fred_us2y": {"tz": "America/New_York", "release_time": "16:30", "lag_days": 1, "poll_seconds": 1800},
+    "fred_vix": {"tz": "America/New_York", "release_time": "09:30", "lag_days": 1, "poll_seconds": 1800},
+    "fred_ffr": {"tz": "America/New_York", "release_time": "16:00", "frequency": "monthly", "poll_seconds": 3600},
+}
+
+# 缓存容量（LRU 淘汰），TTL 按 key 前缀匹配上面的 CACHE_TTL 命名空间
+# disk_path: 可选的 SQLite 磁盘缓存层（重启后仍然有效，同机多进程共享），未设置时仅用内存
+CACHE_CONFIG = {
+    "max_entries": 256,
+    "disk_path": os.getenv("FXFUEL_CACHE_DB"),
+    "disk_lease_seconds": 30,   # 跨进程回源租约时长，其他进程最多等待该时长
+}
+
+# --- 11. 本地数据存储 ---
+# FRED 序列历史等本地持久化数据的根目录（增量刷新时只请求新观测值）
+STORAGE_CONFIG = {
+    "data_dir": os.getenv("FXFUEL_DATA_DIR", ".fxfuel_data"),
+}
+
+# 金管局 HIBOR 本地存储：首次回补 backfill_days 天，之后只分页拉取「最后已存日期 - overlap_days」之后的记录
+# （缓存有效期按 RELEASE_SCHEDULE["hibor"] 的定盘发布时刻计算）
+HIBOR_CONFIG = {
+    "backfill_days": 365,
+    "page_size": 100,
+    "overlap_days": 3,
+}
+
+# --- 12. 熔断与自适应超时 ---
+# 每个上游（eastmoney / safe / yahoo / hkma / fred / perplexity）一个熔断器：
+# 连续失败 failure_threshold 次后冷却 cooldown_seconds 秒，期间直接走备选数据源；
+# 成功样本达到 min_samples 后，读超时收紧为 p95 × timeout_multiplier（不低于 min_timeout，不超过 TIMEOUT_CONFIG）
+BREAKER_CONFIG = {
+    "failure_threshold": 3,
+    "cooldown_seconds": 60,
+    "latency_window": 50,
+    "min_samples": 5,
+    "timeout_multiplier": 3.0,
+    "min_timeout": 2.0,
+}
+
+# 对冲请求的延迟预算（秒）：主数据源超过该时间未返回，就并行请求备选数据源，先返回有效值的胜出
+# dxy: Yahoo -> 东方财富；usdhkd: 东方财富 -> Yahoo
+HEDGE_CONFIG = {
+    "dxy": 0.3,
+    "usdhkd": 0.3,
+}
+
+# --- 13. 预取与共享快照 ---
+# 后台预取（见 prefetcher.py）：启动时完整采集一次，之后每 interval 秒检查缓存，
+# 固定 TTL 的条目在剩余有效期不足 min(lead_seconds, TTL × lead_fraction) 时提前刷新，按发布时间表过期的条目在发布后立即刷新；
+# 超过 idle_seconds 无人查询的条目停止预取（避免空闲时持续调用付费的 Perplexity）
+PREFETCH_CONFIG = {
+    "enabled": os.getenv("FXFUEL_PREFETCH", "1").lower() not in ("0", "false", "no"),
+    "interval": 5.0,
+    "lead_seconds": 30.0,
+    "lead_fraction": 0.2,
+    "idle_seconds": 3600,
+    "retry_seconds": 60.0,
+}
+
+# 共享快照（见 shared_snapshot.py）：所有 Streamlit 会话共用同一份采集结果，
+# 「开始采集数据」在最新版本不超过 max_age_seconds 秒时直接复用，否则重新采集（并发请求只采集一次）
+SHARED_SNAPSHOT_CONFIG = {
+    "max_age_seconds": int(os.getenv("FXFUEL_SNAPSHOT_MAX_AGE", "300")),
+}
+
+# --- 14. 运行指标 ---
+# 设置 METRICS_PORT 后，streamlit_app 在该端口启动旁路 HTTP 服务，提供 Prometheus 文本格式的 /metrics
+METRICS_CONFIG = {
+    "port": int(os.getenv("METRICS_PORT") or 0) or None,
+    "addr": os.getenv("METRICS_ADDR", "0.0.0.0"),
+}
+
+# --- 15. 辅助函数 ---
 def get_proxy_status():
     """返回代理状态"""
     return HTTP_PROXY or HTTPS_PROXY
@@ -0,0 +1,96 @@
+# conversation_memory.py - 追问多轮记忆：按 Token 预算发送历史问答，较早的轮次增量压缩为摘要
+
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import token_counter
+from prompt_templates import CONVERSATION_SUMMARY_ACK, CONVERSATION_SUMMARY_PROMPT
+
+
+def _squash(text: str) -> str:
+    """合并空白与 Markdown 标记，压缩行只保留正文"""
+    return re.sub(r"\s+", " ", re.sub(r"[#*`>|]+", " ", text)).strip()
+
+
+class ConversationMemory:
+    """
+    追问对话记忆
+
+    每次追问除新问题外还发送之前的问答，模型才能理解「那港元呢」「展开第二点」之类的指代。
+    为使提示词大小不随对话增长：
+    - 近期轮次发送原文（user / assistant 消息对）
+    - 摘要 + 原文超过 history_tokens 时，把最早的一轮原文压缩为一行摘要（问题 + 回答开头 excerpt_chars 字）；
+      每轮只在移出原文时压缩一次，已有摘要行不再改写（增量压缩，不额外调用模型）
+    - 摘要超过 summary_tokens 时丢弃最早的摘要行
+    单轮原文本身超过预算时也会被压缩，因此历史部分始终不超过 history_tokens。
+    turns 保存完整问答，仅用于页面展示。
+    """
+
+    def __init__(self, history_tokens: int = 1500, summary_tokens: int = 400, excerpt_chars: int = 120,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.excerpt_chars = excerpt_chars
+        self.count_tokens = count_tokens or token_counter.count_tokens
+        self.turns: List[Tuple[str, str]] = []
+        self._recent: List[Tuple[str, str, int]] = []   # (问题, 回答, Token 数)
+        self._summary: List[Tuple[str, int]] = []       # (摘要行, Token 数)
+        self.compacted = 0                              # 已压缩的轮数（含之后被丢弃的）
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def add(self, question: str, answer: str) -> None:
+        """记录一轮问答并按预算压缩"""
+        self.turns.append((question, answer))
+        self._recent.append((question, answer, self.count_tokens(question) + self.count_tokens(answer)))
+        self._compact()
+
+    def clear(self) -> None:
+        self.turns.clear()
+        self._recent.clear()
+        self._summary.clear()
+        self.compacted = 0
+
+    def _compact_line(self, question: str, answer: str) -> str:
+        answer = _squash(answer)
+        if len(answer) > self.excerpt_chars:
+            answer = answer[:self.excerpt_chars] + "…"
+        return f"- 问：{_squash(question)} → 答：{answer}"
+
+    def _summary_size(self) -> int:
+        return sum(tokens for _, tokens in self._summary)
+
+    def used_tokens(self) -> int:
+        """当前历史部分（摘要 + 近期原文）的 Token 数"""
+        return self._summary_size() + sum(tokens for _, _, tokens in self._recent)
+
+    def _compact(self) -> None:
+        while self._recent and self.used_tokens() > self.history_tokens:
+            question, answer, _ = self._recent.pop(0)
+            line = self._compact_line(question, answer)
+            self._summary.append((line, self.count_tokens(line)))
+            self.compacted += 1
+            while self._summary and self._summary_size() > self.summary_tokens:
+                self._summary.pop(0)
+
+    def messages(self) -> List[Dict[str, str]]:
+        """历史消息（放在追问前缀与新问题之间）：摘要消息对（如有）+ 近期原文问答"""
+        messages: List[Dict[str, str]] = []
+        if self._summary:
+            summary = "\n".join(line for line, _ in self._summary)
+            messages.append({"role": "user", "content": CONVERSATION_SUMMARY_PROMPT.format(summary=summary)})
+            messages.append({"role": "assistant", "content": CONVERSATION_SUMMARY_ACK})
+        for question, answer, _ in self._recent:
+            messages.append({"role": "user", "content": question})
+            messages.append({"role": "assistant", "content": answer})
+        return messages
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "turns": len(self.turns),
+            "verbatim_turns": len(self._recent),
+            "summary_lines": len(self._summary),
+            "compacted": self.compacted,
+            "history_tokens": self.used_tokens(),
+        }
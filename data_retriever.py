@@ -5,8 +5,10 @@ import ssl
 import json
 import time
 import re
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Callable
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional, Callable, Tuple
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -14,38 +16,34 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-# P0-2: 导入超时配置; P1: 导入缓存 TTL 配置
-try:
-    from config import TIMEOUT_CONFIG, CACHE_TTL
-except ImportError:
-    # 如果 config.py 未更新，使用默认值
-    TIMEOUT_CONFIG = {
-        "default": (10, 30),
-        "akshare": (10, 20),
-        "fred": (10, 30),
-        "perplexity": (30, 90),
-        "yahoo": (10, 15),
-        "hkma": (10, 20),
-    }
-    CACHE_TTL = {
-        "cny_mid": 3600,
-        "cny_spot": 60,
-        "hkd": 60,
-        "fred": 300,
-        "global_fx": 60,
-        "news": 600,
-    }
-
-# SSL修复
-try:
-    _create_unverified_https_context = ssl._create_unverified_context
-except AttributeError:
-    pass
-else:
-    ssl._create_default_https_context = _create_unverified_https_context
+# config 在导入时读取环境变量，须在 load_dotenv 之后导入
+from config import (TIMEOUT_CONFIG, CACHE_TTL, CACHE_MAX_STALE, CACHE_CONFIG, STORAGE_CONFIG,
+                    ENDPOINTS, BREAKER_CONFIG, HEDGE_CONFIG, HIBOR_CONFIG, RELEASE_SCHEDULE,
+                    NEWS_DEDUP_CONFIG)
 
 import urllib3
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+_ssl_workaround_installed = False
+
+
+def _install_ssl_workaround() -> None:
+    """
+    SSL修复：首次发起网络请求前才替换全局 HTTPS 上下文（幂等）
+    
+    akshare / fredapi 内部使用 urllib，在部分代理环境下证书校验失败。
+    只导入本模块（如读取 DataContext 或缓存统计）不会修改进程的全局 SSL 设置。
+    """
+    global _ssl_workaround_installed
+    if _ssl_workaround_installed:
+        return
+    try:
+        _create_unverified_https_context = ssl._create_unverified_context
+    except AttributeError:
+        pass
+    else:
+        ssl._create_default_https_context = _create_unverified_https_context
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    _ssl_workaround_installed = True
 
 def create_retry_session(retries=3, backoff_factor=1):
     session = requests.Session()
@@ -63,51 +61,232 @@ def create_retry_session(retries=3, backoff_factor=1):
 RETRY_SESSION = create_retry_session()
 
 
+
 # ============================================================================
-# P1: 简单缓存模块
+# P1: 缓存模块（线程安全 TTL 缓存，见 cache.py）
 # ============================================================================
 
-import time as _time
 from typing import TypeVar
-
-_cache: Dict[str, Any] = {}
-_cache_time: Dict[str, float] = {}
+from cache import TTL, DiskCacheTier, TTLCache
+import metrics
 
 T = TypeVar('T')
 
-def get_with_cache(key: str, fetch_func: Callable[[], T], ttl_seconds: int) -> T:
+
+def _create_disk_tier() -> Optional[DiskCacheTier]:
+    """按 CACHE_CONFIG['disk_path'] 创建磁盘缓存层，未配置或创建失败时返回 None"""
+    path = CACHE_CONFIG.get("disk_path")
+    if not path:
+        return None
+    try:
+        return DiskCacheTier(path, lease_seconds=CACHE_CONFIG.get("disk_lease_seconds", 30))
+    except Exception as e:
+        print(f"磁盘缓存不可用，仅使用内存缓存: {e}")
+        return None
+
+
+DATA_CACHE = TTLCache(
+    max_entries=CACHE_CONFIG.get("max_entries", 256),
+    namespace_ttl=CACHE_TTL,
+    max_stale=CACHE_MAX_STALE,
+    disk=_create_disk_tier(),
+)
+metrics.bind_cache_stats(DATA_CACHE.stats)
+
+
+
+def get_with_cache(key: str, fetch_func: Callable[[], T], ttl_seconds: Optional[TTL] = None) -> T:
     """
-    带 TTL 的简单缓存
+    带 TTL 的缓存（线程安全，同 key 并发未命中只回源一次）
     
     Args:
-        key: 缓存键名
+        key: 缓存键名，前缀即命名空间（如 "fred_us10y" 属于 "fred"）
         fetch_func: 获取数据的函数
-        ttl_seconds: 缓存有效期（秒）
+        ttl_seconds: 缓存有效期（秒，或按条目计算的回调，见 _release_ttl），为 None 时按命名空间取 config.CACHE_TTL
         
     Returns:
         缓存的数据或新获取的数据
         
     TTL 推荐值（参考 config.CACHE_TTL）:
-    - 中间价 (cny_mid): 3600秒（9:15发布后整天不变）
-    - 实时汇率 (cny_spot): 60秒
-    - FRED 数据: 300秒
+    - 中间价 / HIBOR / FRED: 按 config.RELEASE_SCHEDULE 的发布时间过期
+    - 外汇行情快照 (forex_spot): 60秒
     - 新闻: 600秒
+    
+    config.CACHE_MAX_STALE 中的命名空间过期后先返回旧值并在后台刷新。
+    """
+    result = DATA_CACHE.lookup(key, fetch_func, ttl_seconds)
+    metrics.observe_cache_lookup(DATA_CACHE.namespace_of(key), result.status)
+    return result.value
+
+
+# ============================================================================
+# 按发布时间表过期（见 release_schedule.py）：定盘 / 官方序列在下一次发布前一直命中缓存，
+# 发布时刻一到即过期，不会在 9:15 之后继续返回前一日中间价
+# ============================================================================
+
+from release_schedule import build_schedules, schedule_expiry
+
+RELEASE_SCHEDULES = build_schedules(RELEASE_SCHEDULE)
+
+
+def _as_date(value: Any) -> date:
+    """'2026-10-16' / datetime.date / pd.Timestamp -> date"""
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def _index_latest_date(value: Any) -> date:
+    """以日期为索引的 Series / DataFrame 的最新观测日期（FRED 节假日的 NaN 占位同样算已发布）"""
+    return _as_date(value.index.max())
+
+
+def _release_ttl(key: str, latest_period: Callable[[Any], Optional[date]]) -> Optional[TTL]:
+    """
+    key 配置了发布时间表时返回有效期回调（latest_period 从缓存值中取最新观测日期），
+    否则返回 None，按命名空间取 CACHE_TTL
+    """
+    schedule = RELEASE_SCHEDULES.get(key)
+    return schedule_expiry(schedule, latest_period) if schedule is not None else None
+
+
+# ============================================================================
+# 熔断器（见 circuit_breaker.py）：上游连续失败后冷却期内直接跳过，备选数据源立即接手
+# ============================================================================
+
+from circuit_breaker import CircuitOpenError, all_breakers, configure as _configure_breakers, get_breaker
+
+_configure_breakers(**BREAKER_CONFIG)
+metrics.bind_circuit_breakers(all_breakers)
+
+
+def _is_empty(result: Any) -> bool:
+    """回源结果为 None 或空 DataFrame 时记为失败"""
+    return result is None or bool(getattr(result, "empty", False))
+
+
+def _guarded(source: str, func: Callable[..., T], *args, **kwargs) -> T:
+    """经 source 的熔断器调用 func；熔断中抛 CircuitOpenError"""
+    return get_breaker(source).call(func, *args, is_failure=_is_empty, **kwargs)
+
+
+def _retry_backoff(source: str, attempt: int, attempts: int = 3) -> bool:
+    """
+    重试循环的退避：还有重试机会且熔断器未打开时等待 2^attempt 秒并返回 True；
+    熔断器已打开（本次失败触发熔断）时不再等待，返回 False 让调用方结束重试
     """
-    now = _time.time()
-    if key in _cache and (now - _cache_time.get(key, 0)) < ttl_seconds:
-        return _cache[key]
+    if attempt >= attempts - 1 or get_breaker(source).is_open:
+        return False
+    time.sleep(2 ** attempt)
+    return True
+
+
+# ============================================================================
+# 采集耗时追踪（每次 _cached_fetch 记录一条 span）
+# ============================================================================
+
+# 缓存命名空间 -> 上游名称（用于 span 的 source 字段）
+SPAN_SOURCES = {
+    "cny_mid": "外管局(akshare)",
+    "forex_spot": "东方财富(akshare)",
+    "fred": "FRED",
+    "yahoo": "Yahoo",
+    "hibor": "金管局",
+    "news": "Perplexity",
+}
+
+_trace_local = threading.local()
+
+
+class _FetchTrace:
+    """单次回源的尝试次数与响应大小，由回源函数通过 _trace_* 登记"""
+    __slots__ = ("attempts", "bytes")
     
-    result = fetch_func()
-    _cache[key] = result
-    _cache_time[key] = now
-    return result
+    def __init__(self):
+        self.attempts = 0
+        self.bytes: Optional[int] = None
+
+
+def _current_trace() -> Optional[_FetchTrace]:
+    return getattr(_trace_local, "trace", None)
+
+
+def _trace_attempt() -> None:
+    """回源函数每发起一次请求调用一次"""
+    trace = _current_trace()
+    if trace is not None:
+        trace.attempts += 1
+
+
+def _trace_bytes(n: int) -> None:
+    trace = _current_trace()
+    if trace is not None:
+        trace.bytes = (trace.bytes or 0) + int(n)
+
+
+def _trace_response(resp: requests.Response) -> None:
+    """登记一次 HTTP 请求：urllib3 Retry 的重试历史计入尝试次数，响应体计入字节数"""
+    retries = getattr(getattr(resp, "raw", None), "retries", None)
+    history = getattr(retries, "history", None) or ()
+    trace = _current_trace()
+    if trace is not None:
+        trace.attempts += 1 + len(history)
+    _trace_bytes(len(resp.content))
+
+
+def _trace_frame(df) -> None:
+    """登记 akshare 返回的 DataFrame（无法取得网络字节数，记录其内存占用）"""
+    if df is not None:
+        _trace_bytes(df.memory_usage(deep=True).sum())
+
+
+def _cached_fetch(ctx: "DataContext", key: str, fetch_func: Callable[[], T],
+                  ttl_seconds: Optional[TTL] = None) -> T:
+    """
+    get_with_cache 的带状态版本
+    
+    - 返回过期旧值时在 ctx.stale_data 中登记
+    - 在 ctx.fetch_spans 中记录本次取数的来源、缓存状态、尝试次数、字节数和耗时
+    """
+    trace = _FetchTrace()
+    
+    def _traced_fetch():
+        _trace_local.trace = trace
+        try:
+            return fetch_func()
+        finally:
+            _trace_local.trace = None
+    
+    started = time.perf_counter()
+    try:
+        result = DATA_CACHE.lookup(key, _traced_fetch, ttl_seconds)
+    except Exception as e:
+        ctx.add_span(key, "miss", started, max(trace.attempts, 1), trace.bytes, error=str(e)[:80])
+        raise
+    metrics.observe_cache_lookup(DATA_CACHE.namespace_of(key), result.status)
+    if result.status == "stale":
+        ctx.stale_data[key] = int(result.age)
+    # 回源函数未自行登记尝试次数时，按一次计
+    attempts = max(trace.attempts, 1) if result.status == "miss" else trace.attempts
+    ctx.add_span(key, result.status, started, attempts, trace.bytes,
+                 error=None if result.value is not None else "无数据")
+    return result.value
+
+
+def _source_label(ctx: "DataContext", cache_key: str, source: str) -> str:
+    """数据来源标注；数据来自过期缓存时附加延迟说明"""
+    age = ctx.stale_data.get(cache_key)
+    if age is None:
+        return source
+    return f"{source}（缓存数据，{age}秒前，后台刷新中）"
 
 
 def clear_cache():
     """清除所有缓存（用于强制刷新）"""
-    global _cache, _cache_time
-    _cache = {}
-    _cache_time = {}
+    DATA_CACHE.clear()
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """返回缓存命中 / 未命中 / 淘汰计数"""
+    return DATA_CACHE.stats()
 
 
 class DataContext:
@@ -123,6 +302,39 @@ class DataContext:
         self.news_sources = []
         self.data_sources = {}
         self.errors = []
+        self.history = {}  # 本地快照存储计算的周环比 / 区间高低点（见 snapshot_store.py）
+        self.hibor = {}  # HIBOR 定盘日期 / 期限结构 / 趋势（见 _fetch_hibor）
+        self.stale_data = {}  # 返回过期缓存的 key -> 缓存年龄（秒）
+        self.fetch_spans: List[Dict[str, Any]] = []  # 每次取数的耗时记录（见 add_span）
+        self._started = time.perf_counter()
+    
+    def add_span(self, key: str, cache: str, started: float, attempts: int,
+                 nbytes: Optional[int] = None, error: Optional[str] = None) -> None:
+        """
+        记录一次取数
+        
+        Args:
+            key: 缓存键（如 "fred_us10y"）
+            cache: 缓存状态 hit / disk / miss / coalesced / stale（见 cache.CacheResult）
+            started: 开始时间（time.perf_counter()）
+            attempts: 实际发出的请求次数（含重试），命中缓存为 0
+            nbytes: 响应体字节数（akshare 为 DataFrame 内存占用），未知为 None
+            error: 失败原因，成功为 None
+        """
+        finished = time.perf_counter()
+        span = {
+            "key": key,
+            "source": SPAN_SOURCES.get(DATA_CACHE.namespace_of(key), key),
+            "cache": cache,
+            "attempts": attempts,
+            "bytes": nbytes,
+            "start_ms": round((started - self._started) * 1000, 1),
+            "duration_ms": round((finished - started) * 1000, 1),
+            "thread": threading.current_thread().name,
+            "error": error,
+        }
+        self.fetch_spans.append(span)
+        metrics.observe_fetch(span)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -132,11 +344,14 @@ class DataContext:
             "hkd": self.hkd,
             "global_fx": self.global_fx,
             "macro": self.macro,
+            "history": self.history,
+            "hibor": self.hibor,
             "news": self.news,
             "news_detail": self.news_detail,
             "news_sources": self.news_sources,
             "data_sources": self.data_sources,
             "errors": self.errors,
+            "fetch_spans": self.fetch_spans,
             "data_points": self._count_data_points()
         }
     
@@ -154,36 +369,213 @@ class DataContext:
 ProgressCallback = Callable[[int, int, str], None]
 
 
+# ============================================================================
+# 东方财富外汇行情快照（人民币 / 港元 / 全球外汇 / DXY 共用一份）
+# ============================================================================
+
+class ForexSpotSnapshot:
+    """
+    ak.forex_spot_em() 行情表的只读快照
+    
+    构建时按「代码」和「名称」预建索引，各数据消费方直接查表，
+    不再对整张 DataFrame 反复执行 str.contains 扫描。
+    """
+    
+    def __init__(self, df):
+        self.df = df
+        self._by_code: Dict[str, Dict[str, Any]] = {}
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+        for row in df.to_dict("records"):
+            code = row.get("代码")
+            name = row.get("名称")
+            if isinstance(code, str) and code.upper() not in self._by_code:
+                self._by_code[code.upper()] = row
+            if isinstance(name, str) and name not in self._by_name:
+                self._by_name[name] = row
+    
+    def by_code(self, code: str) -> Optional[Dict[str, Any]]:
+        """按代码查找（先精确匹配，再退化为子串匹配，不区分大小写）"""
+        code = code.upper()
+        row = self._by_code.get(code)
+        if row is None:
+            row = next((r for k, r in self._by_code.items() if code in k), None)
+        return row
+    
+    def by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        """按名称查找（先精确匹配，再退化为子串匹配）"""
+        row = self._by_name.get(name)
+        if row is None:
+            row = next((r for k, r in self._by_name.items() if name in k), None)
+        return row
+    
+    def price_by_code(self, code: str) -> Optional[float]:
+        row = self.by_code(code)
+        return float(row["最新价"]) if row is not None else None
+    
+    def price_by_name(self, name: str) -> Optional[float]:
+        row = self.by_name(name)
+        return float(row["最新价"]) if row is not None else None
+
+
+def _fetch_forex_spot_snapshot() -> Optional[ForexSpotSnapshot]:
+    import akshare as ak
+    
+    for attempt in range(3):
+        try:
+            _trace_attempt()
+            df = _guarded("eastmoney", ak.forex_spot_em)
+            _trace_frame(df)
+            if df is not None and not df.empty:
+                return ForexSpotSnapshot(df)
+        except CircuitOpenError:
+            break
+        except Exception:
+            pass
+        if not _retry_backoff("eastmoney", attempt):
+            break
+    return None
+
+
+def get_forex_spot_snapshot(ctx: Optional[DataContext] = None) -> Optional[ForexSpotSnapshot]:
+    """
+    获取共享的东方财富外汇行情快照（每个 TTL 周期只下载一次）
+    
+    并发调用方由缓存的单飞机制合并：第一个调用方负责下载，其余调用方等待同一结果，
+    不会重复请求同一张表。传入 ctx 时登记过期缓存状态。
+    """
+    if ctx is not None:
+        return _cached_fetch(ctx, "forex_spot", _fetch_forex_spot_snapshot, CACHE_TTL.get("forex_spot", 60))
+    return get_with_cache("forex_spot", _fetch_forex_spot_snapshot, CACHE_TTL.get("forex_spot", 60))
+
+
+# ============================================================================
+# 对冲请求（hedged fetch）：主数据源超过延迟预算未返回时并行请求备选数据源
+# ============================================================================
+
+# (数据源名称, 取值函数)；取值函数接收一个独立的 DataContext，返回 (数值, 来源标注)，无有效值时返回 None
+HedgeCandidate = Tuple[str, Callable[[DataContext], Optional[Tuple[float, str]]]]
+
+# 对冲请求专用线程池（首次对冲时创建）：落败的请求在后台自然结束（结果仍写入缓存），调用方不等待它
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="fxfuel-hedge")
+        return _hedge_pool
+
+
+def _hedge_context(ctx: DataContext) -> DataContext:
+    """对冲请求使用的独立上下文（span 起点与 ctx 对齐），完成后由调用方合并"""
+    scratch = DataContext()
+    scratch._started = ctx._started
+    return scratch
+
+
+def _merge_hedge_context(ctx: DataContext, scratch: DataContext) -> None:
+    ctx.fetch_spans.extend(scratch.fetch_spans)
+    ctx.stale_data.update(scratch.stale_data)
+    ctx.errors.extend(scratch.errors)
+
+
+def _hedged_fetch(ctx: DataContext, indicator: str, candidates: List[HedgeCandidate],
+                  budget: float) -> Tuple[Optional[Tuple[float, str]], List[str]]:
+    """
+    按优先级对冲请求多个数据源，返回 (第一个有效结果, 各数据源的错误信息)
+    
+    先只请求第一个数据源；它在 budget 秒内没有返回、或返回了无效值 / 异常时，立即请求下一个，
+    此后哪个先给出有效值（已在取值函数内做过范围校验）就用哪个。
+    主数据源命中缓存时通常在预算内返回，不会产生额外请求。
+    
+    每个数据源在独立的 DataContext 中运行，只有在返回前已完成的数据源的取数记录合并回 ctx；
+    落败后仍在运行的请求只填充缓存，不会在 ctx（可能已发布为共享快照）上留下任何修改。
+    """
+    pending = list(candidates)
+    running: Dict[Any, Tuple[str, DataContext]] = {}
+    errors: List[str] = []
+    hedged = False
+    pool = _get_hedge_pool()
+    
+    def _launch() -> None:
+        name, func = pending.pop(0)
+        scratch = _hedge_context(ctx)
+        running[pool.submit(func, scratch)] = (name, scratch)
+    
+    _launch()
+    while running or pending:
+        if not running:
+            hedged = True
+            _launch()
+            continue
+        done, _ = wait(list(running), timeout=budget if pending else None, return_when=FIRST_COMPLETED)
+        for future in done:
+            name, scratch = running.pop(future)
+            _merge_hedge_context(ctx, scratch)
+            try:
+                result = future.result()
+            except Exception as e:
+                errors.append(f"{name}: {str(e)[:40]}")
+                continue
+            if result is not None:
+                metrics.observe_hedge(indicator, name, hedged)
+                return result, errors
+            errors.append(f"{name}: 无有效数据")
+        if not done and pending:
+            # 超过延迟预算，备选数据源与主数据源并行
+            hedged = True
+            _launch()
+    
+    metrics.observe_hedge(indicator, "none", hedged)
+    return None, errors
+
+
 def fetch_cny_data(ctx: DataContext) -> str:
     """获取人民币数据"""
+    _install_ssl_workaround()
     try:
         import akshare as ak
         
         try:
-            # 使用缓存获取中间价（9:15发布后整天不变，缓存1小时）
+            # 使用缓存获取中间价（9:15 定盘后整天不变，缓存到下一个工作日 9:15）
             def _fetch_mid():
                 for attempt in range(3):
                     try:
-                        df = ak.currency_boc_safe()
+                        _trace_attempt()
+                        df = _guarded("safe", ak.currency_boc_safe)
+                        _trace_frame(df)
                         if df is not None and not df.empty and '美元' in df.columns:
                             return df
+                    except CircuitOpenError:
+                        break
                     except:
-                        if attempt < 2:
-                            time.sleep(2 ** attempt)
+                        pass
+                    if not _retry_backoff("safe", attempt):
+                        break
                 return None
             
-            mid_df = get_with_cache("cny_mid", _fetch_mid, CACHE_TTL.get("cny_mid", 3600))
+            mid_df = _cached_fetch(ctx, "cny_mid", _fetch_mid,
+                                   _release_ttl("cny_mid", lambda df: _as_date(df['日期'].iloc[-1])))
             
             if mid_df is not None and not mid_df.empty and '美元' in mid_df.columns:
                 usd_col = mid_df['美元'].astype(float) / 100
                 ctx.cny["usdcny_mid"] = round(float(usd_col.iloc[-1]), 4)
                 ctx.cny["usdcny_mid_date"] = str(mid_df['日期'].iloc[-1])
-                ctx.data_sources["usdcny_mid"] = "国家外汇管理局"
+                ctx.data_sources["usdcny_mid"] = _source_label(ctx, "cny_mid", "国家外汇管理局")
                 
                 recent = usd_col.tail(5)
                 ctx.cny["usdcny_mid_range"] = f"{round(recent.min(), 4)} - {round(recent.max(), 4)}"
                 ctx.cny["usdcny_mid_high"] = round(recent.max(), 4)
                 ctx.cny["usdcny_mid_low"] = round(recent.min(), 4)
+                
+                # 全量历史交给锚点引擎（只解析新增定盘），供报告提示词使用
+                try:
+                    from history_anchors import get_anchor_engine
+                    get_anchor_engine(STORAGE_CONFIG["data_dir"]).update_from_frame(mid_df)
+                except Exception as e:
+                    ctx.errors.append(f"历史锚点: {str(e)[:50]}")
             else:
                 # API 失败或数据无效，显式设置 None
                 ctx.cny["usdcny_mid"] = None
@@ -192,25 +584,14 @@ def fetch_cny_data(ctx: DataContext) -> str:
             ctx.cny["usdcny_mid"] = None
         
         try:
-            # 使用缓存获取离岸汇率（实时数据，缓存1分钟）
-            def _fetch_spot():
-                for attempt in range(3):
-                    try:
-                        df = ak.forex_spot_em()
-                        if df is not None and not df.empty:
-                            return df
-                    except:
-                        if attempt < 2:
-                            time.sleep(2 ** attempt)
-                return None
-            
-            fx_df = get_with_cache("cny_spot", _fetch_spot, CACHE_TTL.get("cny_spot", 60))
+            # 离岸汇率取自共享外汇行情快照（实时数据，缓存1分钟）
+            fx_snapshot = get_forex_spot_snapshot(ctx)
             
-            if fx_df is not None and not fx_df.empty:
-                cnh_row = fx_df[fx_df['代码'].str.contains('USDCNH', case=False, na=False)]
-                if not cnh_row.empty:
-                    ctx.cny["usdcnh_spot"] = float(cnh_row['最新价'].iloc[0])
-                    ctx.data_sources["usdcnh"] = "东方财富"
+            if fx_snapshot is not None:
+                usdcnh = fx_snapshot.price_by_code('USDCNH')
+                if usdcnh is not None:
+                    ctx.cny["usdcnh_spot"] = usdcnh
+                    ctx.data_sources["usdcnh"] = _source_label(ctx, "forex_spot", "东方财富")
                 else:
                     # 未找到 USDCNH 数据
                     ctx.cny["usdcnh_spot"] = None
@@ -240,101 +621,148 @@ def fetch_cny_data(ctx: DataContext) -> str:
         return "❌ 人民币数据获取失败"
 
 
+def _fetch_yahoo_chart(symbol: str, range_: str, headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """请求 Yahoo Finance chart 接口，非 200 返回 None（熔断中抛 CircuitOpenError）"""
+    breaker = get_breaker("yahoo")
+    
+    def _request():
+        resp = requests.get(
+            f"{ENDPOINTS['yahoo']}/v8/finance/chart/{symbol}?interval=1d&range={range_}",
+            headers=headers,
+            timeout=breaker.timeout(TIMEOUT_CONFIG["yahoo"])
+        )
+        _trace_response(resp)
+        if resp.status_code == 200:
+            return resp.json()
+        return None
+    
+    return breaker.call(_request, is_failure=_is_empty)
+
+
+def _fetch_hibor_page(params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """请求金管局 HIBOR 日度数据的一页（分页参数见 hibor_store.fetch_records），非 200 返回 None（熔断中抛 CircuitOpenError）"""
+    breaker = get_breaker("hkma")
+    headers = {"User-Agent": "Mozilla/5.0"}
+    url = f"{ENDPOINTS['hkma']}/public/market-data-and-statistics/monthly-statistical-bulletin/er-ir/hk-interbank-ir-daily"
+    
+    def _request():
+        resp = RETRY_SESSION.get(url, params=params, headers=headers,
+                                 timeout=breaker.timeout(TIMEOUT_CONFIG["hkma"]), verify=False)
+        _trace_response(resp)
+        if resp.status_code == 200:
+            return resp.json()
+        return None
+    
+    return breaker.call(_request, is_failure=_is_empty)
+
+
+def _hibor_store():
+    from hibor_store import get_hibor_store
+    return get_hibor_store(
+        STORAGE_CONFIG["data_dir"], _fetch_hibor_page,
+        backfill_days=HIBOR_CONFIG["backfill_days"],
+        page_size=HIBOR_CONFIG["page_size"],
+        overlap_days=HIBOR_CONFIG["overlap_days"],
+    )
+
+
+def _fetch_hibor(ctx: DataContext) -> None:
+    """
+    HIBOR 最新定盘写入 ctx.hkd，定盘日期、期限结构与近期走势写入 ctx.hibor
+    
+    回源失败时若本地存储有历史记录，使用本地最新定盘并在来源中注明日期，错误照常登记。
+    """
+    from hibor_store import term_structure, trends
+    store = _hibor_store()
+    source = None
+    try:
+        frame = _cached_fetch(ctx, "hibor", store.refresh, _release_ttl("hibor", _index_latest_date))
+    except Exception as e:
+        frame = store.load_local()
+        if frame is None or frame.empty:
+            raise
+        ctx.errors.append(f"HIBOR: {str(e)[:40]}")
+        source = f"香港金管局（本地存储，截至{frame.index.max():%Y-%m-%d}）"
+    
+    if frame is None or frame.empty:
+        # API 成功但没有记录，显式设置 None
+        if "hibor_overnight" not in ctx.hkd:
+            ctx.hkd["hibor_overnight"] = None
+        return
+    
+    structure = term_structure(frame)
+    ctx.hkd["hibor_overnight"] = structure.get("overnight")
+    ctx.hkd["hibor_1w"] = structure.get("1w")
+    ctx.hkd["hibor_1m"] = structure.get("1m")
+    # 定盘日期、完整期限结构与趋势放在独立的 hibor 段，hkd 段只保留标量数值（见 _count_data_points）
+    ctx.hibor = {
+        "date": f"{frame.index.max():%Y-%m-%d}",
+        "term_structure": structure,
+        "trend": trends(frame),
+    }
+    if ctx.hkd["hibor_overnight"] is not None:
+        ctx.data_sources["hibor"] = source or _source_label(ctx, "hibor", "香港金管局")
+
+
 def fetch_hkd_data(ctx: DataContext) -> str:
     """获取港元数据"""
-    hkd_found = False
+    _install_ssl_workaround()
+    
+    # 方法1: 东方财富外汇行情（共享快照，1分钟TTL）
+    def _from_eastmoney(ctx: DataContext) -> Optional[Tuple[float, str]]:
+        fx_snapshot = get_forex_spot_snapshot(ctx)
+        if fx_snapshot is not None:
+            usdhkd = fx_snapshot.price_by_code('USDHKD')
+            if usdhkd is not None and 7.7 <= usdhkd <= 7.9:
+                return usdhkd, _source_label(ctx, "forex_spot", "东方财富")
+        return None
+    
+    # 方法2: Yahoo Finance 备选
+    def _from_yahoo(ctx: DataContext) -> Optional[Tuple[float, str]]:
+        data = _cached_fetch(
+            ctx, "yahoo_HKDUSD=X",
+            lambda: _fetch_yahoo_chart("HKDUSD=X", "1d", {"User-Agent": "Mozilla/5.0"}),
+        )
+        if data and 'chart' in data and 'result' in data['chart'] and data['chart']['result']:
+            meta = data['chart']['result'][0].get('meta', {})
+            hkdusd = meta.get('regularMarketPrice') or meta.get('previousClose')
+            if hkdusd:
+                usdhkd = round(1 / float(hkdusd), 4)
+                if 7.7 <= usdhkd <= 7.9:
+                    return usdhkd, _source_label(ctx, "yahoo_HKDUSD=X", "Yahoo Finance")
+        return None
     
     try:
-        import akshare as ak
-        
-        # 方法1: 东方财富外汇行情（使用缓存，1分钟TTL）
-        try:
-            def _fetch_hkd_spot():
-                for attempt in range(3):
-                    try:
-                        df = ak.forex_spot_em()
-                        if df is not None and not df.empty:
-                            return df
-                    except Exception as e:
-                        if attempt < 2:
-                            time.sleep(2 ** attempt)
-                return None
-            
-            fx_df = get_with_cache("hkd_spot", _fetch_hkd_spot, CACHE_TTL.get("hkd", 60))
-            
-            if fx_df is not None and not fx_df.empty:
-                hkd_row = fx_df[fx_df['代码'].str.contains('USDHKD', case=False, na=False)]
-                if not hkd_row.empty:
-                    usdhkd = float(hkd_row['最新价'].iloc[0])
-                    ctx.hkd["usdhkd"] = usdhkd
-                    ctx.data_sources["usdhkd"] = "东方财富"
-                    hkd_found = True
-                    
-                    if usdhkd <= 7.77:
-                        ctx.hkd["lers_position"] = "强方区间（接近7.75强方保证）"
-                    elif usdhkd >= 7.83:
-                        ctx.hkd["lers_position"] = "弱方区间（接近7.85弱方保证）"
-                    else:
-                        ctx.hkd["lers_position"] = "中间区间"
-        except Exception as e:
-            ctx.errors.append(f"港元(东方财富): {str(e)[:50]}")
-        
-        # 方法2: Yahoo Finance 备选
-        if not hkd_found:
-            try:
-                headers = {"User-Agent": "Mozilla/5.0"}
-                resp = requests.get(
-                    "https://query1.finance.yahoo.com/v8/finance/chart/HKDUSD=X?interval=1d&range=1d",
-                    headers=headers,
-                    timeout=TIMEOUT_CONFIG["yahoo"]
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    if 'chart' in data and 'result' in data['chart'] and data['chart']['result']:
-                        meta = data['chart']['result'][0].get('meta', {})
-                        hkdusd = meta.get('regularMarketPrice') or meta.get('previousClose')
-                        if hkdusd:
-                            usdhkd = round(1 / float(hkdusd), 4)
-                            if 7.7 <= usdhkd <= 7.9:
-                                ctx.hkd["usdhkd"] = usdhkd
-                                ctx.data_sources["usdhkd"] = "Yahoo Finance"
-                                hkd_found = True
-            except Exception as e:
-                ctx.errors.append(f"港元(Yahoo): {str(e)[:40]}")
-        
-        if not hkd_found:
+        # 东方财富超过延迟预算未返回时并行请求 Yahoo，先拿到有效值的胜出
+        result, errors = _hedged_fetch(
+            ctx, "usdhkd", [("东方财富", _from_eastmoney), ("Yahoo", _from_yahoo)],
+            HEDGE_CONFIG.get("usdhkd", 0.3),
+        )
+        if result is not None:
+            usdhkd, source = result
+            ctx.hkd["usdhkd"] = usdhkd
+            ctx.data_sources["usdhkd"] = source
+            if usdhkd <= 7.77:
+                ctx.hkd["lers_position"] = "强方区间（接近7.75强方保证）"
+            elif usdhkd >= 7.83:
+                ctx.hkd["lers_position"] = "弱方区间（接近7.85弱方保证）"
+            else:
+                ctx.hkd["lers_position"] = "中间区间"
+        else:
+            ctx.errors.extend(f"港元({e})" for e in errors)
             ctx.errors.append("USD/HKD: 所有数据源失败")
             ctx.hkd["usdhkd"] = None  # 显式设置 None
         
-        # HIBOR 从金管局获取
+        # HIBOR 从金管局获取：本地存储只增量分页拉取新记录，缓存按定盘发布时间过期
         try:
-            headers = {"User-Agent": "Mozilla/5.0"}
-            url = "https://api.hkma.gov.hk/public/market-data-and-statistics/monthly-statistical-bulletin/er-ir/hk-interbank-ir-daily"
-            resp = RETRY_SESSION.get(url, headers=headers, timeout=TIMEOUT_CONFIG["hkma"], verify=False)
-            if resp.status_code == 200:
-                data = resp.json()
-                if 'result' in data and 'records' in data['result'] and data['result']['records']:
-                    latest = data['result']['records'][0]
-                    if 'ir_overnight' in latest:
-                        ctx.hkd["hibor_overnight"] = float(latest['ir_overnight'])
-                        ctx.data_sources["hibor"] = "香港金管局"
-                    if 'ir_1week' in latest:
-                        ctx.hkd["hibor_1w"] = float(latest['ir_1week'])
-                    if 'ir_1month' in latest:
-                        ctx.hkd["hibor_1m"] = float(latest['ir_1month'])
-            else:
-                # API 成功但数据格式不正确，显式设置 None
-                if "hibor_overnight" not in ctx.hkd:
-                    ctx.hkd["hibor_overnight"] = None
+            _fetch_hibor(ctx)
         except Exception as e:
             ctx.errors.append(f"HIBOR: {str(e)[:40]}")
             # API 失败，显式设置 None
             if "hibor_overnight" not in ctx.hkd:
                 ctx.hkd["hibor_overnight"] = None
         
-        # 计算港美利差（只有在两个值都不为 None 时才计算）
-        if ctx.hkd.get("hibor_overnight") is not None and ctx.macro.get("fed_rate") is not None:
-            ctx.hkd["hkd_usd_spread"] = round(ctx.hkd["hibor_overnight"] - ctx.macro["fed_rate"], 2)
+        # 港美利差依赖 FRED 的 fed_rate，统一在 calculate_metrics 中计算（并行采集时 FRED 可能尚未返回）
         
         result = f"✅ 港元: {ctx.hkd.get('usdhkd', 'N/A')}"
         if ctx.hkd.get("hibor_overnight"):
@@ -351,89 +779,73 @@ def fetch_dxy_direct(ctx: DataContext) -> bool:
     
     数据源:
     1. Yahoo Finance DX-Y.NYB (ICE美元指数期货)
-    2. 东方财富全球指数
+    2. 东方财富全球指数（Yahoo 超过 HEDGE_CONFIG["dxy"] 秒未返回或失败时并行请求）
     
     注意：不使用FRED贸易加权指数（范围100-130，与ICE DXY不同）
     """
+    _install_ssl_workaround()
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
         "Accept": "application/json, text/plain, */*"
     }
     
     # 方案1: Yahoo Finance - DX-Y.NYB (ICE美元指数期货)
-    try:
-        resp = requests.get(
-            "https://query1.finance.yahoo.com/v8/finance/chart/DX-Y.NYB?interval=1d&range=5d",
-            headers=headers,
-            timeout=TIMEOUT_CONFIG["yahoo"]
-        )
-        if resp.status_code == 200:
-            data = resp.json()
-            if 'chart' in data and 'result' in data['chart'] and data['chart']['result']:
-                result = data['chart']['result'][0]
-                meta = result.get('meta', {})
-                price = meta.get('regularMarketPrice') or meta.get('previousClose')
-                if price:
-                    dxy_val = round(float(price), 2)
-                    if 90 <= dxy_val <= 115:  # ICE DXY 正常范围
-                        ctx.global_fx["dxy"] = dxy_val
-                        ctx.data_sources["dxy"] = "Yahoo(ICE)"
-                        return True
-                # 备选：从 indicators 获取
-                indicators = result.get('indicators', {})
-                quote = indicators.get('quote', [{}])[0]
-                closes = quote.get('close', [])
-                if closes:
-                    for c in reversed(closes):
-                        if c is not None:
-                            dxy_val = round(float(c), 2)
-                            if 90 <= dxy_val <= 115:
-                                ctx.global_fx["dxy"] = dxy_val
-                                ctx.data_sources["dxy"] = "Yahoo(ICE)"
-                                return True
-                            break
-    except Exception as e:
-        ctx.errors.append(f"DXY(Yahoo): {str(e)[:40]}")
+    def _from_yahoo(ctx: DataContext) -> Optional[Tuple[float, str]]:
+        data = _cached_fetch(ctx, "yahoo_DX-Y.NYB", lambda: _fetch_yahoo_chart("DX-Y.NYB", "5d", headers))
+        if not (data and 'chart' in data and 'result' in data['chart'] and data['chart']['result']):
+            return None
+        result = data['chart']['result'][0]
+        meta = result.get('meta', {})
+        price = meta.get('regularMarketPrice') or meta.get('previousClose')
+        if price:
+            dxy_val = round(float(price), 2)
+            if 90 <= dxy_val <= 115:  # ICE DXY 正常范围
+                return dxy_val, _source_label(ctx, "yahoo_DX-Y.NYB", "Yahoo(ICE)")
+        # 备选：从 indicators 获取最后一个有效收盘价
+        quote = result.get('indicators', {}).get('quote', [{}])[0]
+        closes = [c for c in quote.get('close', []) if c is not None]
+        if closes:
+            dxy_val = round(float(closes[-1]), 2)
+            if 90 <= dxy_val <= 115:
+                return dxy_val, _source_label(ctx, "yahoo_DX-Y.NYB", "Yahoo(ICE)")
+        return None
     
-    # 方案2: 东方财富全球指数（尝试多个可能的接口）
-    try:
+    # 方案2: 东方财富全球指数，接口不可用时退化为外汇行情快照中的「美元指数」
+    def _from_eastmoney(ctx: DataContext) -> Optional[Tuple[float, str]]:
         import akshare as ak
         df = None
-        # 尝试不同的接口
-        for method_name in ['index_global_em', 'tool_trade_date_hist_sina']:
-            try:
-                if hasattr(ak, method_name):
-                    if method_name == 'index_global_em':
-                        df = ak.index_global_em()
-                    break
-            except:
-                continue
-        
-        # 如果上述方法都失败，尝试从外汇数据中获取
-        if df is None or df.empty:
+        if hasattr(ak, 'index_global_em'):
             try:
-                fx_df = ak.forex_spot_em()
-                if fx_df is not None and not fx_df.empty:
-                    dxy_row = fx_df[fx_df['名称'].str.contains('美元指数', na=False)]
-                    if not dxy_row.empty:
-                        dxy_val = round(float(dxy_row['最新价'].iloc[0]), 2)
-                        if 90 <= dxy_val <= 115:
-                            ctx.global_fx["dxy"] = dxy_val
-                            ctx.data_sources["dxy"] = "东方财富"
-                            return True
-            except:
-                pass
+                df = _guarded("eastmoney", ak.index_global_em)
+            except Exception:
+                df = None
         
         if df is not None and not df.empty:
             dxy_row = df[df['名称'].str.contains('美元指数', na=False)]
             if not dxy_row.empty:
                 dxy_val = round(float(dxy_row['最新价'].iloc[0]), 2)
                 if 90 <= dxy_val <= 115:
-                    ctx.global_fx["dxy"] = dxy_val
-                    ctx.data_sources["dxy"] = "东方财富"
-                    return True
-    except Exception as e:
-        ctx.errors.append(f"DXY(东方财富): {str(e)[:40]}")
+                    # index_global_em 每次实时请求，不经过 forex_spot 缓存，不附加缓存延迟说明
+                    return dxy_val, "东方财富"
+        
+        fx_snapshot = get_forex_spot_snapshot(ctx)
+        if fx_snapshot is not None:
+            dxy_price = fx_snapshot.price_by_name('美元指数')
+            if dxy_price is not None:
+                dxy_val = round(dxy_price, 2)
+                if 90 <= dxy_val <= 115:
+                    return dxy_val, _source_label(ctx, "forex_spot", "东方财富")
+        return None
+    
+    # Yahoo 超过延迟预算未返回时并行请求东方财富，先拿到范围内有效值的胜出
+    result, errors = _hedged_fetch(
+        ctx, "dxy", [("Yahoo", _from_yahoo), ("东方财富", _from_eastmoney)],
+        HEDGE_CONFIG.get("dxy", 0.3),
+    )
+    if result is not None:
+        ctx.global_fx["dxy"], ctx.data_sources["dxy"] = result
+        return True
+    ctx.errors.extend(f"DXY({e})" for e in errors)
     
     # 不使用FRED贸易加权指数，因为范围不同会误导用户
     ctx.errors.append("DXY: ICE美元指数获取失败")
@@ -443,26 +855,14 @@ def fetch_dxy_direct(ctx: DataContext) -> bool:
 
 def fetch_global_fx(ctx: DataContext) -> str:
     """获取全球外汇数据（包括DXY）"""
+    _install_ssl_workaround()
     try:
-        import akshare as ak
-        
-        # 使用缓存获取全球外汇数据（1分钟TTL）
-        def _fetch_global_spot():
-            for attempt in range(3):
-                try:
-                    df = ak.forex_spot_em()
-                    if df is not None and not df.empty:
-                        return df
-                except:
-                    if attempt < 2:
-                        time.sleep(2 ** attempt)
-            return None
-        
-        fx_df = get_with_cache("global_fx", _fetch_global_spot, CACHE_TTL.get("global_fx", 60))
+        # 全球外汇取自共享外汇行情快照（1分钟TTL）
+        fx_snapshot = get_forex_spot_snapshot(ctx)
         
         found = []
         
-        if fx_df is not None and not fx_df.empty:
+        if fx_snapshot is not None:
             pairs = {
                 "EURUSD": "eurusd",
                 "USDJPY": "usdjpy", 
@@ -474,21 +874,21 @@ def fetch_global_fx(ctx: DataContext) -> str:
             
             for code, key in pairs.items():
                 try:
-                    row = fx_df[fx_df['代码'].str.contains(code, case=False, na=False)]
-                    if not row.empty:
-                        ctx.global_fx[key] = float(row['最新价'].iloc[0])
+                    price = fx_snapshot.price_by_code(code)
+                    if price is not None:
+                        ctx.global_fx[key] = price
                         found.append(code)
                 except:
                     pass
             
             # 尝试从东方财富获取DXY
             try:
-                dxy_row = fx_df[fx_df['名称'].str.contains('美元指数', na=False)]
-                if not dxy_row.empty:
-                    dxy_val = round(float(dxy_row['最新价'].iloc[0]), 2)
+                dxy_price = fx_snapshot.price_by_name('美元指数')
+                if dxy_price is not None:
+                    dxy_val = round(dxy_price, 2)
                     if 80 <= dxy_val <= 120:
                         ctx.global_fx["dxy"] = dxy_val
-                        ctx.data_sources["dxy"] = "东方财富"
+                        ctx.data_sources["dxy"] = _source_label(ctx, "forex_spot", "东方财富")
                         found.append("DXY")
             except:
                 pass
@@ -512,28 +912,48 @@ def fetch_global_fx(ctx: DataContext) -> str:
         return "❌ 全球外汇获取失败"
 
 
+# FRED 序列：缓存 key 后缀 -> series_id
+FRED_SERIES = {
+    "us10y": "DGS10",
+    "us2y": "DGS2",
+    "vix": "VIXCLS",
+    "ffr": "FEDFUNDS",
+}
+
+
 def fetch_fred_data(ctx: DataContext) -> str:
-    """获取 FRED 宏观数据"""
+    """
+    获取 FRED 宏观数据
+    
+    4 个序列并行拉取；FredSeriesClient 在本地保存历史，刷新时只请求最近的观测值。
+    """
+    _install_ssl_workaround()
     fred_key = os.getenv("FRED_API_KEY")
     if not fred_key:
         ctx.errors.append("FRED_API_KEY 未配置")
         return "⚠️ FRED 未配置"
     
     try:
-        from fredapi import Fred
-        fred = Fred(api_key=fred_key)
+        from fred_client import get_fred_client, latest_value
+        client = get_fred_client(fred_key, os.path.join(STORAGE_CONFIG["data_dir"], "fred"), ENDPOINTS["fred"])
         results = []
         
-        # 使用缓存获取 FRED 数据（缓存5分钟）
-        fred_ttl = CACHE_TTL.get("fred", 300)
+        # 使用缓存获取 FRED 数据（日度 / 月度序列各自缓存到下一次发布）
+        with ThreadPoolExecutor(max_workers=len(FRED_SERIES), thread_name_prefix="fxfuel-fred") as executor:
+            futures = {
+                name: executor.submit(
+                    _cached_fetch, ctx, f"fred_{name}",
+                    lambda series_id=series_id: _guarded("fred", client.get_series, series_id),
+                    _release_ttl(f"fred_{name}", _index_latest_date)
+                )
+                for name, series_id in FRED_SERIES.items()
+            }
         
         try:
-            def _fetch_us10y():
-                return fred.get_series_latest_release("DGS10")
-            us10y = get_with_cache("fred_us10y", _fetch_us10y, fred_ttl)
-            if us10y is not None and not us10y.empty:
-                ctx.macro["us10y"] = round(float(us10y.iloc[-1]), 2)
-                ctx.data_sources["us10y"] = "FRED"
+            us10y = latest_value(futures["us10y"].result())
+            if us10y is not None:
+                ctx.macro["us10y"] = round(us10y, 2)
+                ctx.data_sources["us10y"] = _source_label(ctx, "fred_us10y", "FRED")
                 results.append("10Y")
             else:
                 ctx.macro["us10y"] = None
@@ -542,11 +962,10 @@ def fetch_fred_data(ctx: DataContext) -> str:
             ctx.macro["us10y"] = None
         
         try:
-            def _fetch_us2y():
-                return fred.get_series_latest_release("DGS2")
-            us2y = get_with_cache("fred_us2y", _fetch_us2y, fred_ttl)
-            if us2y is not None and not us2y.empty:
-                ctx.macro["us2y"] = round(float(us2y.iloc[-1]), 2)
+            us2y = latest_value(futures["us2y"].result())
+            if us2y is not None:
+                ctx.macro["us2y"] = round(us2y, 2)
+                ctx.data_sources["us2y"] = _source_label(ctx, "fred_us2y", "FRED")
                 results.append("2Y")
             else:
                 ctx.macro["us2y"] = None
@@ -559,13 +978,11 @@ def fetch_fred_data(ctx: DataContext) -> str:
             ctx.macro["yield_curve"] = round(ctx.macro["us10y"] - ctx.macro["us2y"], 2)
         
         try:
-            def _fetch_vix():
-                return fred.get_series_latest_release("VIXCLS")
-            vix = get_with_cache("fred_vix", _fetch_vix, fred_ttl)
-            if vix is not None and not vix.empty:
-                vix_val = round(float(vix.iloc[-1]), 2)
+            vix = latest_value(futures["vix"].result())
+            if vix is not None:
+                vix_val = round(vix, 2)
                 ctx.macro["vix"] = vix_val
-                ctx.data_sources["vix"] = "CBOE/FRED"
+                ctx.data_sources["vix"] = _source_label(ctx, "fred_vix", "CBOE/FRED")
                 results.append("VIX")
                 
                 if vix_val < 15:
@@ -583,11 +1000,10 @@ def fetch_fred_data(ctx: DataContext) -> str:
             ctx.macro["vix"] = None
         
         try:
-            def _fetch_ffr():
-                return fred.get_series_latest_release("FEDFUNDS")
-            ffr = get_with_cache("fred_ffr", _fetch_ffr, fred_ttl)
-            if ffr is not None and not ffr.empty:
-                ctx.macro["fed_rate"] = round(float(ffr.iloc[-1]), 2)
+            ffr = latest_value(futures["ffr"].result())
+            if ffr is not None:
+                ctx.macro["fed_rate"] = round(ffr, 2)
+                ctx.data_sources["fed_rate"] = _source_label(ctx, "fred_ffr", "FRED")
                 results.append("FedRate")
             else:
                 ctx.macro["fed_rate"] = None
@@ -868,10 +1284,71 @@ def _parse_news_response(content: str, citations: list, category: str) -> list[d
     return news_items
 
 
+# ============================================================================
+# 连接池（长连接 Session，跨调用复用）
+# ============================================================================
+
+_perplexity_sessions: Dict[Any, requests.Session] = {}
+_perplexity_session_lock = threading.Lock()
+
+
+def _get_perplexity_proxies(ctx) -> Optional[Dict[str, str]]:
+    """根据环境变量构造 Perplexity 请求使用的代理（SOCKS5 优先，其次 HTTP/HTTPS）"""
+    socks5_proxy = os.getenv("SOCKS5_PROXY")
+    http_proxy = os.getenv("HTTP_PROXY") or os.getenv("http_proxy")
+    https_proxy = os.getenv("HTTPS_PROXY") or os.getenv("https_proxy")
+    
+    if socks5_proxy:
+        try:
+            import socks
+            if not socks5_proxy.startswith("socks5://"):
+                socks5_url = f"socks5h://{socks5_proxy}"
+            else:
+                socks5_url = socks5_proxy.replace("socks5://", "socks5h://")
+            return {"http": socks5_url, "https": socks5_url}
+        except ImportError:
+            ctx.errors.append("需要: pip install requests[socks]")
+    elif http_proxy or https_proxy:
+        return {"http": http_proxy, "https": https_proxy or http_proxy}
+    return None
+
+
+def _get_perplexity_session(proxies: Optional[Dict[str, str]]) -> requests.Session:
+    """
+    获取长连接 Session（按代理配置复用）
+    
+    连接池大小覆盖 3 个并行分类查询，TLS 握手与代理连接在多次采集之间复用。
+    """
+    key = tuple(sorted(proxies.items())) if proxies else None
+    with _perplexity_session_lock:
+        session = _perplexity_sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=len(PERPLEXITY_CATEGORIES))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            if proxies:
+                session.proxies.update(proxies)
+            _perplexity_sessions[key] = session
+        return session
+
+
 # ============================================================================
 # 主函数
 # ============================================================================
 
+PERPLEXITY_CATEGORIES = ("POLICY", "MACRO", "CNY")
+
+
+def _news_index():
+    from news_dedup import get_news_index
+    return get_news_index(
+        STORAGE_CONFIG["data_dir"],
+        retention_days=NEWS_DEDUP_CONFIG["retention_days"],
+        threshold=NEWS_DEDUP_CONFIG["threshold"],
+    )
+
+
 def fetch_perplexity_news_v2(ctx) -> str:
     """
     使用 Perplexity API 获取外汇相关新闻（重构版）
@@ -880,6 +1357,7 @@ def fetch_perplexity_news_v2(ctx) -> str:
     1. 分 3 类查询：央行政策、地缘宏观、人民币港元
     2. Prompt 导向分析而非数据播报
     3. 明确排除野鸡源
+    4. 3 类查询并行发出，共用长连接 Session，总耗时约等于最慢的一类
     
     Args:
         ctx: DataContext 对象
@@ -887,6 +1365,7 @@ def fetch_perplexity_news_v2(ctx) -> str:
     Returns:
         状态消息字符串
     """
+    _install_ssl_workaround()
     api_key = os.getenv("PERPLEXITY_API_KEY")
     if not api_key:
         ctx.errors.append("PERPLEXITY_API_KEY 未配置")
@@ -906,23 +1385,7 @@ def fetch_perplexity_news_v2(ctx) -> str:
     week_ago_cn = week_ago.strftime("%Y年%m月%d日")
     
     # 配置代理
-    proxies = None
-    socks5_proxy = os.getenv("SOCKS5_PROXY")
-    http_proxy = os.getenv("HTTP_PROXY") or os.getenv("http_proxy")
-    https_proxy = os.getenv("HTTPS_PROXY") or os.getenv("https_proxy")
-    
-    if socks5_proxy:
-        try:
-            import socks
-            if not socks5_proxy.startswith("socks5://"):
-                socks5_url = f"socks5h://{socks5_proxy}"
-            else:
-                socks5_url = socks5_proxy.replace("socks5://", "socks5h://")
-            proxies = {"http": socks5_url, "https": socks5_url}
-        except ImportError:
-            ctx.errors.append("需要: pip install requests[socks]")
-    elif http_proxy or https_proxy:
-        proxies = {"http": http_proxy, "https": https_proxy or http_proxy}
+    proxies = _get_perplexity_proxies(ctx)
     
     # 准备 3 个查询
     queries = [
@@ -931,51 +1394,75 @@ def fetch_perplexity_news_v2(ctx) -> str:
         ("CNY", _get_prompt_cny_hkd(week_ago_cn, today_cn)),
     ]
     
-    all_news = []
-    stats = {"POLICY": 0, "MACRO": 0, "CNY": 0}
-    
-    session = requests.Session()
+    session = _get_perplexity_session(proxies)
+    breaker = get_breaker("perplexity")
     news_ttl = CACHE_TTL.get("news", 600)  # 新闻缓存 10 分钟
     
-    for category, payload in queries:
-        try:
-            # 使用缓存获取新闻（避免短时间内重复请求烧钱）
-            cache_key = f"news_{category}_{today_date.strftime('%Y%m%d')}"
-            
-            def _fetch_news():
-                resp = session.post(
-                    "https://api.perplexity.ai/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=TIMEOUT_CONFIG.get("perplexity", (30, 90)),
-                    verify=False,  # 为兼容代理环境
-                    proxies=proxies
-                )
-                if resp.status_code == 200:
-                    return resp.json()
-                return None
-            
-            result = get_with_cache(cache_key, _fetch_news, news_ttl)
-            
-            if result:
-                content = result['choices'][0]['message']['content']
-                citations = result.get('citations', [])
-                if not citations:
-                    citations = result['choices'][0].get('message', {}).get('citations', [])
-                
-                news_items = _parse_news_response(content, citations, category)
+    def _query_category(category: str, payload: dict) -> list:
+        """查询单个分类；失败时抛出异常，由调用方记入 ctx.errors"""
+        # 使用缓存获取新闻（避免短时间内重复请求烧钱）
+        cache_key = f"news_{category}_{today_date.strftime('%Y%m%d')}"
+        
+        def _request():
+            resp = session.post(
+                f"{ENDPOINTS['perplexity']}/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=breaker.timeout(TIMEOUT_CONFIG.get("perplexity", (30, 90))),
+                verify=False,  # 为兼容代理环境
+                proxies=proxies
+            )
+            _trace_response(resp)
+            if resp.status_code == 200:
+                return resp.json()
+            return None
+        
+        def _fetch_news():
+            return breaker.call(_request, is_failure=_is_empty)
+        
+        result = _cached_fetch(ctx, cache_key, _fetch_news, news_ttl)
+        if not result:
+            raise RuntimeError("请求失败")
+        
+        content = result['choices'][0]['message']['content']
+        citations = result.get('citations', [])
+        if not citations:
+            citations = result['choices'][0].get('message', {}).get('citations', [])
+        
+        return _parse_news_response(content, citations, category)
+    
+    all_news = []
+    stats = {category: 0 for category in PERPLEXITY_CATEGORIES}
+    
+    with ThreadPoolExecutor(max_workers=len(queries), thread_name_prefix="fxfuel-news") as executor:
+        futures = [(category, executor.submit(_query_category, category, payload))
+                   for category, payload in queries]
+        # 按固定分类顺序汇总，保证新闻编号稳定；单个分类失败不影响其他分类
+        for category, future in futures:
+            try:
+                news_items = future.result()
                 all_news.extend(news_items)
                 stats[category] = len(news_items)
-            else:
-                ctx.errors.append(f"Perplexity {category}: 请求失败")
-                
-        except Exception as e:
-            ctx.errors.append(f"Perplexity {category}: {str(e)[:50]}")
+            except Exception as e:
+                ctx.errors.append(f"Perplexity {category}: {str(e)[:50]}")
+    
+    # 去重：同一事件出现在多个分类时合并为一条；前几天已报道过的事件标注首次出现日期
+    from news_dedup import merge_duplicates
+    collected = len(all_news)
+    all_news = merge_duplicates(all_news, NEWS_DEDUP_CONFIG["threshold"], NEWS_DEDUP_CONFIG["max_urls"])
+    merged = collected - len(all_news)
+    try:
+        repeated = _news_index().annotate(all_news)
+    except OSError as e:
+        repeated = 0
+        print(f"⚠️ 新闻跨日索引不可用: {e}")
     
     # 存储到 ctx
     for item in all_news:
-        # 格式化标题：[分类] 标题
+        # 格式化标题：[分类] 标题（合并的新闻为 [POLICY/MACRO]；此前已报道过的加注首次出现日期）
         formatted_title = f"[{item['category']}] {item['title']}"
+        if item.get("first_seen"):
+            formatted_title += f"（{item['first_seen'][5:]} 起持续报道）"
         ctx.news.append(formatted_title)
         ctx.news_detail.append(item['summary'])
         ctx.news_sources.append(item['urls'])
@@ -983,7 +1470,10 @@ def fetch_perplexity_news_v2(ctx) -> str:
     ctx.data_sources["news"] = "Perplexity(Policy+Macro+CNY)"
     
     total = len(all_news)
-    return f"✅ 新闻: {total}条 (政策:{stats['POLICY']} 宏观:{stats['MACRO']} 人民币:{stats['CNY']})"
+    dedup_note = f"，合并重复 {merged} 条" if merged else ""
+    if repeated:
+        dedup_note += f"，{repeated} 条前几天已报道"
+    return f"✅ 新闻: {total}条 (政策:{stats['POLICY']} 宏观:{stats['MACRO']} 人民币:{stats['CNY']}{dedup_note})"
 
 
 # ============================================================================
@@ -1016,32 +1506,96 @@ def calculate_metrics(ctx: DataContext) -> str:
     return f"✅ 计算完成"
 
 
-def retrieve_all_data(progress_callback: Optional[ProgressCallback] = None) -> DataContext:
+def _run_step(ctx: DataContext, name: str, func: Callable[[], str]) -> str:
+    """执行单个采集步骤，异常记入 ctx.errors 并返回失败消息"""
+    try:
+        return func()
+    except Exception as e:
+        ctx.errors.append(f"{name}: {str(e)[:50]}")
+        return f"❌ {name} 失败"
+
+
+def record_snapshot(ctx: DataContext) -> None:
+    """将本次快照追加到本地时间序列存储，并把历史摘要写入 ctx.history"""
+    from snapshot_store import get_snapshot_store
+    
+    store = get_snapshot_store(STORAGE_CONFIG["data_dir"])
+    store.append_context(ctx)
+    ctx.history = store.summary()
+
+
+def retrieve_all_data(progress_callback: Optional[ProgressCallback] = None,
+                      concurrent: bool = True,
+                      max_workers: Optional[int] = None,
+                      record_history: bool = True) -> DataContext:
+    """
+    采集全部数据
+    
+    Args:
+        progress_callback: 进度回调 (step, total, msg)
+        concurrent: 是否并行采集各独立数据源（默认开启，耗时约等于最慢的单个数据源）
+        max_workers: 并行线程数，默认等于独立数据源数量
+        record_history: 是否把本次快照写入本地时间序列存储并计算历史摘要
+    
+    并行模式下各数据源互不依赖、同时执行；衍生指标（港美利差依赖 fed_rate、
+    CNY 价差依赖中间价）在所有数据源返回后再计算。进度回调始终在调用线程中触发，
+    因此 Streamlit 的 st.status 可以直接使用。
+    """
     ctx = DataContext()
     
-    steps = [
+    # 相互独立的数据源
+    source_steps = [
         ("FRED 宏观数据", lambda: fetch_fred_data(ctx)),
         ("人民币数据", lambda: fetch_cny_data(ctx)),
         ("港元数据", lambda: fetch_hkd_data(ctx)),
         ("全球外汇", lambda: fetch_global_fx(ctx)),
         ("Perplexity 新闻", lambda: fetch_perplexity_news(ctx)),
+    ]
+    # 依赖上述数据源结果的衍生步骤
+    derived_steps = [
         ("计算衍生指标", lambda: calculate_metrics(ctx)),
     ]
     
-    total = len(steps)
+    total = len(source_steps) + len(derived_steps)
+    done = 0
     
-    for i, (name, func) in enumerate(steps):
+    if concurrent:
         if progress_callback:
-            progress_callback(i, total, f"📊 {name}...")
+            names = "、".join(name for name, _ in source_steps)
+            progress_callback(0, total, f"📊 并行采集: {names}...")
         
-        try:
-            result = func()
+        with ThreadPoolExecutor(max_workers=max_workers or len(source_steps),
+                                thread_name_prefix="fxfuel-fetch") as executor:
+            futures = {
+                executor.submit(_run_step, ctx, name, func): name
+                for name, func in source_steps
+            }
+            for future in as_completed(futures):
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total, future.result())
+    else:
+        for name, func in source_steps:
             if progress_callback:
-                progress_callback(i + 1, total, result)
-        except Exception as e:
-            ctx.errors.append(f"{name}: {str(e)[:50]}")
+                progress_callback(done, total, f"📊 {name}...")
+            result = _run_step(ctx, name, func)
+            done += 1
             if progress_callback:
-                progress_callback(i + 1, total, f"❌ {name} 失败")
+                progress_callback(done, total, result)
+    
+    for name, func in derived_steps:
+        if progress_callback:
+            progress_callback(done, total, f"📊 {name}...")
+        result = _run_step(ctx, name, func)
+        done += 1
+        if progress_callback:
+            progress_callback(done, total, result)
+    
+    if record_history:
+        try:
+            record_snapshot(ctx)
+        except Exception as e:
+            ctx.errors.append(f"历史快照: {str(e)[:50]}")
     
     return ctx
 
@@ -0,0 +1,101 @@
+# fred_client.py - FRED 序列增量拉取（本地存储 + observation_start 窗口）
+
+import os
+import pickle
+import threading
+from datetime import timedelta
+from typing import Dict, Optional
+
+import pandas as pd
+
+from atomic_io import atomic_write
+
+
+class FredSeriesClient:
+    """
+    带本地存储的 FRED 序列客户端
+
+    fredapi 的 get_series_latest_release 每次都下载序列全部历史（DGS10 自 1962 年起），
+    而采集只需要最新值。本客户端把每个序列存到本地文件，刷新时只请求
+    「最后一个已存日期 - overlap_days」之后的观测值，再与本地数据合并：
+    - 首次拉取：下载全部历史并落盘
+    - 之后刷新：只下载最近几天的数据（overlap_days 覆盖 FRED 对近期数据的修订）
+    """
+
+    def __init__(self, api_key: str, store_dir: str, overlap_days: int = 7,
+                 root_url: Optional[str] = None):
+        from fredapi import Fred
+
+        self.fred = Fred(api_key=api_key)
+        if root_url:
+            self.fred.root_url = root_url
+        self.store_dir = store_dir
+        self.overlap_days = overlap_days
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _lock_for(self, series_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(series_id, threading.Lock())
+
+    def _path(self, series_id: str) -> str:
+        return os.path.join(self.store_dir, f"{series_id}.pkl")
+
+    def load_local(self, series_id: str) -> Optional[pd.Series]:
+        """读取本地已存序列，不存在或损坏时返回 None"""
+        path = self._path(series_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def _save_local(self, series_id: str, series: pd.Series) -> None:
+        atomic_write(self._path(series_id), pickle.dumps(series, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def get_series(self, series_id: str) -> pd.Series:
+        """
+        返回完整序列（本地历史 + 增量刷新）
+
+        增量请求失败时抛出异常，由调用方决定是否使用本地旧数据。
+        """
+        with self._lock_for(series_id):
+            local = self.load_local(series_id)
+            if local is None or local.empty:
+                merged = self.fred.get_series(series_id)
+            else:
+                start = local.index.max() - timedelta(days=self.overlap_days)
+                fresh = self.fred.get_series(series_id, observation_start=start)
+                # 新数据优先（覆盖 FRED 对重叠窗口内数据的修订）
+                merged = fresh.combine_first(local) if fresh is not None and not fresh.empty else local
+            merged = merged.sort_index()
+            self._save_local(series_id, merged)
+            return merged
+
+
+_clients: Dict[str, FredSeriesClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_fred_client(api_key: str, store_dir: str, root_url: Optional[str] = None) -> FredSeriesClient:
+    """按 (api_key, store_dir, root_url) 复用客户端实例"""
+    key = f"{api_key}:{store_dir}:{root_url}"
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = FredSeriesClient(api_key, store_dir, root_url=root_url)
+            _clients[key] = client
+        return client
+
+
+def latest_value(series: Optional[pd.Series]) -> Optional[float]:
+    """序列最后一个有效值（FRED 日度序列在节假日有 NaN 占位）"""
+    if series is None:
+        return None
+    valid = series.dropna()
+    if valid.empty:
+        return None
+    return float(valid.iloc[-1])
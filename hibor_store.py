@@ -0,0 +1,190 @@
+# hibor_store.py - 金管局 HIBOR 日度数据的本地存储（增量分页拉取）+ 期限结构 / 近期走势
+
+import os
+import pickle
+import threading
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from atomic_io import atomic_write
+
+# 金管局接口字段 -> 期限简称（term_structure / trends 的键）
+HIBOR_TENORS = {
+    "ir_overnight": "overnight",
+    "ir_1week": "1w",
+    "ir_2week": "2w",
+    "ir_1month": "1m",
+    "ir_2month": "2m",
+    "ir_3month": "3m",
+    "ir_6month": "6m",
+    "ir_12month": "12m",
+}
+
+# 趋势只计算报告关注的期限
+TREND_TENORS = ("overnight", "1w", "1m")
+
+# 防止接口忽略 offset 参数时无限翻页
+MAX_PAGES = 50
+
+PageFetcher = Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+def fetch_records(fetch_page: PageFetcher, start: date, page_size: int = 100) -> List[Dict[str, Any]]:
+    """
+    按 offset 分页拉取 start（含）之后的全部日度记录
+
+    fetch_page 接收金管局接口的查询参数，返回解析后的 JSON；返回 None（非 200）时抛出 RuntimeError，
+    已拉到的页一并丢弃，由调用方决定是否使用本地旧数据。
+    """
+    records: List[Dict[str, Any]] = []
+    for page in range(MAX_PAGES):
+        data = fetch_page({
+            "from": start.isoformat(),
+            "sortby": "end_of_day",
+            "sortorder": "desc",
+            "pagesize": page_size,
+            "offset": page * page_size,
+        })
+        if not data or not (data.get("header") or {}).get("success", True):
+            raise RuntimeError("金管局接口返回非 200")
+        batch = (data.get("result") or {}).get("records") or []
+        records.extend(batch)
+        if len(batch) < page_size:
+            break
+    return records
+
+
+def records_to_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """金管局记录 -> 以日期为索引、期限简称为列的 DataFrame（缺失值为 NaN）"""
+    rows = {}
+    for record in records:
+        try:
+            day = pd.Timestamp(record["end_of_day"])
+        except (KeyError, ValueError):
+            continue
+        rows[day] = {tenor: pd.to_numeric(record.get(field), errors="coerce")
+                     for field, tenor in HIBOR_TENORS.items()}
+    frame = pd.DataFrame.from_dict(rows, orient="index", columns=list(HIBOR_TENORS.values()))
+    return frame.sort_index().astype(float)
+
+
+class HiborStore:
+    """
+    带本地存储的 HIBOR 日度序列
+
+    金管局接口默认每次返回一页最新记录，而采集只用最新一条。本存储与 fred_client 相同：
+    - 首次拉取：分页下载最近 backfill_days 天的记录并落盘
+    - 之后刷新：只请求「最后一个已存日期 - overlap_days」之后的记录，与本地数据合并（新数据优先）
+    落盘后的完整历史用于期限结构和 1 周 / 1 个月变动，不需要每次重新下载。
+    """
+
+    def __init__(self, path: str, fetch_page: PageFetcher, backfill_days: int = 365,
+                 page_size: int = 100, overlap_days: int = 3):
+        self.path = path
+        self.fetch_page = fetch_page
+        self.backfill_days = backfill_days
+        self.page_size = page_size
+        self.overlap_days = overlap_days
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def load_local(self) -> Optional[pd.DataFrame]:
+        """读取本地已存记录，不存在或损坏时返回 None"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def _save_local(self, frame: pd.DataFrame) -> None:
+        atomic_write(self.path, pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def latest_date(self) -> Optional[date]:
+        local = self.load_local()
+        if local is None or local.empty:
+            return None
+        return local.index.max().date()
+
+    def refresh(self) -> pd.DataFrame:
+        """
+        增量刷新并返回完整历史（按日期升序）
+
+        请求失败时抛出异常，本地数据保持不变。
+        """
+        with self._lock:
+            local = self.load_local()
+            if local is None or local.empty:
+                start = date.today() - timedelta(days=self.backfill_days)
+            else:
+                start = local.index.max().date() - timedelta(days=self.overlap_days)
+            fresh = records_to_frame(fetch_records(self.fetch_page, start, self.page_size))
+            if local is None or local.empty:
+                merged = fresh
+            elif fresh.empty:
+                merged = local
+            else:
+                # 新数据优先（覆盖金管局对重叠窗口内数据的修订）
+                merged = fresh.combine_first(local)
+            merged = merged.sort_index()
+            self._save_local(merged)
+            return merged
+
+
+def term_structure(frame: Optional[pd.DataFrame]) -> Dict[str, Optional[float]]:
+    """最新一个定盘日的各期限利率（%），缺失的期限为 None"""
+    if frame is None or frame.empty:
+        return {}
+    latest = frame.iloc[-1]
+    return {tenor: (round(float(latest[tenor]), 5) if pd.notna(latest[tenor]) else None)
+            for tenor in frame.columns}
+
+
+def trends(frame: Optional[pd.DataFrame]) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    隔夜 / 1W / 1M 的近期走势
+
+    change_1w_bp / change_1m_bp：与 7 / 30 个自然日前（或之前最近一个定盘日）相比的变动（基点）；
+    avg_1m：最近 30 个自然日的均值（%）。本地历史不够时对应字段为 None。
+    """
+    if frame is None or frame.empty:
+        return {}
+    last_day = frame.index.max()
+    result = {}
+    for tenor in TREND_TENORS:
+        series = frame[tenor].dropna() if tenor in frame.columns else pd.Series(dtype=float)
+        if series.empty:
+            continue
+        latest = float(series.iloc[-1])
+
+        def _change(days: int) -> Optional[float]:
+            past = series[series.index <= last_day - timedelta(days=days)]
+            if past.empty:
+                return None
+            return round((latest - float(past.iloc[-1])) * 100, 1)
+
+        window = series[series.index > last_day - timedelta(days=30)]
+        result[tenor] = {
+            "change_1w_bp": _change(7),
+            "change_1m_bp": _change(30),
+            "avg_1m": round(float(window.mean()), 4) if not window.empty else None,
+        }
+    return result
+
+
+_stores: Dict[str, HiborStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_hibor_store(data_dir: str, fetch_page: PageFetcher, **options) -> HiborStore:
+    """按数据目录复用存储实例（options 对应 HiborStore 的关键字参数，仅首次创建时生效）"""
+    path = os.path.join(data_dir, "hibor.pkl")
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = HiborStore(path, fetch_page, **options)
+            _stores[path] = store
+        return store
@@ -0,0 +1,189 @@
+# history_anchors.py - 基于中间价全量历史计算的历史锚点（向量化 + 增量更新）
+
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from atomic_io import atomic_write
+
+# 计算锚点的键名前缀：中间价（国家外汇管理局）与 config.HISTORY_ANCHORS 中手工维护的即期高点不是同一序列，
+# 使用独立前缀，避免覆盖同名静态锚点（如 USDCNY_2022_HIGH）
+ANCHOR_PREFIX = "USDCNY_MID_"
+
+class AnchorEngine:
+    """
+    USD/CNY 中间价历史锚点引擎
+
+    config.HISTORY_ANCHORS 是手工维护的静态值；ak.currency_boc_safe() 每次都返回全量历史，
+    fetch_cny_data 原先只用 tail(5)。本引擎在首次拿到全量历史时解析一次，
+    之后只解析新增的定盘记录并追加，锚点用 NumPy 在回看窗口上向量化重算：
+    - 回看窗口内的最高 / 最低 / 均值 / 分位数
+    - 各自然年的高低点（当年为 YTD）
+    - 当前值在窗口内的百分位、距窗口高点回撤、窗口内最大回撤
+
+    结果缓存在内存并写入 state_path，供其他进程（或重启后）的 get_report_prompt 直接读取。
+    """
+
+    # 增量解析时检查的尾部行数；新增记录超过该数量时退化为全量重建
+    TAIL_ROWS = 30
+
+    def __init__(self, lookback_years: int = 5, state_path: Optional[str] = None):
+        self.lookback_years = lookback_years
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._dates = None   # np.ndarray[datetime64[D]]，升序
+        self._values = None  # np.ndarray[float64]，与 _dates 对齐
+        self._anchors: Dict[str, Any] = {}
+        self._loaded_state = False
+
+    # ------------------------------------------------------------------
+    # 数据更新
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _parse(df):
+        """DataFrame(日期, 美元) -> (dates, values)，美元列为每 100 美元报价"""
+        import numpy as np
+        import pandas as pd
+
+        dates = pd.to_datetime(df["日期"]).to_numpy(dtype="datetime64[D]")
+        values = pd.to_numeric(df["美元"], errors="coerce").to_numpy(dtype=float) / 100
+        valid = ~np.isnan(values)
+        order = np.argsort(dates[valid], kind="stable")
+        return dates[valid][order], values[valid][order]
+
+    def update_from_frame(self, df) -> bool:
+        """
+        用 currency_boc_safe 全量 DataFrame 更新锚点
+
+        Returns:
+            是否有新增定盘（有则已重算锚点）
+        """
+        import numpy as np
+
+        if df is None or df.empty or "美元" not in df.columns:
+            return False
+
+        with self._lock:
+            if self._dates is None or self._dates.size == 0:
+                self._dates, self._values = self._parse(df)
+            else:
+                last = self._dates[-1]
+                tail_dates, tail_values = self._parse(df.tail(self.TAIL_ROWS))
+                if tail_dates.size == 0 or tail_dates[-1] <= last:
+                    return False
+                if tail_dates[0] > last and len(df) > self.TAIL_ROWS:
+                    # 缺口超过尾部窗口，全量重建
+                    self._dates, self._values = self._parse(df)
+                else:
+                    new = tail_dates > last
+                    self._dates = np.concatenate([self._dates, tail_dates[new]])
+                    self._values = np.concatenate([self._values, tail_values[new]])
+
+            if self._dates.size == 0:
+                return False
+            self._anchors = self._compute()
+            self._save_state()
+            return True
+
+    # ------------------------------------------------------------------
+    # 锚点计算
+    # ------------------------------------------------------------------
+
+    def _compute(self) -> Dict[str, Any]:
+        import numpy as np
+
+        dates, values = self._dates, self._values
+        latest_date = dates[-1]
+        window_start = latest_date - np.timedelta64(365 * self.lookback_years, "D")
+        in_window = dates >= window_start
+        w_dates, w_values = dates[in_window], values[in_window]
+        current = float(values[-1])
+        n = self.lookback_years
+
+        anchors: Dict[str, Any] = {
+            f"USDCNY_MID_HIGH_{n}Y": round(float(w_values.max()), 4),
+            f"USDCNY_MID_HIGH_{n}Y_DATE": str(w_dates[w_values.argmax()]),
+            f"USDCNY_MID_LOW_{n}Y": round(float(w_values.min()), 4),
+            f"USDCNY_MID_LOW_{n}Y_DATE": str(w_dates[w_values.argmin()]),
+            f"USDCNY_MID_AVG_{n}Y": round(float(w_values.mean()), 4),
+            f"USDCNY_MID_P10_{n}Y": round(float(np.percentile(w_values, 10)), 4),
+            f"USDCNY_MID_P90_{n}Y": round(float(np.percentile(w_values, 90)), 4),
+            f"USDCNY_MID_PERCENTILE_{n}Y": round(float((w_values <= current).mean() * 100), 1),
+        }
+
+        one_year = dates >= latest_date - np.timedelta64(365, "D")
+        anchors["USDCNY_MID_AVG_1Y"] = round(float(values[one_year].mean()), 4)
+
+        # 回撤：相对滚动高点的跌幅（%），对 USD/CNY 即人民币自高点的升值幅度
+        running_peak = np.maximum.accumulate(w_values)
+        drawdowns = (w_values / running_peak - 1) * 100
+        anchors[f"USDCNY_MID_MAX_DRAWDOWN_{n}Y_PCT"] = round(float(drawdowns.min()), 2)
+        anchors[f"USDCNY_MID_FROM_{n}Y_HIGH_PCT"] = round((current / float(w_values.max()) - 1) * 100, 2)
+
+        # 各自然年高低点（当年为年初至今）
+        years = w_dates.astype("datetime64[Y]").astype(int) + 1970
+        current_year = int(years[-1])
+        for year in np.unique(years):
+            mask = years == year
+            y_values, y_dates = w_values[mask], w_dates[mask]
+            label = "YTD" if year == current_year else str(year)
+            anchors[f"USDCNY_MID_{label}_HIGH"] = round(float(y_values.max()), 4)
+            anchors[f"USDCNY_MID_{label}_HIGH_DATE"] = str(y_dates[y_values.argmax()])
+            anchors[f"USDCNY_MID_{label}_LOW"] = round(float(y_values.min()), 4)
+            anchors[f"USDCNY_MID_{label}_LOW_DATE"] = str(y_dates[y_values.argmin()])
+
+        anchors["USDCNY_MID_ANCHORS_AS_OF"] = str(latest_date)
+        return anchors
+
+    # ------------------------------------------------------------------
+    # 读取 / 持久化
+    # ------------------------------------------------------------------
+
+    def _save_state(self) -> None:
+        if not self.state_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+            atomic_write(self.state_path, json.dumps(self._anchors, ensure_ascii=False, indent=2))
+        except OSError:
+            pass
+
+    def anchors(self) -> Dict[str, Any]:
+        """当前计算出的锚点；本进程尚未计算时读取 state_path 中上次保存的结果"""
+        with self._lock:
+            if not self._anchors and not self._loaded_state and self.state_path:
+                self._loaded_state = True
+                try:
+                    with open(self.state_path, encoding="utf-8") as f:
+                        # 旧版本状态文件的键没有 ANCHOR_PREFIX，会与静态锚点重名，丢弃
+                        self._anchors = {k: v for k, v in json.load(f).items() if k.startswith(ANCHOR_PREFIX)}
+                except (OSError, ValueError):
+                    pass
+            return dict(self._anchors)
+
+
+_engine: Optional[AnchorEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_anchor_engine(data_dir: Optional[str] = None) -> AnchorEngine:
+    """进程内共享的锚点引擎，状态文件位于 data_dir（默认 STORAGE_CONFIG['data_dir']）"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            if data_dir is None:
+                from config import STORAGE_CONFIG
+                data_dir = STORAGE_CONFIG["data_dir"]
+            _engine = AnchorEngine(state_path=os.path.join(data_dir, "anchors.json"))
+        return _engine
+
+
+def get_history_anchors() -> Dict[str, Any]:
+    """静态锚点（config.HISTORY_ANCHORS）叠加计算锚点（ANCHOR_PREFIX 前缀，不覆盖静态值）"""
+    from config import HISTORY_ANCHORS
+
+    anchors = get_anchor_engine().anchors()
+    anchors.update(HISTORY_ANCHORS)
+    return anchors
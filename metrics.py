@@ -0,0 +1,491 @@
+# metrics.py - 进程内指标注册表（Prometheus 文本格式导出）
+#
+# 用法：
+#   python metrics.py                 # 执行一次数据采集，输出本进程的全部指标
+#   python metrics.py --report        # 采集后再生成一次报告（统计 DeepSeek 耗时与 Token）
+#   python metrics.py --serve 9108    # 采集后在 9108 端口提供 /metrics，便于本地调试抓取
+#
+# 运行中的应用在设置 METRICS_PORT 后由 streamlit_app 启动旁路 HTTP 服务（见 config.METRICS_CONFIG）。
+# 不依赖 prometheus_client，只实现 Counter / Gauge / Histogram 三种类型。
+
+import argparse
+import bisect
+from abc import ABC, abstractmethod
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# 覆盖从内存缓存命中（毫秒级）到 Perplexity / DeepSeek 慢请求（数十秒）的延迟分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """带标签的指标基类；标签值按声明顺序传入，子类实现 samples 输出样本行"""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} 需要标签 {self.label_names}，收到 {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.label_names)
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """Prometheus 文本格式的样本行（不含 HELP / TYPE）"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def items(self) -> List[Tuple[Dict[str, str], float]]:
+        """当前全部 (标签字典, 值)"""
+        with self._lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.label_names, key)), value) for key, value in items]
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值；也可以绑定回调函数，在导出时取值"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback: Optional[Callable[[], Iterable[Tuple[Dict[str, Any], float]]]] = None
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, callback: Callable[[], Iterable[Tuple[Dict[str, Any], float]]]) -> None:
+        """导出时调用 callback，返回 [(标签字典, 值), ...]，覆盖 set() 设置的值"""
+        self._callback = callback
+
+    def samples(self) -> Iterator[str]:
+        if self._callback is not None:
+            try:
+                items = sorted((self._key(labels), value) for labels, value in self._callback())
+            except Exception:
+                items = []
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """累积分桶直方图（导出 _bucket / _sum / _count）"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：[各桶计数..., +Inf 桶计数], 总和
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return sum(entry[0]) if entry else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted((k, (list(c), t[0])) for k, (c, t) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}"
+
+
+class MetricsRegistry:
+    """指标注册表；同名指标重复注册时返回已有实例"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, help_text: str, labels: Sequence[str], **kwargs) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help_text, labels, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls) or metric.label_names != tuple(labels):
+                raise ValueError(f"指标 {name} 已以不同类型或标签注册")
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help_text, labels, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus 文本格式（text/plain; version=0.0.4）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# ============================================================================
+# 应用指标
+# ============================================================================
+
+FETCH_TOTAL = REGISTRY.counter(
+    "fxfuel_fetch_total", "数据源取数次数", ("source", "cache", "outcome"))
+FETCH_DURATION = REGISTRY.histogram(
+    "fxfuel_fetch_duration_seconds", "数据源取数耗时（含缓存命中）", ("source", "cache"))
+FETCH_ATTEMPTS = REGISTRY.counter(
+    "fxfuel_fetch_attempts_total", "向上游实际发出的请求数（含重试）", ("source",))
+FETCH_BYTES = REGISTRY.counter(
+    "fxfuel_fetch_bytes_total", "上游响应字节数（akshare 为 DataFrame 内存占用）", ("source",))
+
+CACHE_LOOKUPS = REGISTRY.counter(
+    "fxfuel_cache_lookups_total", "缓存查询次数（按命名空间与结果）", ("namespace", "status"))
+CACHE_STATS = REGISTRY.gauge(
+    "fxfuel_cache_stat", "TTLCache.stats() 的当前值（累计计数与容量）", ("stat",))
+
+CIRCUIT_STATE = REGISTRY.gauge(
+    "fxfuel_circuit_open", "熔断器状态（0=closed, 0.5=half_open, 1=open）", ("source",))
+CIRCUIT_STATS = REGISTRY.gauge(
+    "fxfuel_circuit_stat", "熔断器累计计数（calls / failures / rejected / trips）", ("source", "stat"))
+
+SNAPSHOT_STATS = REGISTRY.gauge(
+    "fxfuel_shared_snapshot", "共享快照（SharedSnapshot.stats()）：版本号、年龄与采集 / 复用次数", ("stat",))
+
+REPORT_CACHE_TOTAL = REGISTRY.counter(
+    "fxfuel_report_cache_total", "报告缓存查询结果（hit / miss / bypass=强制重新生成）", ("outcome",))
+
+HEDGE_TOTAL = REGISTRY.counter(
+    "fxfuel_hedge_total", "对冲请求结果（winner=胜出的数据源，hedged=是否触发了备选请求）",
+    ("indicator", "winner", "hedged"))
+
+LLM_REQUESTS = REGISTRY.counter(
+    "fxfuel_llm_requests_total", "DeepSeek 调用次数（outcome: ok / error / cancelled）", ("call", "outcome"))
+LLM_DURATION = REGISTRY.histogram(
+    "fxfuel_llm_duration_seconds", "DeepSeek 调用总耗时", ("call",))
+LLM_TTFT = REGISTRY.histogram(
+    "fxfuel_llm_time_to_first_token_seconds", "DeepSeek 流式输出首字延迟", ("call",))
+LLM_TOKENS = REGISTRY.counter(
+    "fxfuel_llm_tokens_total", "DeepSeek Token 用量（prompt / completion / 前缀缓存命中与未命中）",
+    ("call", "kind"))
+LLM_PREFIX_HIT_RATIO = REGISTRY.gauge(
+    "fxfuel_llm_prefix_cache_hit_ratio", "DeepSeek 前缀缓存命中率（累计命中 Token / 输入 Token）", ("call",))
+
+# DeepSeek usage 字段 -> kind 标签
+_USAGE_FIELDS = {
+    "prompt_tokens": "prompt",
+    "completion_tokens": "completion",
+    "prompt_cache_hit_tokens": "prompt_cache_hit",
+    "prompt_cache_miss_tokens": "prompt_cache_miss",
+}
+
+
+def observe_fetch(span: Dict[str, Any]) -> None:
+    """记录一条 DataContext 取数 span（见 data_retriever.DataContext.add_span）"""
+    source, cache = span["source"], span["cache"]
+    FETCH_TOTAL.inc(source=source, cache=cache, outcome="error" if span.get("error") else "ok")
+    FETCH_DURATION.observe(span["duration_ms"] / 1000, source=source, cache=cache)
+    if span.get("attempts"):
+        FETCH_ATTEMPTS.inc(span["attempts"], source=source)
+    if span.get("bytes"):
+        FETCH_BYTES.inc(span["bytes"], source=source)
+
+
+def observe_cache_lookup(namespace: str, status: str) -> None:
+    CACHE_LOOKUPS.inc(namespace=namespace or "default", status=status)
+
+
+def bind_cache_stats(stats_func: Callable[[], Dict[str, Any]]) -> None:
+    """导出时读取缓存统计（hits / misses / evictions / size 等数值项）"""
+    CACHE_STATS.set_function(lambda: [
+        ({"stat": name}, float(value))
+        for name, value in stats_func().items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    ])
+
+
+def bind_shared_snapshot(stats_func: Callable[[], Dict[str, Any]]) -> None:
+    """导出时读取共享快照的版本与计数（collections 为实际采集次数，served / coalesced 为复用次数）"""
+    SNAPSHOT_STATS.set_function(lambda: [
+        ({"stat": name}, float(value))
+        for name, value in stats_func().items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    ])
+
+
+def observe_report_cache(outcome: str) -> None:
+    REPORT_CACHE_TOTAL.inc(outcome=outcome)
+
+
+def observe_hedge(indicator: str, winner: str, hedged: bool) -> None:
+    HEDGE_TOTAL.inc(indicator=indicator, winner=winner, hedged="true" if hedged else "false")
+
+
+_CIRCUIT_STATE_VALUES = {"closed": 0.0, "half_open": 0.5, "open": 1.0}
+
+
+def bind_circuit_breakers(breakers_func: Callable[[], Dict[str, Any]]) -> None:
+    """导出时读取全部熔断器的状态与计数（breakers_func 返回 名称 -> CircuitBreaker）"""
+    def _states():
+        return [({"source": name}, _CIRCUIT_STATE_VALUES.get(b.state, 0.0))
+                for name, b in breakers_func().items()]
+
+    def _stats():
+        return [({"source": name, "stat": stat}, float(b.stats()[stat]))
+                for name, b in breakers_func().items()
+                for stat in ("calls", "failures", "rejected", "trips")]
+
+    CIRCUIT_STATE.set_function(_states)
+    CIRCUIT_STATS.set_function(_stats)
+
+
+def usage_tokens(usage: Any) -> Dict[str, float]:
+    """OpenAI 兼容的 usage（对象或字典）-> {kind: Token 数}，只保留 _USAGE_FIELDS 中的数值项"""
+    if usage is None:
+        return {}
+    if not isinstance(usage, dict):
+        usage = usage.model_dump() if hasattr(usage, "model_dump") else vars(usage)
+    return {kind: usage[field] for field, kind in _USAGE_FIELDS.items()
+            if isinstance(usage.get(field), (int, float))}
+
+
+def prefix_hit_ratio(tokens: Dict[str, float]) -> Optional[float]:
+    """前缀缓存命中率 = 命中 / (命中 + 未命中)；usage 不含缓存字段时返回 None"""
+    hit = tokens.get("prompt_cache_hit", 0)
+    total = hit + tokens.get("prompt_cache_miss", 0)
+    return hit / total if total else None
+
+
+def record_llm_usage(call: str, usage: Any) -> Dict[str, float]:
+    """记录 OpenAI 兼容的 usage；DeepSeek 额外返回前缀缓存命中 / 未命中 Token。返回 usage_tokens 的结果"""
+    tokens = usage_tokens(usage)
+    for kind, value in tokens.items():
+        if value:
+            LLM_TOKENS.inc(value, call=call, kind=kind)
+    return tokens
+
+
+def _prefix_hit_ratios() -> List[Tuple[Dict[str, Any], float]]:
+    by_call: Dict[str, Dict[str, float]] = {}
+    for labels, value in LLM_TOKENS.items():
+        by_call.setdefault(labels["call"], {})[labels["kind"]] = value
+    samples = []
+    for call, tokens in by_call.items():
+        ratio = prefix_hit_ratio(tokens)
+        if ratio is not None:
+            samples.append(({"call": call}, ratio))
+    return samples
+
+
+LLM_PREFIX_HIT_RATIO.set_function(_prefix_hit_ratios)
+
+
+class _LLMCall:
+    """非流式调用的计时上下文：with observe_llm("report") as call: call.usage(response.usage)"""
+
+    def __init__(self, call: str):
+        self.call = call
+        self._started = 0.0
+
+    def __enter__(self) -> "_LLMCall":
+        self._started = time.perf_counter()
+        return self
+
+    def usage(self, usage: Any) -> None:
+        record_llm_usage(self.call, usage)
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        LLM_DURATION.observe(time.perf_counter() - self._started, call=self.call)
+        LLM_REQUESTS.inc(call=self.call, outcome="error" if exc_type else "ok")
+        return False
+
+
+def observe_llm(call: str) -> _LLMCall:
+    return _LLMCall(call)
+
+
+def instrument_stream(call: str, stream: Iterable[Any], started: Optional[float] = None,
+                      on_usage: Optional[Callable[[Dict[str, float]], None]] = None) -> Iterator[Any]:
+    """
+    包装 DeepSeek 流式响应：原样产出分片，同时记录首字延迟、总耗时和最后一个分片携带的 usage
+
+    started 为发起请求的时间（time.perf_counter()），默认为开始迭代的时间。
+    请求时传 stream_options={"include_usage": True} 才会有 usage 分片；
+    on_usage 收到该分片的 usage_tokens（例如用于在页面上展示本次前缀缓存命中情况）。
+    调用方提前关闭迭代器（页面重跑、用户中止）记为 outcome="cancelled"，不计入错误。
+    """
+    started = time.perf_counter() if started is None else started
+    first_token = False
+    outcome = "error"
+    try:
+        for chunk in stream:
+            if not first_token and getattr(chunk, "choices", None) and chunk.choices[0].delta \
+                    and chunk.choices[0].delta.content:
+                first_token = True
+                LLM_TTFT.observe(time.perf_counter() - started, call=call)
+            if getattr(chunk, "usage", None) is not None:
+                tokens = record_llm_usage(call, chunk.usage)
+                if on_usage is not None:
+                    on_usage(tokens)
+            yield chunk
+        outcome = "ok"
+    except GeneratorExit:
+        outcome = "cancelled"
+        raise
+    finally:
+        LLM_DURATION.observe(time.perf_counter() - started, call=call)
+        LLM_REQUESTS.inc(call=call, outcome=outcome)
+
+
+# ============================================================================
+# 旁路 HTTP 服务
+# ============================================================================
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        payload = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_http_server(port: int, addr: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """在后台线程提供 /metrics（进程内只启动一次，重复调用返回已有服务）"""
+    global _server
+    with _server_lock:
+        if _server is None:
+            server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="fxfuel-metrics", daemon=True).start()
+            _server = server
+        return _server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="采集一次数据并输出 FXFuel 指标")
+    parser.add_argument("--report", action="store_true", help="采集后生成一次报告")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="输出后继续在该端口提供 /metrics")
+    args = parser.parse_args()
+
+    from report_generator import ReportGenerator
+
+    generator = ReportGenerator()
+    generator.collect_data()
+    if args.report:
+        generator.generate_report()
+    print(REGISTRY.render(), end="")
+
+    if args.serve:
+        start_http_server(args.serve)
+        print(f"# serving on :{args.serve}/metrics (Ctrl+C 退出)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
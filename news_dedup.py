@@ -0,0 +1,190 @@
+# news_dedup.py - 新闻近似重复检测（词集合 MinHash）：跨分类合并同一事件，跨日标记已报道过的事件
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from atomic_io import atomic_write
+from news_ranking import tokenize
+
+NUM_PERM = 64
+_PRIME = (1 << 61) - 1
+# 固定种子：签名需要跨进程、跨日可比（不能用 Python 内置 hash，它按进程随机化）
+_rng = random.Random(20240617)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+# 不参与相似度计算的高频英文虚词（中文二元组的高频词由阈值吸收）
+_STOPWORDS = frozenset(
+    "the a an and or of to in on for with at by from as is are was were be been has have had its it this "
+    "that amid after over into than more while will would could said says new week".split()
+)
+
+Signature = Tuple[int, ...]
+
+
+def _terms(text: str) -> set:
+    return {t for t in tokenize(text) if t not in _STOPWORDS and (len(t) > 1 or not t.isascii())}
+
+
+def _stable_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+@lru_cache(maxsize=1024)
+def minhash(text: str) -> Optional[Signature]:
+    """文本词集合的 MinHash 签名；没有可用词时返回 None（按文本缓存：新闻缓存命中时每次采集都是同一批文本）"""
+    hashes = [_stable_hash(t) for t in _terms(text)]
+    if not hashes:
+        return None
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def similarity(a: Optional[Sequence[int]], b: Optional[Sequence[int]]) -> float:
+    """两个签名的估计 Jaccard 相似度"""
+    if not a or not b:
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+def title_key(title: str) -> str:
+    """标题归一化（小写、去掉标点与空白），完全相同即视为同一事件"""
+    return re.sub(r"[\W_]+", "", (title or "").lower())
+
+
+def _item_text(item: Dict[str, Any]) -> str:
+    return f"{item.get('title', '')}\n{item.get('summary', '')}"
+
+
+def _merge(cluster: List[Dict[str, Any]], max_urls: int) -> Dict[str, Any]:
+    """合并同一事件的多条新闻：保留最详细的摘要，分类与来源取并集（按出现顺序）"""
+    primary = max(cluster, key=lambda item: len(item.get("summary") or ""))
+    categories: List[str] = []
+    urls: List[str] = []
+    for item in cluster:
+        for category in str(item.get("category", "")).split("/"):
+            if category and category not in categories:
+                categories.append(category)
+        for url in item.get("urls") or []:
+            if url not in urls:
+                urls.append(url)
+    merged = dict(primary)
+    merged["category"] = "/".join(categories)
+    merged["urls"] = urls[:max_urls]
+    return merged
+
+
+def merge_duplicates(items: List[Dict[str, Any]], threshold: float = 0.45,
+                     max_urls: int = 3) -> List[Dict[str, Any]]:
+    """
+    合并一批新闻中的近似重复（同一事件出现在 POLICY 与 MACRO 等多个分类）
+
+    标题归一化后相同、或标题 + 摘要的签名相似度达到 threshold 的新闻归为一组（传递闭包），
+    合并后位于组内最早一条的位置，其余顺序不变。每天只有十几条新闻，直接两两比较签名。
+    """
+    signatures = [minhash(_item_text(item)) for item in items]
+    keys = [title_key(item.get("title", "")) for item in items]
+    parent = list(range(len(items)))
+
+    def _find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(len(items)):
+        for j in range(i + 1, len(items)):
+            if (keys[i] and keys[i] == keys[j]) or similarity(signatures[i], signatures[j]) >= threshold:
+                parent[_find(j)] = _find(i)
+
+    clusters: Dict[int, List[Dict[str, Any]]] = {}
+    for i, item in enumerate(items):
+        clusters.setdefault(_find(i), []).append(item)
+    return [cluster[0] if len(cluster) == 1 else _merge(cluster, max_urls)
+            for cluster in clusters.values()]
+
+
+class NewsIndex:
+    """
+    跨日新闻索引（data_dir/news_index.json）
+
+    新闻缓存按天失效（news_{分类}_{YYYYMMDD}），新的一天会重新拿到前几天已报道过的事件。
+    索引保存每个事件的签名、首次出现日期与最近出现日期，annotate 为今天的新闻标出
+    首次出现日期（first_seen），报告据此区分新事件与持续发酵的事件。
+    超过 retention_days 天未再出现（按 last_seen）的事件才移出索引，持续报道的事件不会被重新当作新事件。
+    """
+
+    def __init__(self, path: str, retention_days: int = 7, threshold: float = 0.45):
+        self.path = path
+        self.retention_days = retention_days
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def _load(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _save(self, entries: List[Dict[str, Any]]) -> None:
+        atomic_write(self.path, json.dumps(entries, ensure_ascii=False))
+
+    def annotate(self, items: List[Dict[str, Any]], today: Optional[date] = None) -> int:
+        """
+        为今天的新闻标注首次出现日期并写入索引，返回此前已报道过的条数
+
+        与前几天某个事件相似的新闻设置 item["first_seen"]（ISO 日期），并把该事件的 last_seen 更新为今天；
+        首次出现的事件记入索引。
+        """
+        today = today or date.today()
+        today_iso = today.isoformat()
+        cutoff = (today - timedelta(days=self.retention_days)).isoformat()
+        with self._lock:
+            loaded = self._load()
+            # 旧版本索引条目没有 last_seen，按 first_seen 计
+            entries = [e for e in loaded if e.get("last_seen", e.get("first_seen", "")) >= cutoff]
+            changed = len(entries) != len(loaded)
+            repeated = 0
+            for item in items:
+                signature = minhash(_item_text(item))
+                key = title_key(item.get("title", ""))
+                match = next((e for e in entries
+                              if (key and e.get("key") == key)
+                              or similarity(signature, e.get("signature")) >= self.threshold), None)
+                if match is None:
+                    entries.append({"key": key, "signature": list(signature or ()),
+                                    "title": item.get("title", ""),
+                                    "first_seen": today_iso, "last_seen": today_iso})
+                    changed = True
+                    continue
+                if match.get("last_seen") != today_iso:
+                    match["last_seen"] = today_iso
+                    changed = True
+                if match["first_seen"] < today_iso:
+                    item["first_seen"] = match["first_seen"]
+                    repeated += 1
+            if changed:
+                self._save(entries)
+        return repeated
+
+
+_indexes: Dict[str, NewsIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_news_index(data_dir: str, **options) -> NewsIndex:
+    """按数据目录复用索引实例（options 对应 NewsIndex 的关键字参数，仅首次创建时生效）"""
+    path = os.path.join(data_dir, "news_index.json")
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = NewsIndex(path, **options)
+            _indexes[path] = index
+        return index
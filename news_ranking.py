@@ -0,0 +1,107 @@
+# news_ranking.py - 新闻相关度排序（本地 TF-IDF，对照 CORE_INDICATORS 指标关键词）+ 分类配额
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+from config import CORE_INDICATORS, NEWS_RANKING_CONFIG
+
+# 新闻标题格式：[分类] 标题；跨分类合并的新闻为 [POLICY/MACRO]，配额按第一个分类计（见 data_retriever.fetch_perplexity_news_v2）
+_CATEGORY_PATTERN = re.compile(r"^\s*\[([A-Z]+)(?:/[A-Z]+)*\]")
+
+# 英文 / 代码类词（USD/CNY、10Y、HIBOR）整体成词；中文按字符二元组切分
+_LATIN_PATTERN = re.compile(r"[a-z0-9]+(?:[/.\-][a-z0-9]+)*")
+_CJK_PATTERN = re.compile(r"[一-鿿]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """切分为检索词：英文 / 代码词整体保留，中文取相邻二元组（单字词保留单字）"""
+    text = (text or "").lower()
+    terms = _LATIN_PATTERN.findall(text)
+    for run in _CJK_PATTERN.findall(text):
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def indicator_terms() -> Counter:
+    """查询向量：CORE_INDICATORS 的指标名与关键词、NEWS_RANKING_CONFIG 补充的英文检索词，切分后的词频"""
+    terms: Counter = Counter()
+    for name, config in CORE_INDICATORS.items():
+        for phrase in (name, *config["keywords"]):
+            terms.update(tokenize(phrase))
+    for phrase in NEWS_RANKING_CONFIG.get("extra_keywords", ()):
+        terms.update(tokenize(phrase))
+    return terms
+
+
+def news_category(title: str) -> str:
+    match = _CATEGORY_PATTERN.match(title or "")
+    return match.group(1) if match else ""
+
+
+def score_documents(documents: Sequence[str], query: Optional[Counter] = None) -> List[float]:
+    """
+    每篇文档与查询的 TF-IDF 余弦相似度
+
+    IDF 以当前这批新闻为语料计算：所有新闻都提到的词（例如「美元」）区分度低，权重小；
+    词频取 1 + log(tf)，避免一篇反复出现同一个词的长摘要得分过高。
+    """
+    query = indicator_terms() if query is None else query
+    docs = [Counter(tokenize(doc)) for doc in documents]
+    n = len(docs)
+    df: Counter = Counter()
+    for doc in docs:
+        df.update(doc.keys())
+
+    def _idf(term: str) -> float:
+        return math.log((n + 1) / (df[term] + 1)) + 1
+
+    query_weights = {term: (1 + math.log(tf)) * _idf(term) for term, tf in query.items()}
+    query_norm = math.sqrt(sum(w * w for w in query_weights.values())) or 1.0
+
+    scores = []
+    for doc in docs:
+        weights = {term: (1 + math.log(tf)) * _idf(term) for term, tf in doc.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        if not norm:
+            scores.append(0.0)
+            continue
+        dot = sum(weight * query_weights[term] for term, weight in weights.items() if term in query_weights)
+        scores.append(dot / (norm * query_norm))
+    return scores
+
+
+def rank_news(titles: Sequence[str], details: Sequence[str],
+              min_per_category: Optional[int] = None) -> List[int]:
+    """
+    新闻下标按入选优先级排序（供 prompt_templates 在 Token 预算内按顺序填充）
+
+    1. 配额：各分类（POLICY / MACRO / CNY）轮流取本分类得分最高的一条，直到每类取满 min_per_category 条
+       （或该分类取完），预算紧张时也能覆盖三类主题
+    2. 其余新闻按得分从高到低排列
+    同分时保持原顺序。
+    """
+    if min_per_category is None:
+        min_per_category = NEWS_RANKING_CONFIG.get("min_per_category", 2)
+    count = max(len(titles), len(details))
+    documents = [f"{titles[i] if i < len(titles) else ''}\n{details[i] if i < len(details) else ''}"
+                 for i in range(count)]
+    scores = score_documents(documents)
+    by_score = sorted(range(count), key=lambda i: -scores[i])
+
+    per_category: Dict[str, List[int]] = {}
+    for i in by_score:
+        per_category.setdefault(news_category(titles[i] if i < len(titles) else ""), []).append(i)
+
+    order: List[int] = []
+    for round_index in range(min_per_category):
+        for indices in per_category.values():
+            if round_index < len(indices):
+                order.append(indices[round_index])
+    chosen = set(order)
+    order.extend(i for i in by_score if i not in chosen)
+    return order
@@ -0,0 +1,153 @@
+# prefetcher.py - 后台预取：在缓存过期 / 数据发布前后提前回源，用户点击「采集数据」时直接命中热缓存
+#
+# 用法：
+#   streamlit_app 在 PREFETCH_CONFIG["enabled"] 时于进程内启动（start_background，进程内只启动一次）
+#   python prefetcher.py                 # 独立 worker 进程（需设置 FXFUEL_CACHE_DB，经磁盘缓存层与应用进程共享）
+#   python prefetcher.py --once          # 只预热一次后退出（例如由 cron 调用）
+
+import argparse
+import threading
+import time
+from typing import Any, Callable, Collection, Dict, List, Optional
+
+from cache import TTLCache
+
+
+class Prefetcher:
+    """
+    缓存预取调度器
+
+    启动时调用一次 warm（完整采集）填满缓存，之后每 interval 秒检查一遍缓存条目：
+    - 固定 TTL 的条目（行情快照 / Yahoo / 新闻）：剩余有效期不足 lead 时提前刷新，
+      lead = min(lead_seconds, ttl × lead_fraction)
+    - 按发布时间表过期的条目（scheduled_keys，见 release_schedule）：发布前数据不会变化，
+      提前刷新只会拿到旧值，因此在有效期结束（发布时刻）后立即刷新
+    - 超过 idle_seconds 没有被查询的条目不再预取（避免无人使用时持续调用 Perplexity 等付费接口），
+      idle_seconds 为 None 时始终预取
+    同一 key 两次触发之间至少间隔 retry_seconds，上游故障时不会每个周期都重试。
+    """
+
+    def __init__(self, cache: TTLCache, warm: Optional[Callable[[], Any]] = None,
+                 scheduled_keys: Collection[str] = (), interval: float = 5.0,
+                 lead_seconds: float = 30.0, lead_fraction: float = 0.2,
+                 idle_seconds: Optional[float] = 3600, retry_seconds: float = 60.0):
+        self.cache = cache
+        self.warm = warm
+        self.scheduled_keys = set(scheduled_keys)
+        self.interval = interval
+        self.lead_seconds = lead_seconds
+        self.lead_fraction = lead_fraction
+        self.idle_seconds = idle_seconds
+        self.retry_seconds = retry_seconds
+        self._last_triggered: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def lead_for(self, key: str, ttl: float) -> float:
+        """提前刷新的秒数（按发布时间表过期的条目为 0）"""
+        if key in self.scheduled_keys:
+            return 0.0
+        return min(self.lead_seconds, ttl * self.lead_fraction)
+
+    def run_once(self) -> List[str]:
+        """检查一遍缓存条目并触发需要的后台刷新，返回本轮触发的 key"""
+        now = time.monotonic()
+        triggered = []
+        for key, ttl, remaining, idle in self.cache.entries():
+            if self.idle_seconds is not None and idle > self.idle_seconds:
+                continue
+            if remaining > self.lead_for(key, ttl):
+                continue
+            if now - self._last_triggered.get(key, float("-inf")) < self.retry_seconds:
+                continue
+            if self.cache.refresh_ahead(key):
+                self._last_triggered[key] = now
+                triggered.append(key)
+        if triggered:
+            print(f"[预取] {time.strftime('%H:%M:%S')} 刷新: {', '.join(triggered)}")
+        return triggered
+
+    def run_forever(self) -> None:
+        if self.warm is not None:
+            try:
+                self.warm()
+            except Exception as e:
+                print(f"[预取] 预热失败: {e}")
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[预取] 本轮检查失败: {e}")
+
+    def start(self) -> "Prefetcher":
+        self._thread = threading.Thread(target=self.run_forever, name="fxfuel-prefetch", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def create_prefetcher(**overrides) -> Prefetcher:
+    """按 config.PREFETCH_CONFIG 创建绑定 data_retriever 全局缓存的预取器（overrides 覆盖配置项）"""
+    import data_retriever
+    from config import PREFETCH_CONFIG
+
+    options = {k: v for k, v in PREFETCH_CONFIG.items() if k != "enabled"}
+    options.update(overrides)
+    return Prefetcher(
+        data_retriever.DATA_CACHE,
+        # 预热不写入快照历史：快照只记录用户实际发起的采集
+        warm=lambda: data_retriever.retrieve_all_data(record_history=False),
+        scheduled_keys=data_retriever.RELEASE_SCHEDULES,
+        **options,
+    )
+
+
+_background: Optional[threading.Thread] = None
+_background_lock = threading.Lock()
+
+
+def start_background() -> threading.Thread:
+    """
+    在当前进程的后台线程启动预取（进程内只启动一次，重复调用返回已有线程）
+
+    data_retriever 的导入与预热都在后台线程中进行，不拖慢页面首次渲染。
+    """
+    global _background
+    with _background_lock:
+        if _background is None:
+            _background = threading.Thread(target=lambda: create_prefetcher().run_forever(),
+                                           name="fxfuel-prefetch", daemon=True)
+            _background.start()
+        return _background
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="FXFuel 缓存预取 worker")
+    parser.add_argument("--once", action="store_true", help="预热一次后退出")
+    parser.add_argument("--interval", type=float, help="检查周期（秒），默认取 PREFETCH_CONFIG")
+    parser.add_argument("--idle-seconds", type=float,
+                        help="无人查询多久后停止预取（秒，0 表示始终预取）；worker 进程看不到应用内的查询，"
+                             "空闲判断以预热时间起算")
+    args = parser.parse_args(argv)
+
+    from config import CACHE_CONFIG
+    if not CACHE_CONFIG.get("disk_path"):
+        print("⚠️ FXFUEL_CACHE_DB 未设置：独立 worker 的缓存无法被应用进程读取，只会预热本地存储（FRED / HIBOR 历史）")
+
+    overrides: Dict[str, Any] = {"interval": args.interval} if args.interval else {}
+    if args.idle_seconds is not None:
+        overrides["idle_seconds"] = args.idle_seconds or None
+    prefetcher = create_prefetcher(**overrides)
+    if args.once:
+        prefetcher.warm()
+        return
+    try:
+        prefetcher.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 # prompt_templates.py - Prompt 模板（核心：严格约束 LLM）
 
 import json
-from typing import Any
-from config import HISTORY_ANCHORS, TOKEN_CONFIG
+from typing import Any, Dict, List, Sequence
+from config import TOKEN_CONFIG
+from history_anchors import get_history_anchors
+from news_ranking import rank_news
+from token_counter import count_tokens
 
 # ============================================================================
 # 系统提示词：定义 AI 行为边界
@@ -37,7 +40,7 @@ SYSTEM_PROMPT = """你是一位专业的外汇市场分析师，负责撰写周
 
 4. 新闻数据使用规则
    - <DATA> 中包含两类新闻数据：
-     * news: 新闻短标题列表（带编号，如 [POLICY]、[MACRO]、[CNY]）
+     * news: 新闻短标题列表（带编号，如 [POLICY]、[MACRO]、[CNY]；多个分类报道的同一事件已合并，如 [POLICY/MACRO]）
      * news_detail: 新闻详细摘要列表（与 news 一一对应）
    - 撰写报告时参考 news_detail 中的内容，提炼关键信息
    - 第一、二、三部分结合相关新闻背景进行简要分析
@@ -113,9 +116,11 @@ REPORT_GENERATION_PROMPT = """<DATA>
 2. 严禁凭空回忆历史高低点，只能使用 <HISTORY_ANCHORS> 中提供的数值
 3. 对于非本次数据范围内的时间对比，必须使用"从形态上看"、"类似"等非绝对性表述
 4. 禁止使用"历史上最高/最低"等绝对性表述，除非 <HISTORY_ANCHORS> 中明确提供了该数值
+5. <DATA> 中的 "history" 字段是本地采集记录计算的周环比（week_over_week）和近期区间高低点，可直接用于周度对比；该字段缺失的指标不得自行推算变化幅度
+6. <HISTORY_ANCHORS> 中 USDCNY_MID_ 开头的锚点是人民币中间价的历史统计，其余 USDCNY_ 锚点为即期汇率高点 / 均值，两者是不同序列，引用时须注明是中间价还是即期汇率
 
 【新闻数据使用规则】
-1. <DATA> 中的 "news" 字段是新闻短标题列表（带分类标签如 [POLICY]、[MACRO]、[CNY]）
+1. <DATA> 中的 "news" 字段是新闻短标题列表（带分类标签如 [POLICY]、[MACRO]、[CNY]）；标题末尾的「（MM-DD 起持续报道）」表示该事件此前已报道过，撰写时应说明是延续事件而非本周新发生
 2. <DATA> 中的 "news_detail" 字段是新闻详细摘要列表（每条200-250字/词，与 news 一一对应）
 3. **撰写报告时必须充分利用 news_detail 中的详细内容**来丰富分析
 4. 第一、二、三部分：结合相关新闻背景进行深入分析（如Fed政策新闻用于分析美元走势）
@@ -152,17 +157,44 @@ FOLLOWUP_SYSTEM_PROMPT = """你是一位专业的外汇市场分析师。用户
 5. 如果发现报告中有错误，应该指出错误并更正，但更正必须基于原始数据"""
 
 
-FOLLOWUP_USER_PROMPT = """【原始数据】
+# 追问消息分为两部分（利用 DeepSeek 上下文硬盘缓存：请求前缀与之前的请求完全相同的部分按缓存命中计费，且不再重新计算）：
+# - 稳定前缀：system + 数据与报告（FOLLOWUP_CONTEXT_PROMPT）+ 固定的确认回复，同一份报告的所有追问逐字节相同
+# - 每个问题的后缀：只有最后一条 user 消息（FOLLOWUP_QUESTION_PROMPT）
+FOLLOWUP_CONTEXT_PROMPT = """【原始数据】
 {data_json}
 
 【已生成的报告】
-{generated_report}
+{generated_report}"""
 
-【用户追问】
+FOLLOWUP_QUESTION_PROMPT = """【用户追问】
 {user_question}
 
 请基于原始数据和报告内容回答用户的问题。如果问题涉及数据或报告中没有的信息，请明确告知用户。"""
 
+# 页面「追问」对话框：按报告和新闻来源回答（Pitch / 来源追溯）
+CHAT_FOLLOWUP_SYSTEM_PROMPT = """你是外汇分析师助手。根据用户提供的周报和新闻来源回答用户问题。
+
+**回答要求**：
+- 如果用户询问某个信息的来源，请指出具体的新闻条目和URL
+- 如果报告中提到的数据来源于API（如外管局、FRED、东方财富），请说明
+- 新闻内容来源于Perplexity搜索，可能是综合多个网站的信息"""
+
+CHAT_FOLLOWUP_CONTEXT_PROMPT = """**【周报内容】**
+{generated_report}
+{news_context}"""
+
+CHAT_FOLLOWUP_QUESTION_PROMPT = """**【用户问题】**
+{user_question}"""
+
+# 前缀最后一条固定的 assistant 消息，使问题始终是独立的最后一条 user 消息
+FOLLOWUP_CONTEXT_ACK = "已阅读上述数据与报告，请提问。"
+
+# 多轮追问：较早轮次压缩后的摘要（见 conversation_memory），以一对固定格式的消息放在近期原文问答之前
+CONVERSATION_SUMMARY_PROMPT = """【此前追问摘要（较早的问答已压缩）】
+{summary}"""
+
+CONVERSATION_SUMMARY_ACK = "好的，我会结合此前的问答继续回答。"
+
 
 # ============================================================================
 # 数据校验提示词（可选：用于检测幻觉）
@@ -210,46 +242,75 @@ def _replace_none_with_placeholder(data: Any) -> Any:
         return data
 
 
+# DataContext.to_dict() 中只用于诊断、不发送给 LLM 的字段
+DIAGNOSTIC_KEYS = ("fetch_spans",)
+
+
+def _drop_diagnostics(data_dict: dict) -> dict:
+    """去掉诊断字段（取数耗时等），避免占用 Token"""
+    return {k: v for k, v in data_dict.items() if k not in DIAGNOSTIC_KEYS}
+
+
 def _estimate_tokens(text: str) -> int:
-    """
-    粗略估算文本的 Token 数
-    中文约 1.5 字符/token，英文约 4 字符/token
-    这里用配置中的 chars_per_token 作为平均值
-    """
-    return int(len(text) / TOKEN_CONFIG["chars_per_token"])
+    """Token 数（token_counter：本地 DeepSeek tokenizer 可用时精确计数，否则按字符类别估算；结果按文本缓存）"""
+    return count_tokens(text)
+
 
+# 新闻的三个列表按下标对齐（标题 / 详细摘要 / 来源），分配预算时整条取舍
+NEWS_KEYS = ("news", "news_detail", "news_sources")
 
-def _compress_data_if_needed(data_dict: dict) -> dict:
+# 每条新闻在三个列表中各占一行的缩进、引号与逗号
+NEWS_ITEM_OVERHEAD = 3 * len(NEWS_KEYS)
+
+
+def _dump(value: Any) -> str:
+    """与 get_report_prompt 发送给 LLM 的序列化格式一致"""
+    return json.dumps(value, ensure_ascii=False, indent=2)
+
+
+def _allocate_budget(data_dict: dict) -> dict:
     """
-    如果数据超过 Token 限制，压缩新闻数量
+    在 max_context_tokens 预算内按优先级组装数据
     
-    压缩策略：
-    1. 优先保留核心数值数据（cny, hkd, global_fx, macro）
-    2. 压缩 news_detail 到指定条数
-    3. 同步压缩 news 和 news_sources
+    分配策略：
+    1. 核心数据（新闻以外的全部字段：cny, hkd, global_fx, macro 等）始终保留
+    2. 新闻按 news_ranking.rank_news 的顺序（分类配额 + TF-IDF 相关度）逐条加入，
+       放不下的跳过（后面更短的新闻仍可能放得下），直到预算用完
+    3. 保留的新闻按原顺序排列，news / news_detail / news_sources 保持对齐
     """
-    # 先序列化检查大小
-    test_json = json.dumps(data_dict, ensure_ascii=False)
-    estimated_tokens = _estimate_tokens(test_json)
-    
     max_tokens = TOKEN_CONFIG["max_context_tokens"]
-    max_news = TOKEN_CONFIG["max_news_items"]
-    
-    if estimated_tokens <= max_tokens:
-        return data_dict  # 未超限，不需要压缩
+    if _estimate_tokens(_dump(data_dict)) <= max_tokens:
+        return data_dict  # 未超限，全部保留
     
-    # 需要压缩：裁剪新闻
-    if "news_detail" in data_dict and len(data_dict.get("news_detail", [])) > max_news:
-        data_dict["news_detail"] = data_dict["news_detail"][:max_news]
-        data_dict["_token_note"] = f"新闻已压缩至{max_news}条以控制Token"
+    news_lists = {key: data_dict[key] for key in NEWS_KEYS if isinstance(data_dict.get(key), list)}
+    total_news = max((len(items) for items in news_lists.values()), default=0)
+    if not total_news:
+        return data_dict  # 没有可裁剪的新闻，只能全部发送
     
-    if "news" in data_dict and len(data_dict.get("news", [])) > max_news:
-        data_dict["news"] = data_dict["news"][:max_news]
+    def _with_news(indices: List[int]) -> dict:
+        result = dict(data_dict)
+        for key, items in news_lists.items():
+            result[key] = [items[i] for i in sorted(indices) if i < len(items)]
+        if len(indices) < total_news:
+            result["_token_note"] = f"新闻按相关度保留{len(indices)}/{total_news}条以控制Token"
+        return result
     
-    if "news_sources" in data_dict and len(data_dict.get("news_sources", [])) > max_news:
-        data_dict["news_sources"] = data_dict["news_sources"][:max_news]
+    ranked = rank_news(data_dict.get("news") or [], data_dict.get("news_detail") or [])
+    used = _estimate_tokens(_dump(_with_news([])))
+    selected: List[int] = []
+    for i in ranked:
+        cost = NEWS_ITEM_OVERHEAD + sum(_estimate_tokens(_dump(items[i]))
+                                        for items in news_lists.values() if i < len(items))
+        if used + cost <= max_tokens:
+            used += cost
+            selected.append(i)
     
-    return data_dict
+    # 逐条累加的估算与整体序列化略有出入：仍超限时去掉相关度最低的已选新闻
+    result = _with_news(selected)
+    while selected and _estimate_tokens(_dump(result)) > max_tokens:
+        selected.pop()
+        result = _with_news(selected)
+    return result
 
 
 def get_report_prompt(data_json: str) -> dict:
@@ -257,26 +318,26 @@ def get_report_prompt(data_json: str) -> dict:
     获取报告生成的完整提示词
     
     处理逻辑：
-    1. 解析 JSON，将 None 值替换为 "数据暂缺"
-    2. 检查 Token 预算，必要时压缩新闻数量 (P0-1 新增)
+    1. 解析 JSON，去掉诊断字段，将 None 值替换为 "数据暂缺"
+    2. 按 Token 预算分配：核心数据优先，新闻按相关度填满剩余预算 (P0-1 新增)
     3. 重新序列化为 JSON
-    4. 注入历史锚点数据
+    4. 注入历史锚点数据（计算锚点已缓存，此处不访问上游）
     """
     # 解析 JSON 并替换 None 值
     try:
-        data_dict = json.loads(data_json)
+        data_dict = _drop_diagnostics(json.loads(data_json))
         data_dict_cleaned = _replace_none_with_placeholder(data_dict)
         
-        # P0-1: Token 预算管理 - 检查并压缩
-        data_dict_cleaned = _compress_data_if_needed(data_dict_cleaned)
+        # P0-1: Token 预算管理 - 核心数据优先，剩余预算按相关度填充新闻
+        data_dict_cleaned = _allocate_budget(data_dict_cleaned)
         
         data_json_cleaned = json.dumps(data_dict_cleaned, ensure_ascii=False, indent=2)
     except (json.JSONDecodeError, TypeError):
         # 如果解析失败，使用原始 JSON（但尝试替换字符串中的 null）
         data_json_cleaned = data_json.replace('null', '"数据暂缺"')
     
-    # 格式化历史锚点文本
-    history_anchors_text = "\n".join([f"- {key}: {value}" for key, value in HISTORY_ANCHORS.items()])
+    # 格式化历史锚点文本（静态锚点 + 由中间价全量历史计算的锚点）
+    history_anchors_text = "\n".join([f"- {key}: {value}" for key, value in get_history_anchors().items()])
     
     return {
         "system": SYSTEM_PROMPT,
@@ -287,16 +348,41 @@ def get_report_prompt(data_json: str) -> dict:
     }
 
 
-def get_followup_prompt(data_json: str, report: str, question: str) -> dict:
-    """获取追问回答的完整提示词"""
-    return {
-        "system": FOLLOWUP_SYSTEM_PROMPT,
-        "user": FOLLOWUP_USER_PROMPT.format(
-            data_json=data_json,
-            generated_report=report,
-            user_question=question
-        )
-    }
+def _prefixed_messages(system: str, context: str, question: str,
+                       history: Sequence[Dict[str, str]] = ()) -> List[Dict[str, str]]:
+    """稳定前缀（system + 上下文 + 固定确认）在前，之后是历史问答（ConversationMemory.messages()），问题在最后"""
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": context},
+        {"role": "assistant", "content": FOLLOWUP_CONTEXT_ACK},
+        *history,
+        {"role": "user", "content": question},
+    ]
+
+
+def get_followup_messages(data_json: str, report: str, question: str,
+                          history: Sequence[Dict[str, str]] = ()) -> List[Dict[str, str]]:
+    """
+    获取追问回答的消息列表（ReportGenerator.answer_followup）
+    
+    数据 JSON 与报告放在问题之前且逐字节稳定，同一份报告的第二个及之后的追问命中 DeepSeek 前缀缓存；
+    history 为之前的问答（按 Token 预算压缩），位于前缀之后。
+    """
+    try:
+        data_json = json.dumps(_drop_diagnostics(json.loads(data_json)), ensure_ascii=False, indent=2)
+    except (json.JSONDecodeError, TypeError, AttributeError):
+        pass
+    context = FOLLOWUP_CONTEXT_PROMPT.format(data_json=data_json, generated_report=report)
+    return _prefixed_messages(FOLLOWUP_SYSTEM_PROMPT, context,
+                              FOLLOWUP_QUESTION_PROMPT.format(user_question=question), history)
+
+
+def get_chat_followup_messages(report: str, news_context: str, question: str,
+                               history: Sequence[Dict[str, str]] = ()) -> List[Dict[str, str]]:
+    """获取页面追问对话框的消息列表（报告 + 新闻来源为稳定前缀，history 为之前的问答）"""
+    context = CHAT_FOLLOWUP_CONTEXT_PROMPT.format(generated_report=report, news_context=news_context)
+    return _prefixed_messages(CHAT_FOLLOWUP_SYSTEM_PROMPT, context,
+                              CHAT_FOLLOWUP_QUESTION_PROMPT.format(user_question=question), history)
 
 
 def get_validation_prompt(data_json: str, report: str) -> str:
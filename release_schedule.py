@@ -0,0 +1,133 @@
+# release_schedule.py - 按数据发布时间表计算缓存有效期（代替固定秒数的 TTL）
+
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Any, Callable, Dict, Optional
+from zoneinfo import ZoneInfo
+
+
+def _parse_hhmm(value: str) -> dtime:
+    hour, minute = value.split(":")
+    return dtime(int(hour), int(minute))
+
+
+def _is_business_day(day: date) -> bool:
+    return day.weekday() < 5
+
+
+def _previous_business_day(day: date) -> date:
+    day -= timedelta(days=1)
+    while not _is_business_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def _first_business_day(year: int, month: int) -> date:
+    day = date(year, month, 1)
+    while not _is_business_day(day):
+        day += timedelta(days=1)
+    return day
+
+
+def _shift_month(first_of_month: date, months: int) -> date:
+    index = first_of_month.year * 12 + first_of_month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class ReleaseSchedule:
+    """
+    一个序列的发布时间表
+
+    - daily：每个工作日 release_time（tz 当地时间）发布，发布的是 lag_days 个工作日之前的观测值
+      （人民币中间价 / HIBOR 当日定盘当日发布，lag_days=0；FRED 日度利率次日发布，lag_days=1）
+    - monthly：每月第一个工作日 release_time 发布上月数据，观测日期为上月 1 日（FRED 月度序列的约定）
+
+    只排除周末，不含各地公众假期：假期当天本地数据会被判定为「落后」，按 poll_seconds 轮询，
+    不会误把旧数据当成最新。
+    """
+
+    def __init__(self, tz: str, release_time: str, frequency: str = "daily",
+                 lag_days: int = 0, poll_seconds: float = 600):
+        if frequency not in ("daily", "monthly"):
+            raise ValueError(f"未知发布频率: {frequency}")
+        self.tz = ZoneInfo(tz)
+        self.release_time = _parse_hhmm(release_time)
+        self.frequency = frequency
+        self.lag_days = lag_days
+        self.poll_seconds = poll_seconds
+
+    def _release_at(self, day: date) -> datetime:
+        return datetime.combine(day, self.release_time, tzinfo=self.tz)
+
+    def last_release(self, at: datetime) -> datetime:
+        """at 时刻（含）之前最近一次发布的时刻"""
+        local = at.astimezone(self.tz)
+        if self.frequency == "monthly":
+            release = self._release_at(_first_business_day(local.year, local.month))
+            if release > local:
+                previous = _shift_month(local.date().replace(day=1), -1)
+                release = self._release_at(_first_business_day(previous.year, previous.month))
+            return release
+        day = local.date()
+        if not _is_business_day(day) or self._release_at(day) > local:
+            day = _previous_business_day(day)
+        return self._release_at(day)
+
+    def next_release(self, at: datetime) -> datetime:
+        """at 之后的下一次发布时刻"""
+        local = at.astimezone(self.tz)
+        if self.frequency == "monthly":
+            month = local.date().replace(day=1)
+            while True:
+                release = self._release_at(_first_business_day(month.year, month.month))
+                if release > local:
+                    return release
+                month = _shift_month(month, 1)
+        day = local.date()
+        while True:
+            if _is_business_day(day) and self._release_at(day) > local:
+                return self._release_at(day)
+            day += timedelta(days=1)
+
+    def expected_latest(self, at: datetime) -> date:
+        """at 时刻应已发布的最新观测日期"""
+        release_day = self.last_release(at).date()
+        if self.frequency == "monthly":
+            return _shift_month(release_day.replace(day=1), -1)
+        for _ in range(self.lag_days):
+            release_day = _previous_business_day(release_day)
+        return release_day
+
+    def ttl(self, latest_period: Optional[date], stored_at: float) -> float:
+        """
+        缓存条目的有效期（秒，从 stored_at 起算）
+
+        写入时已包含应发布的最新观测值：有效到下一次发布时刻；
+        否则（尚未发布、上游延迟或假期）按 poll_seconds 轮询。
+        """
+        if latest_period is None:
+            return self.poll_seconds
+        written = datetime.fromtimestamp(stored_at, self.tz)
+        if latest_period < self.expected_latest(written):
+            return self.poll_seconds
+        return max(self.next_release(written).timestamp() - stored_at, 1.0)
+
+
+def build_schedules(config: Dict[str, Dict[str, Any]]) -> Dict[str, ReleaseSchedule]:
+    """由 RELEASE_SCHEDULE 配置（缓存 key -> ReleaseSchedule 关键字参数）构建时间表"""
+    return {key: ReleaseSchedule(**options) for key, options in config.items()}
+
+
+def schedule_expiry(schedule: ReleaseSchedule,
+                    latest_period: Callable[[Any], Optional[date]]) -> Callable[[Any, float], float]:
+    """
+    生成 TTLCache 的 ttl_seconds 回调：(缓存值, 写入时间戳) -> 有效期
+
+    latest_period 从缓存值中取出最新观测日期，取不到（None / 格式不符）时按轮询间隔处理。
+    """
+    def _ttl(value: Any, stored_at: float) -> float:
+        try:
+            period = latest_period(value) if value is not None else None
+        except Exception:
+            period = None
+        return schedule.ttl(period, stored_at)
+    return _ttl
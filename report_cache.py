@@ -0,0 +1,127 @@
+# report_cache.py - 按数据指纹缓存已生成的报告及其数值校验结果
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from atomic_io import atomic_write
+
+# 缓存条目格式变化时递增，旧条目自然失效
+SCHEMA_VERSION = 1
+
+# 参与指纹的生成参数（与 REPORT_CONFIG 对应，其他键不影响输出）
+FINGERPRINT_PARAMS = ("temperature", "max_tokens", "top_p")
+
+
+# 每次采集都会变化、但不影响报告内容的字段：采集时刻、取数耗时、临时错误（数据缺失本身已体现为 None）
+VOLATILE_KEYS = ("snapshot", "fetch_spans", "errors")
+
+# data_retriever._source_label 给过期缓存数据附加的年龄说明，如「FRED（缓存数据，42秒前，后台刷新中）」
+_STALE_LABEL = re.compile(r"（缓存数据，\d+秒前，后台刷新中）")
+
+
+def stable_report_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    DataContext.to_dict() 去掉采集相关的易变字段，作为报告指纹的数据部分
+
+    同一批行情数据在不同时刻采集，只有 VOLATILE_KEYS 与来源标注中的缓存年龄不同，去掉后指纹相同。
+    """
+    stable = {k: v for k, v in data.items() if k not in VOLATILE_KEYS}
+    sources = stable.get("data_sources")
+    if isinstance(sources, dict):
+        stable["data_sources"] = {k: _STALE_LABEL.sub("", v) if isinstance(v, str) else v
+                                  for k, v in sources.items()}
+    return stable
+
+
+def report_fingerprint(prompts: Dict[str, str], model: str, config: Dict[str, Any]) -> str:
+    """
+    报告指纹：system / user 提示词 + 模型 + 生成参数的 sha256
+
+    prompts 应由 stable_report_data 处理后的数据生成（见 report_generator.lookup_cached_report），
+    这样数据相同的多次采集（例如多个会话共用同一个共享快照、或缓存命中的重新采集）指纹相同，可直接复用已生成的报告。
+    """
+    payload = {
+        "schema": SCHEMA_VERSION,
+        "system": prompts["system"],
+        "user": prompts["user"],
+        "model": model,
+        "params": {name: config.get(name) for name in FINGERPRINT_PARAMS},
+    }
+    canonical = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ReportCache:
+    """
+    内容寻址的报告缓存：每个指纹一个 JSON 文件（报告正文 + verify_numbers_hard_code 结果）
+
+    文件以原子替换方式写入，多个进程共享同一数据目录时也不会读到半写内容；
+    条目数超过 max_entries 时按写入时间淘汰最旧的文件。
+    """
+
+    def __init__(self, store_dir: str, max_entries: int = 200):
+        self.store_dir = store_dir
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, fingerprint: str) -> str:
+        return os.path.join(self.store_dir, f"{fingerprint}.json")
+
+    def get(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """读取缓存条目（report / validation / model / created_at），不存在或损坏时返回 None"""
+        try:
+            with open(self._path(fingerprint), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("schema") != SCHEMA_VERSION or not entry.get("report"):
+            return None
+        return entry
+
+    def put(self, fingerprint: str, report: str, validation: Optional[Dict[str, Any]],
+            model: str) -> Dict[str, Any]:
+        entry = {
+            "schema": SCHEMA_VERSION,
+            "fingerprint": fingerprint,
+            "model": model,
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "report": report,
+            "validation": validation,
+        }
+        atomic_write(self._path(fingerprint), json.dumps(entry, ensure_ascii=False))
+        self._prune()
+        return entry
+
+    def _prune(self) -> None:
+        with self._lock:
+            try:
+                files = [os.path.join(self.store_dir, name) for name in os.listdir(self.store_dir)
+                         if name.endswith(".json")]
+                if len(files) <= self.max_entries:
+                    return
+                files.sort(key=os.path.getmtime)
+                for path in files[:len(files) - self.max_entries]:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+_caches: Dict[str, ReportCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_report_cache(data_dir: str, max_entries: int = 200) -> ReportCache:
+    """按数据目录复用缓存实例（报告存放在 data_dir/reports）"""
+    store_dir = os.path.join(data_dir, "reports")
+    with _caches_lock:
+        cache = _caches.get(store_dir)
+        if cache is None:
+            cache = ReportCache(store_dir, max_entries)
+            _caches[store_dir] = cache
+        return cache
@@ -1,12 +1,16 @@
 # report_generator.py - 报告生成器
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 import json
 import re
 
-from config import get_deepseek_client, DEEPSEEK_MODEL, REPORT_CONFIG, CORE_INDICATORS, DEFAULT_TOLERANCE
+from config import (get_deepseek_client, DEEPSEEK_MODEL, REPORT_CONFIG, REPORT_CACHE_CONFIG,
+                    STORAGE_CONFIG, CONVERSATION_CONFIG, CORE_INDICATORS, DEFAULT_TOLERANCE)
+from conversation_memory import ConversationMemory
 from data_retriever import DataContext, retrieve_all_data
-from prompt_templates import get_report_prompt, get_followup_prompt, get_validation_prompt
+from prompt_templates import get_report_prompt, get_followup_messages, get_validation_prompt
+from report_cache import ReportCache, get_report_cache, report_fingerprint, stable_report_data
+import metrics
 
 
 class ReportGenerator:
@@ -17,6 +21,8 @@ class ReportGenerator:
         self.data_context: Optional[DataContext] = None
         self.generated_report: Optional[str] = None
         self.validation_result: Optional[Dict] = None
+        self.report_cached = False  # 最近一次 generate_report 是否复用了缓存报告
+        self.memory = ConversationMemory(**CONVERSATION_CONFIG)  # 追问历史（随报告重新生成而清空）
     
     def _get_client(self):
         """获取 DeepSeek 客户端（延迟初始化）"""
@@ -29,12 +35,15 @@ class ReportGenerator:
         self.data_context = retrieve_all_data()
         return self.data_context
     
-    def generate_report(self, data_context: Optional[DataContext] = None) -> str:
+    def generate_report(self, data_context: Optional[DataContext] = None, regenerate: bool = False) -> str:
         """
         生成周报
         
+        数据（不含采集时刻等易变字段）、模型与生成参数与之前某次生成完全相同时，直接返回缓存的报告和校验结果。
+        
         Args:
             data_context: 数据上下文，如果为 None 则自动采集
+            regenerate: 为 True 时忽略缓存，重新调用 LLM 生成（结果覆盖缓存）
             
         Returns:
             生成的报告 Markdown 文本
@@ -51,19 +60,30 @@ class ReportGenerator:
         data_json = data_context.to_json()
         prompts = get_report_prompt(data_json)
         
+        self.memory.clear()
+        fingerprint, cached = lookup_cached_report(data_json, regenerate)
+        self.report_cached = cached is not None
+        if cached is not None:
+            self.generated_report = cached["report"]
+            self.validation_result = cached["validation"]
+            return self.generated_report
+        
         # 调用 LLM
         client = self._get_client()
-        response = client.chat.completions.create(
-            model=DEEPSEEK_MODEL,
-            messages=[
-                {"role": "system", "content": prompts["system"]},
-                {"role": "user", "content": prompts["user"]}
-            ],
-            max_tokens=REPORT_CONFIG["max_tokens"],
-            temperature=REPORT_CONFIG["temperature"]
-        )
+        with metrics.observe_llm("report") as call:
+            response = client.chat.completions.create(
+                model=DEEPSEEK_MODEL,
+                messages=[
+                    {"role": "system", "content": prompts["system"]},
+                    {"role": "user", "content": prompts["user"]}
+                ],
+                max_tokens=REPORT_CONFIG["max_tokens"],
+                temperature=REPORT_CONFIG["temperature"]
+            )
+            call.usage(response.usage)
         
         self.generated_report = response.choices[0].message.content
+        store_cached_report(fingerprint, self.generated_report, self.validate_report())
         return self.generated_report
     
     def answer_followup(self, question: str) -> str:
@@ -79,26 +99,28 @@ class ReportGenerator:
         if self.data_context is None or self.generated_report is None:
             return "请先生成报告再进行追问。"
         
-        # 获取追问提示词
-        prompts = get_followup_prompt(
+        # 获取追问消息（数据与报告为稳定前缀，可命中 DeepSeek 前缀缓存；之前的问答按预算附在其后）
+        messages = get_followup_messages(
             data_json=self.data_context.to_json(),
             report=self.generated_report,
-            question=question
+            question=question,
+            history=self.memory.messages()
         )
         
         # 调用 LLM
         client = self._get_client()
-        response = client.chat.completions.create(
-            model=DEEPSEEK_MODEL,
-            messages=[
-                {"role": "system", "content": prompts["system"]},
-                {"role": "user", "content": prompts["user"]}
-            ],
-            max_tokens=2000,
-            temperature=REPORT_CONFIG["temperature"]
-        )
+        with metrics.observe_llm("followup") as call:
+            response = client.chat.completions.create(
+                model=DEEPSEEK_MODEL,
+                messages=messages,
+                max_tokens=2000,
+                temperature=REPORT_CONFIG["temperature"]
+            )
+            call.usage(response.usage)
         
-        return response.choices[0].message.content
+        answer = response.choices[0].message.content
+        self.memory.add(question, answer)
+        return answer
     
     def validate_report(self) -> Dict[str, Any]:
         """
@@ -312,6 +334,56 @@ def verify_numbers_hard_code(data_context: Dict[str, Any], report_text: str) ->
     }
 
 
+# ============================================================================
+# 报告缓存
+# ============================================================================
+
+def _report_cache() -> Optional[ReportCache]:
+    """按 REPORT_CACHE_CONFIG 返回报告缓存，关闭时返回 None"""
+    if not REPORT_CACHE_CONFIG.get("enabled", True):
+        return None
+    return get_report_cache(STORAGE_CONFIG["data_dir"], REPORT_CACHE_CONFIG.get("max_entries", 200))
+
+
+def lookup_cached_report(data_json: str, regenerate: bool = False) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    按数据指纹查找已生成的报告
+    
+    指纹由去掉采集时刻、取数耗时、缓存年龄等易变字段（report_cache.stable_report_data）后的数据
+    重新组装的提示词计算，同一批数据的多次采集命中同一份报告。
+    
+    Args:
+        data_json: DataContext.to_json() 的输出
+        regenerate: 为 True 时忽略缓存
+    
+    Returns:
+        (指纹, 缓存条目)；未命中、缓存关闭或 regenerate=True 时条目为 None。
+        条目包含 report / validation / model / created_at。
+    """
+    stable_json = json.dumps(stable_report_data(json.loads(data_json)), ensure_ascii=False, indent=2)
+    fingerprint = report_fingerprint(get_report_prompt(stable_json), DEEPSEEK_MODEL, REPORT_CONFIG)
+    cache = _report_cache()
+    if cache is None:
+        return fingerprint, None
+    if regenerate:
+        metrics.observe_report_cache("bypass")
+        return fingerprint, None
+    entry = cache.get(fingerprint)
+    metrics.observe_report_cache("hit" if entry is not None else "miss")
+    return fingerprint, entry
+
+
+def store_cached_report(fingerprint: str, report: str, validation: Optional[Dict[str, Any]]) -> None:
+    """保存报告及其校验结果（空报告不缓存；写入失败只打印警告，不影响本次生成）"""
+    cache = _report_cache()
+    if cache is None or not report:
+        return
+    try:
+        cache.put(fingerprint, report, validation, DEEPSEEK_MODEL)
+    except OSError as e:
+        print(f"⚠️ 报告缓存写入失败: {e}")
+
+
 # ============================================================================
 # 便捷函数
 # ============================================================================
@@ -0,0 +1,163 @@
+# shared_snapshot.py - 进程内共享的采集快照（所有 Streamlit 会话按引用共用同一份数据）
+
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional
+
+ProgressCallback = Callable[[int, int, str], None]
+
+
+def freeze(value: Any) -> Any:
+    """深拷贝为只读结构：字典转为 MappingProxyType，列表 / 元组 / 集合转为元组（逐层处理）"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """freeze 的逆操作：复制为普通的 dict / list（用于 JSON 序列化或需要修改的私有副本）"""
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+class SnapshotEpoch(NamedTuple):
+    """一次采集产生的快照版本（不可变；data 经 freeze 逐层转为只读结构，需要修改时用 thaw 复制）"""
+    version: int
+    created_at: float   # time.time()
+    data: Mapping[str, Any]
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+class _Refresh:
+    """进行中的一次采集，供并发调用方等待同一结果"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.epoch: Optional[SnapshotEpoch] = None
+        self.error: Optional[BaseException] = None
+
+
+class SharedSnapshot:
+    """
+    进程内共享快照
+
+    每个 Streamlit 会话原先各自调用 retrieve_all_data 并在 session_state 保存私有副本，
+    十个分析师打开页面就是十次完整采集（含付费的 Perplexity 调用）。本类改为：
+    - 每次采集生成一个带递增版本号的 SnapshotEpoch（发布时深拷贝并逐层冻结），所有会话按引用共用
+    - get()：当前版本未超过 max_age 秒时直接返回，否则刷新
+    - refresh(seen_version)：调用方看到的版本已不是最新时直接返回最新版本，否则采集新版本
+    - 并发的刷新请求合并为一次采集（单飞），其他调用方等待同一结果
+    采集失败时保留当前版本，异常传递给所有等待者。
+    """
+
+    def __init__(self, collect: Callable[[Optional[ProgressCallback]], Dict[str, Any]],
+                 max_age: float = 300):
+        self._collect = collect
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._current: Optional[SnapshotEpoch] = None
+        self._refresh: Optional[_Refresh] = None
+        self._counters = {"collections": 0, "served": 0, "coalesced": 0, "errors": 0}
+
+    def current(self) -> Optional[SnapshotEpoch]:
+        return self._current
+
+    def get(self, progress_callback: Optional[ProgressCallback] = None) -> SnapshotEpoch:
+        """返回当前版本；没有或已超过 max_age 秒时刷新"""
+        with self._lock:
+            epoch = self._current
+            if epoch is not None and epoch.age < self.max_age:
+                self._counters["served"] += 1
+                return epoch
+        return self.refresh(epoch.version if epoch else 0, progress_callback)
+
+    def refresh(self, seen_version: int = 0,
+                progress_callback: Optional[ProgressCallback] = None) -> SnapshotEpoch:
+        """
+        刷新快照
+
+        Args:
+            seen_version: 调用方当前使用的版本；已有更新的版本（其他会话刚刷新过）时直接返回，不重复采集
+            progress_callback: 进度回调，只有实际执行采集的调用方会收到
+        """
+        with self._lock:
+            current = self._current
+            if current is not None and current.version > seen_version:
+                self._counters["served"] += 1
+                return current
+            flight = self._refresh
+            leader = flight is None
+            if leader:
+                flight = _Refresh()
+                self._refresh = flight
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.epoch
+
+        try:
+            data = self._collect(progress_callback)
+            with self._lock:
+                version = (self._current.version if self._current else 0) + 1
+                flight.epoch = SnapshotEpoch(version, time.time(), freeze(data))
+                self._current = flight.epoch
+                self._counters["collections"] += 1
+            return flight.epoch
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._counters["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._refresh = None
+            flight.event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            epoch = self._current
+        stats["version"] = epoch.version if epoch else 0
+        stats["age_seconds"] = round(epoch.age, 1) if epoch else None
+        return stats
+
+
+_shared: Optional[SharedSnapshot] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_snapshot(collect: Callable[[Optional[ProgressCallback]], Dict[str, Any]],
+                        max_age: float = 300) -> SharedSnapshot:
+    """
+    进程内唯一的共享快照（首次调用时创建）
+
+    之后的调用返回已有实例，collect / max_age 不生效；与已有实例不一致时打印警告。
+    collect 按模块 + 限定名比较（Streamlit 重新执行脚本时同名函数是新对象，视为同一个）。
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SharedSnapshot(collect, max_age)
+            import metrics
+            metrics.bind_shared_snapshot(_shared.stats)
+        elif max_age != _shared.max_age or _callable_name(collect) != _callable_name(_shared._collect):
+            print(f"⚠️ 共享快照已创建（{_callable_name(_shared._collect)}, max_age={_shared.max_age}），"
+                  f"忽略本次参数（{_callable_name(collect)}, max_age={max_age}）")
+        return _shared
+
+
+def _callable_name(func: Callable) -> str:
+    return f"{getattr(func, '__module__', '?')}.{getattr(func, '__qualname__', repr(func))}"
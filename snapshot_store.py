@@ -0,0 +1,189 @@
+# snapshot_store.py - 采集快照的本地时间序列存储（定长记录追加文件）
+
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# 指标编号 = 在元组中的位置，只允许在末尾追加新指标，保证历史文件可读
+SNAPSHOT_INDICATORS = (
+    "usdcny_mid", "usdcnh_spot", "cny_spread",
+    "usdhkd", "hibor_overnight", "hibor_1w", "hibor_1m", "hkd_usd_spread",
+    "eurusd", "usdjpy", "gbpusd", "audusd", "usdcad", "usdchf", "dxy",
+    "us10y", "us2y", "yield_curve", "vix", "fed_rate",
+)
+_INDICATOR_IDS = {name: i for i, name in enumerate(SNAPSHOT_INDICATORS)}
+
+# 每条记录 18 字节：时间戳（epoch 秒）、指标编号、数值
+RECORD_DTYPE = np.dtype([("ts", "<f8"), ("indicator", "<u2"), ("value", "<f8")])
+
+# 写入提示词的历史摘要所覆盖的指标
+SUMMARY_INDICATORS = ("usdcny_mid", "usdcnh_spot", "usdhkd", "hibor_overnight", "dxy", "us10y", "vix")
+
+
+class SnapshotStore:
+    """
+    采集快照的时间序列存储
+
+    每次 retrieve_all_data 的数值指标按 (时间戳, 指标, 数值) 追加到一个定长记录文件，
+    读取时用 np.fromfile 一次性映射为结构化数组，查询均为向量化操作。
+    追加写入单次 write 完成，多进程同时追加不会交错。
+    与最近一次快照完全相同的数值（全部来自缓存的重复采集）不再追加，避免重复点挤占区间统计。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._cached: Optional[tuple] = None  # ((size, mtime), records)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def append(self, values: Dict[str, Any], ts: Optional[float] = None) -> int:
+        """
+        追加一次快照，忽略 None / 非数值 / 未登记的指标，返回写入条数
+
+        数值与最近一次快照完全相同时不写入，返回 0。
+        """
+        ts = time.time() if ts is None else ts
+        rows = [
+            (ts, _INDICATOR_IDS[name], float(value))
+            for name, value in values.items()
+            if name in _INDICATOR_IDS and isinstance(value, (int, float)) and not isinstance(value, bool)
+        ]
+        if not rows:
+            return 0
+        records = np.array(rows, dtype=RECORD_DTYPE)
+        with self._lock:
+            if self._last_snapshot() == {int(r["indicator"]): float(r["value"]) for r in records}:
+                return 0
+            with open(self.path, "ab") as f:
+                f.write(records.tobytes())
+        return len(rows)
+
+    def append_context(self, ctx) -> int:
+        """追加一个 DataContext 的全部数值指标"""
+        values: Dict[str, Any] = {}
+        for section in (ctx.cny, ctx.hkd, ctx.global_fx, ctx.macro):
+            values.update(section)
+        return self.append(values)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def _records(self) -> np.ndarray:
+        """读取全部记录；文件未变化时复用上次读取结果"""
+        if not os.path.exists(self.path):
+            return np.empty(0, dtype=RECORD_DTYPE)
+        stat = os.stat(self.path)
+        signature = (stat.st_size, stat.st_mtime)
+        cached = self._cached
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        count = stat.st_size // RECORD_DTYPE.itemsize  # 忽略可能正在写入的半条记录
+        records = np.fromfile(self.path, dtype=RECORD_DTYPE, count=count)
+        self._cached = (signature, records)
+        return records
+
+    def _last_snapshot(self) -> Dict[int, float]:
+        """最近一次快照的 指标编号 -> 数值（同一次 append 的记录时间戳相同）"""
+        records = self._records()
+        if records.size == 0:
+            return {}
+        latest = records[records["ts"] == records["ts"].max()]
+        return {int(r["indicator"]): float(r["value"]) for r in latest}
+
+    def series(self, indicator: str, start: Optional[float] = None,
+               end: Optional[float] = None) -> pd.Series:
+        """单个指标在 [start, end] 区间内的序列，索引为时间"""
+        records = self._records()
+        mask = records["indicator"] == _INDICATOR_IDS[indicator]
+        if start is not None:
+            mask &= records["ts"] >= start
+        if end is not None:
+            mask &= records["ts"] <= end
+        selected = records[mask]
+        index = pd.to_datetime(selected["ts"], unit="s")
+        return pd.Series(selected["value"], index=index, name=indicator).sort_index()
+
+    def frame(self, indicators: Optional[Iterable[str]] = None,
+              start: Optional[float] = None, end: Optional[float] = None) -> pd.DataFrame:
+        """宽表：行为快照时间，列为指标"""
+        names = list(indicators) if indicators is not None else list(SNAPSHOT_INDICATORS)
+        columns = {name: self.series(name, start, end) for name in names}
+        columns = {name: s for name, s in columns.items() if not s.empty}
+        if not columns:
+            return pd.DataFrame()
+        return pd.DataFrame(columns)
+
+    def week_over_week(self, indicator: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """最新值与一周前（不晚于 7 天前的最后一次快照）的对比，历史不足一周时返回 None"""
+        now = time.time() if now is None else now
+        s = self.series(indicator, end=now)
+        if s.empty:
+            return None
+        week_ago = s[s.index <= pd.to_datetime(now - 7 * 86400, unit="s")]
+        if week_ago.empty:
+            return None
+        latest, previous = round(float(s.iloc[-1]), 4), round(float(week_ago.iloc[-1]), 4)
+        return {
+            "latest": latest,
+            "week_ago": previous,
+            "change": round(latest - previous, 4),
+            "change_pct": round((latest - previous) / previous * 100, 2) if previous else None,
+        }
+
+    def rolling_extremes(self, indicator: str, window_days: int = 28,
+                         now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """最近 window_days 天的最高 / 最低值及出现时间"""
+        now = time.time() if now is None else now
+        s = self.series(indicator, start=now - window_days * 86400, end=now)
+        if s.empty:
+            return None
+        return {
+            "high": round(float(s.max()), 4),
+            "high_at": s.idxmax().strftime("%Y-%m-%d"),
+            "low": round(float(s.min()), 4),
+            "low_at": s.idxmin().strftime("%Y-%m-%d"),
+            "samples": int(s.size),
+        }
+
+    def summary(self, indicators: Iterable[str] = SUMMARY_INDICATORS,
+                window_days: int = 28) -> Dict[str, Any]:
+        """供报告提示词使用的历史摘要（周环比 + 区间高低点），无历史的指标省略"""
+        now = time.time()
+        result: Dict[str, Any] = {}
+        for name in indicators:
+            entry: Dict[str, Any] = {}
+            wow = self.week_over_week(name, now)
+            if wow is not None:
+                entry["week_over_week"] = wow
+            extremes = self.rolling_extremes(name, window_days, now)
+            # 样本数随采集次数变化，只用于判断区间是否有意义，不写入提示词
+            if extremes is not None and extremes.pop("samples") > 1:
+                entry[f"{window_days}d_range"] = extremes
+            if entry:
+                result[name] = entry
+        return result
+
+
+_stores: Dict[str, SnapshotStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_snapshot_store(data_dir: str) -> SnapshotStore:
+    """按数据目录复用存储实例"""
+    path = os.path.join(data_dir, "snapshots.bin")
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = SnapshotStore(path)
+            _stores[path] = store
+        return store
@@ -2,13 +2,34 @@
 
 import streamlit as st
 import datetime
+import time
 import traceback
 import re
 
+import metrics
+import prefetcher
+from config import CONVERSATION_CONFIG, METRICS_CONFIG, PREFETCH_CONFIG, SHARED_SNAPSHOT_CONFIG
+from conversation_memory import ConversationMemory
+from shared_snapshot import get_shared_snapshot, thaw
+
 # --- 页面配置 ---
 st.set_page_config(page_title="外汇周报生成器", layout="wide")
 st.title("📊 外汇周报生成器")
 
+# Streamlit 每次交互都会从头重新执行本脚本：下面的指标服务、后台预取与共享快照都是进程级单例，
+# 对应的 start_http_server / start_background / get_shared_snapshot 重复调用时返回已有实例
+
+# --- 运行指标旁路服务（设置 METRICS_PORT 时启动，进程内只启动一次）---
+if METRICS_CONFIG.get("port"):
+    try:
+        metrics.start_http_server(METRICS_CONFIG["port"], METRICS_CONFIG.get("addr", "0.0.0.0"))
+    except OSError as e:
+        st.sidebar.caption(f"指标服务未启动: {e}")
+
+# --- 后台预取：保持数据缓存常热，点击「采集数据」时直接命中缓存（进程内只启动一次）---
+if PREFETCH_CONFIG.get("enabled"):
+    prefetcher.start_background()
+
 # --- Session State 初始化 ---
 if 'report_text' not in st.session_state:
     st.session_state['report_text'] = ""
@@ -16,14 +37,16 @@ if 'pitch_ready' not in st.session_state:
     st.session_state['pitch_ready'] = False
 if 'data_context' not in st.session_state:
     st.session_state['data_context'] = None
-if 'messages' not in st.session_state:
-    st.session_state['messages'] = []
+if 'chat_memory' not in st.session_state:
+    st.session_state['chat_memory'] = ConversationMemory(**CONVERSATION_CONFIG)
 if 'data_collected' not in st.session_state:
     st.session_state['data_collected'] = False
+if 'data_version' not in st.session_state:
+    st.session_state['data_version'] = 0  # 当前会话使用的共享快照版本（0 = 尚未载入）
 if 'validation_result' not in st.session_state:
     st.session_state['validation_result'] = None
+    st.session_state['followup_usage'] = None
 
-CHAT_HISTORY_LIMIT = 3
 today = datetime.date.today()
 REPORT_DATE = today.strftime("%Y年%m月%d日")
 REPORT_PERIOD = f"截至 {REPORT_DATE}"
@@ -89,6 +112,7 @@ def do_collect_data(progress_callback=None):
         "HIBOR_OVERNIGHT": ctx_obj.hkd.get("hibor_overnight"),
         "HIBOR_1W": ctx_obj.hkd.get("hibor_1w"),
         "HIBOR_1M": ctx_obj.hkd.get("hibor_1m"),
+        "HIBOR": ctx_obj.hibor,  # HIBOR 定盘日期 / 期限结构 / 趋势
         "HKD_USD_SPREAD": ctx_obj.hkd.get("hkd_usd_spread"),
         "LERS_POSITION": ctx_obj.hkd.get("lers_position"),
         "EURUSD": ctx_obj.global_fx.get("eurusd"),
@@ -104,40 +128,125 @@ def do_collect_data(progress_callback=None):
         "VIX_LAST": ctx_obj.macro.get("vix"),
         "FED_RATE": ctx_obj.macro.get("fed_rate"),
         "MARKET_SENTIMENT": ctx_obj.macro.get("market_sentiment"),
+        "HISTORY": ctx_obj.history,  # 本地快照计算的周环比 / 区间高低点
         "NEWS": ctx_obj.news,  # 短标题（用于页面展示）
         "NEWS_DETAIL": ctx_obj.news_detail,  # 详细摘要（用于LLM生成报告）
         "NEWS_SOURCES": ctx_obj.news_sources,
         "ERRORS": ctx_obj.errors,
+        "FETCH_SPANS": ctx_obj.fetch_spans,  # 各数据源取数耗时（见 DataContext.add_span）
         "data_points": ctx_obj._count_data_points(),
     }
     return ctx
 
 
+# 进程内共享快照：所有会话按引用共用同一份采集结果，并发采集请求只执行一次
+# （首次执行时按这里的参数创建；修改 max_age_seconds 需重启进程才生效）
+SHARED_SNAPSHOT = get_shared_snapshot(do_collect_data, SHARED_SNAPSHOT_CONFIG["max_age_seconds"])
+
+
+def use_snapshot(epoch):
+    """让当前会话指向共享快照的某个版本（只保存引用，不复制数据）"""
+    st.session_state['data_context'] = epoch.data
+    st.session_state['data_version'] = epoch.version
+    st.session_state['data_collected'] = True
+
+
+def reset_report_state():
+    st.session_state['report_text'] = ""
+    st.session_state['chat_memory'] = ConversationMemory(**CONVERSATION_CONFIG)
+    st.session_state['validation_result'] = None
+    st.session_state['followup_usage'] = None
+
+
+def render_fetch_waterfall(spans):
+    """采集耗时瀑布图：每行一次取数，横轴为相对采集开始的时间，颜色区分缓存状态"""
+    if not spans:
+        st.caption("无取数记录")
+        return
+    
+    rows = [
+        {
+            "取数": f"{s['source']} · {s['key']}",
+            "开始(ms)": s["start_ms"],
+            "结束(ms)": round(s["start_ms"] + s["duration_ms"], 1),
+            "耗时(ms)": s["duration_ms"],
+            "缓存": s["cache"],
+            "请求次数": s["attempts"],
+            "字节": s["bytes"],
+            "错误": s["error"] or "",
+        }
+        for s in sorted(spans, key=lambda s: s["start_ms"])
+    ]
+    st.vega_lite_chart(
+        {
+            "data": {"values": rows},
+            "mark": {"type": "bar", "cornerRadius": 2},
+            "encoding": {
+                "y": {"field": "取数", "type": "nominal", "sort": None, "title": None},
+                "x": {"field": "开始(ms)", "type": "quantitative", "title": "ms"},
+                "x2": {"field": "结束(ms)"},
+                "color": {
+                    "field": "缓存", "type": "nominal",
+                    "scale": {
+                        "domain": ["miss", "hit", "disk", "coalesced", "stale"],
+                        "range": ["#e45756", "#54a24b", "#72b7b2", "#4c78a8", "#f58518"],
+                    },
+                },
+                "tooltip": [
+                    {"field": "取数"}, {"field": "耗时(ms)"}, {"field": "缓存"},
+                    {"field": "请求次数"}, {"field": "字节"}, {"field": "错误"},
+                ],
+            },
+            "height": max(120, 24 * len(rows)),
+        },
+        use_container_width=True,
+    )
+    
+    slowest = max(spans, key=lambda s: s["duration_ms"])
+    retried = sum(1 for s in spans if s["attempts"] > 1)
+    st.caption(f"最慢: {slowest['source']} {slowest['duration_ms']}ms · "
+               f"回源 {sum(1 for s in spans if s['cache'] == 'miss')} 次 · 含重试 {retried} 次")
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+
 # ==============================================================================
 # 侧边栏
 # ==============================================================================
 with st.sidebar:
     st.header("⚙️ 控制面板")
     
-    # 刷新数据按钮
+    # 刷新数据按钮：其他会话已刷新出更新的版本时直接使用，否则重新采集（共享给所有会话）
     if st.button("🔄 刷新数据", use_container_width=True):
-        st.session_state['data_context'] = None
-        st.session_state['data_collected'] = False
-        st.session_state['report_text'] = ""
-        st.session_state['messages'] = []
-        st.session_state['validation_result'] = None
+        try:
+            with st.spinner("正在刷新共享数据..."):
+                epoch = SHARED_SNAPSHOT.refresh(st.session_state.get('data_version', 0))
+            use_snapshot(epoch)
+            reset_report_state()
+        except Exception as e:
+            st.error(f"❌ 数据刷新失败: {str(e)}")
         st.rerun()
     
     # 生成报告按钮 - 检查data_context是否存在
     has_data = st.session_state.get('data_collected', False) and st.session_state.get('data_context') is not None
     generate_btn = st.button("📝 生成周报", use_container_width=True, type="primary", 
                              disabled=not has_data)
+    # 相同数据已生成过报告时默认直接复用（报告缓存），勾选后强制重新调用模型
+    force_regenerate = st.checkbox("♻️ 忽略缓存重新生成", value=False, disabled=not has_data,
+                                   help="相同数据、模型与参数已生成过报告时，默认直接复用该报告及其校验结果")
     
     # 数据状态
     if st.session_state.get('data_context'):
         ctx = st.session_state['data_context']
         st.markdown("---")
         st.subheader("📊 数据状态")
+        latest = SHARED_SNAPSHOT.current()
+        st.caption(f"共享数据版本 v{st.session_state['data_version']} · 采集于 {ctx.get('SNAPSHOT', '')}")
+        if latest is not None and latest.version > st.session_state['data_version']:
+            st.info(f"已有更新的数据 v{latest.version}")
+            if st.button("📥 载入最新数据", use_container_width=True):
+                use_snapshot(latest)
+                reset_report_state()
+                st.rerun()
         col1, col2 = st.columns(2)
         with col1:
             st.metric("数据点", ctx.get('data_points', 0))
@@ -153,7 +262,7 @@ with st.sidebar:
                     st.caption(f"• {err}")
         
         with st.expander("🔍 原始数据"):
-            st.json(ctx)
+            st.json(thaw(ctx))
     
     st.markdown("---")
     st.caption(f"更新: {datetime.datetime.now().strftime('%H:%M:%S')}")
@@ -177,14 +286,15 @@ if not st.session_state.get('data_collected', False):
                 def update_progress(step, total, msg):
                     status.write(msg)
                 
-                ctx = do_collect_data(progress_callback=update_progress)
+                # 共享快照足够新时直接复用；其他会话正在采集时等待同一次采集
+                epoch = SHARED_SNAPSHOT.get(progress_callback=update_progress)
+                ctx = epoch.data
                 
                 status.write("🔍 数据清洗与格式化...")
-                status.write("✅ 数据采集完成")
+                status.write(f"✅ 数据就绪（共享版本 v{epoch.version}）")
             
-            # 保存到 session state
-            st.session_state['data_context'] = ctx
-            st.session_state['data_collected'] = True
+            # session state 只保存共享快照的引用
+            use_snapshot(epoch)
             
             st.success(f"✅ 数据就绪！共 {ctx['data_points']} 个数据点，{len(ctx.get('NEWS', []))} 条新闻")
             
@@ -252,6 +362,9 @@ else:
                 fed = ctx.get('FED_RATE')
                 st.write(f"联邦基金利率: {fed}%" if fed else "联邦基金利率: N/A")
         
+        with st.expander("⏱️ 采集耗时"):
+            render_fetch_waterfall(ctx.get('FETCH_SPANS', []))
+        
         # 显示新闻
         news_list = ctx.get('NEWS', [])
         news_sources = ctx.get('NEWS_SOURCES', [])
@@ -263,7 +376,7 @@ else:
                     # 获取对应的URLs（可能有多个）
                     urls = []
                     if i < len(news_sources) and news_sources[i] is not None:
-                        source_urls = news_sources[i] if isinstance(news_sources[i], list) else [news_sources[i]]
+                        source_urls = news_sources[i] if isinstance(news_sources[i], (list, tuple)) else [news_sources[i]]
                         urls = [u for u in source_urls if u and isinstance(u, str) and u.startswith('http')]
                     
                     # 展示：编号 + 内容 + 链接(可能多个)
@@ -289,14 +402,15 @@ st.markdown("---")
 st.subheader("📄 周度报告")
 
 if generate_btn and st.session_state.get('data_collected', False):
-    ctx = st.session_state['data_context']
+    # 共享快照是只读结构，生成报告使用私有的可修改副本（DataContext 字段需要能直接序列化为 JSON）
+    ctx = thaw(st.session_state['data_context'] or {})
     
     if not ctx:
         st.error("数据未加载，请先采集数据")
     else:
         try:
             from config import DEEPSEEK_CLIENT, DEEPSEEK_MODEL_NAME, DEEPSEEK_MODEL, REPORT_CONFIG
-            from report_generator import verify_numbers_hard_code
+            from report_generator import verify_numbers_hard_code, lookup_cached_report, store_cached_report
             from prompt_templates import get_report_prompt
             from data_retriever import DataContext
             
@@ -337,6 +451,8 @@ if generate_btn and st.session_state.get('data_collected', False):
                 "fed_rate": ctx.get('FED_RATE'),
                 "market_sentiment": ctx.get('MARKET_SENTIMENT'),
             }
+            ctx_obj.history = ctx.get('HISTORY', {})
+            ctx_obj.hibor = ctx.get('HIBOR', {})
             ctx_obj.news = ctx.get('NEWS', [])
             ctx_obj.news_detail = ctx.get('NEWS_DETAIL', [])  # 详细摘要用于LLM生成报告
             ctx_obj.news_sources = ctx.get('NEWS_SOURCES', [])
@@ -348,30 +464,42 @@ if generate_btn and st.session_state.get('data_collected', False):
                 # 使用 prompt_templates（包含历史锚点）生成报告
                 data_json = ctx_obj.to_json()
                 prompts = get_report_prompt(data_json)
+                fingerprint, cached = lookup_cached_report(data_json, regenerate=force_regenerate)
                 
-                status.write("✍️ 正在撰写报告...")
-                report_placeholder = st.empty()
-                full_response = ""
-                
-                response_stream = DEEPSEEK_CLIENT.chat.completions.create(
-                    model=DEEPSEEK_MODEL,
-                    messages=[
-                        {"role": "system", "content": prompts["system"]},
-                        {"role": "user", "content": prompts["user"]}
-                    ],
-                    max_tokens=REPORT_CONFIG["max_tokens"],
-                    temperature=REPORT_CONFIG["temperature"],
-                    stream=True
-                )
-                
-                for chunk in response_stream:
-                    if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
-                        full_response += chunk.choices[0].delta.content
-                        report_placeholder.markdown(full_response)
-                
-                status.write("🔍 执行数值校验...")
-                # 执行校验（使用字典格式，与 do_collect_data 返回的格式一致）
-                validation_result = verify_numbers_hard_code(ctx, full_response)
+                if cached is not None:
+                    # 相同数据已生成过：直接复用报告和校验结果，不再调用模型
+                    status.write(f"⚡ 复用 {cached['created_at']} 基于相同数据生成的报告（指纹 {fingerprint[:12]}）")
+                    full_response = cached["report"]
+                    validation_result = cached["validation"]
+                    if validation_result is None:
+                        validation_result = verify_numbers_hard_code(ctx, full_response)
+                else:
+                    status.write("✍️ 正在撰写报告...")
+                    report_placeholder = st.empty()
+                    full_response = ""
+                    
+                    request_started = time.perf_counter()
+                    response_stream = DEEPSEEK_CLIENT.chat.completions.create(
+                        model=DEEPSEEK_MODEL,
+                        messages=[
+                            {"role": "system", "content": prompts["system"]},
+                            {"role": "user", "content": prompts["user"]}
+                        ],
+                        max_tokens=REPORT_CONFIG["max_tokens"],
+                        temperature=REPORT_CONFIG["temperature"],
+                        stream=True,
+                        stream_options={"include_usage": True}  # 最后一个分片携带 Token 用量
+                    )
+                    
+                    for chunk in metrics.instrument_stream("report", response_stream, request_started):
+                        if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                            full_response += chunk.choices[0].delta.content
+                            report_placeholder.markdown(full_response)
+                    
+                    status.write("🔍 执行数值校验...")
+                    # 执行校验（使用字典格式，与 do_collect_data 返回的格式一致）
+                    validation_result = verify_numbers_hard_code(ctx, full_response)
+                    store_cached_report(fingerprint, full_response, validation_result)
                 st.session_state['validation_result'] = validation_result
                 status.write("✅ 报告生成完成")
             
@@ -413,7 +541,7 @@ elif st.session_state.get('report_text'):
                 st.table(audit_df)
     
     # 免责声明
-    st.caption("⚠️ **风险提示**：本报告中的历史行情对比基于 AI 语义分析及静态锚点数据，非全量历史数据回测结果。所有投资决策请以实时盘面为准。")
+    st.caption("⚠️ **风险提示**：本报告中的历史行情对比基于 AI 语义分析及历史锚点数据（由中间价历史统计得出），非完整回测结果。所有投资决策请以实时盘面为准。")
     
     st.session_state['pitch_ready'] = True
 
@@ -431,15 +559,30 @@ st.markdown("---")
 st.subheader("💬 追问细节")
 
 if st.session_state.get('pitch_ready'):
-    for i, (query, response) in enumerate(st.session_state['messages']):
+    chat_memory = st.session_state['chat_memory']
+    for i, (query, response) in enumerate(chat_memory.turns):
         st.markdown(f"**👉 {i+1}**: {query}")
         st.markdown(f"**🤖**: {response}")
         st.divider()
     
+    if chat_memory.compacted:
+        memory_stats = chat_memory.stats()
+        st.caption(f"🧠 对话记忆：最近 {memory_stats['verbatim_turns']} 轮原文 + {memory_stats['summary_lines']} 行摘要"
+                   f"（约 {memory_stats['history_tokens']} tokens，较早的问答已压缩）")
+    
+    # 上一次追问的前缀缓存命中情况（报告与新闻来源作为稳定前缀，第二个问题起应大部分命中）
+    last_usage = st.session_state.get('followup_usage')
+    if last_usage:
+        ratio = metrics.prefix_hit_ratio(last_usage)
+        if ratio is not None:
+            st.caption(f"⚡ 上次追问输入 {int(last_usage.get('prompt', 0))} tokens，"
+                       f"前缀缓存命中 {int(last_usage.get('prompt_cache_hit', 0))}（{ratio:.0%}）")
+    
     user_input = st.chat_input("生成 Pitch / 深入分析...")
     
     if user_input:
         from config import DEEPSEEK_CLIENT, DEEPSEEK_MODEL_NAME
+        from prompt_templates import get_chat_followup_messages
         
         output_placeholder = st.empty()
         full_response = ""
@@ -456,47 +599,46 @@ if st.session_state.get('pitch_ready'):
                     news_text = item if isinstance(item, str) else str(item)
                     url = ""
                     if i < len(news_sources) and news_sources[i]:
-                        urls = news_sources[i] if isinstance(news_sources[i], list) else [news_sources[i]]
+                        urls = news_sources[i] if isinstance(news_sources[i], (list, tuple)) else [news_sources[i]]
                         url = urls[0] if urls else ""
                     if url:
                         news_context += f"{i+1}. {news_text}\n   来源: {url}\n"
                     else:
                         news_context += f"{i+1}. {news_text}\n   来源: Perplexity搜索综合\n"
         
-        prompt = f"""你是外汇分析师助手。根据以下报告和新闻来源回答用户问题。
-
-**【周报内容】**
-{st.session_state['report_text']}
-{news_context}
-
-**【用户问题】**
-{user_input}
-
-**回答要求**：
-- 如果用户询问某个信息的来源，请指出具体的新闻条目和URL
-- 如果报告中提到的数据来源于API（如外管局、FRED、东方财富），请说明
-- 新闻内容来源于Perplexity搜索，可能是综合多个网站的信息"""
+        # 报告 + 新闻来源为稳定前缀，问题为最后一条消息（同一份报告的追问命中 DeepSeek 前缀缓存）
+        followup_messages = get_chat_followup_messages(
+            report=st.session_state['report_text'],
+            news_context=news_context,
+            question=user_input,
+            history=chat_memory.messages(),
+        )
         
         with st.spinner("分析中..."):
             try:
+                request_started = time.perf_counter()
                 stream = DEEPSEEK_CLIENT.chat.completions.create(
                     model=DEEPSEEK_MODEL_NAME,
-                    messages=[{"role": "user", "content": prompt}],
+                    messages=followup_messages,
                     temperature=0.3,
                     max_tokens=2000,
-                    stream=True
+                    stream=True,
+                    stream_options={"include_usage": True}
                 )
-                for chunk in stream:
+                usage: list = []
+                for chunk in metrics.instrument_stream("followup", stream, request_started, on_usage=usage.append):
                     if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
                         full_response += chunk.choices[0].delta.content
                         output_placeholder.markdown(full_response)
+                if usage:
+                    st.session_state['followup_usage'] = usage[-1]
             except Exception as e:
-                full_response = f"错误: {e}"
+                # 失败的回答不写入对话记忆，避免作为历史发送给模型
+                st.error(f"错误: {e}")
+                full_response = ""
         
         if full_response:
-            st.session_state['messages'].append((user_input, full_response))
-            if len(st.session_state['messages']) > CHAT_HISTORY_LIMIT:
-                st.session_state['messages'].pop(0)
+            chat_memory.add(user_input, full_response)
             st.rerun()
 
 else:
@@ -0,0 +1,31 @@
+# tests/test_atomic_io.py - 原子写入：并发写同一路径不会留下半写文件或临时文件
+
+import os
+import threading
+
+import pytest
+
+from atomic_io import atomic_write
+
+
+def test_concurrent_writers_leave_one_complete_file(tmp_path):
+    path = str(tmp_path / "state.json")
+    payloads = [str(i) * 50000 for i in range(8)]
+    threads = [threading.Thread(target=atomic_write, args=(path, payload)) for payload in payloads]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with open(path, encoding="utf-8") as f:
+        assert f.read() in payloads
+    assert os.listdir(tmp_path) == ["state.json"]
+
+
+def test_failed_write_keeps_old_file_and_removes_tmp(tmp_path):
+    path = str(tmp_path / "state.bin")
+    atomic_write(path, b"old")
+    with pytest.raises(TypeError):
+        atomic_write(path, 123)
+    with open(path, "rb") as f:
+        assert f.read() == b"old"
+    assert os.listdir(tmp_path) == ["state.bin"]
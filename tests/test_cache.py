@@ -0,0 +1,220 @@
+# tests/test_cache.py - TTLCache：命名空间 TTL、LRU 淘汰、单飞合并
+
+import threading
+import time
+
+import pytest
+
+from cache import DiskCacheTier, TTLCache
+
+
+def test_namespace_ttl_uses_longest_prefix():
+    cache = TTLCache(namespace_ttl={"fred": 300, "fred_ffr": 3600}, default_ttl=60)
+    assert cache.namespace_of("fred_us10y") == "fred"
+    assert cache.namespace_of("fred_ffr") == "fred_ffr"
+    assert cache.namespace_of("news_policy") is None
+    assert cache.ttl_for("fred_us10y") == 300
+    assert cache.ttl_for("fred_ffr") == 3600
+    assert cache.ttl_for("news_policy") == 60
+
+
+def test_hit_within_ttl_and_refetch_after_expiry():
+    cache = TTLCache(namespace_ttl={"yahoo": 60})
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.lookup("yahoo_dxy", fetch).status == "miss"
+    result = cache.lookup("yahoo_dxy", fetch)
+    assert (result.value, result.status) == (1, "hit")
+
+    cache.set("yahoo_dxy", 1, stored_at=time.time() - 61)
+    result = cache.lookup("yahoo_dxy", fetch)
+    assert (result.value, result.status) == (2, "miss")
+    assert cache.stats()["expirations"] == 1
+
+
+def test_callable_ttl_receives_value_and_stored_at():
+    cache = TTLCache()
+    seen = []
+
+    def ttl(value, stored_at):
+        seen.append((value, stored_at))
+        return 0 if value == "old" else 3600
+
+    cache.lookup("cny_mid", lambda: "old", ttl)
+    assert cache.lookup("cny_mid", lambda: "new", ttl).value == "new"
+    assert cache.lookup("cny_mid", lambda: "newer", ttl).status == "hit"
+    assert seen[0][0] == "old"
+
+
+def test_lru_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.lookup("a", lambda: 0)      # a 变为最近使用
+    cache.set("c", 3)
+    assert [key for key, *_ in cache.entries()] == ["a", "c"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_concurrent_misses_fetch_once():
+    cache = TTLCache()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.lookup("forex_spot", fetch)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()["coalesced"] < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(r.status for r in results) == ["coalesced"] * 4 + ["miss"]
+    assert all(r.value == "value" for r in results)
+
+
+def test_fetch_error_reaches_waiters_and_is_not_cached():
+    cache = TTLCache()
+
+    def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        cache.lookup("hibor", fail)
+    assert cache.lookup("hibor", lambda: "ok").value == "ok"
+
+
+# ----------------------------------------------------------------------------
+# 过期后台刷新（stale-while-revalidate）
+# ----------------------------------------------------------------------------
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "等待超时"
+        time.sleep(0.01)
+
+
+def test_stale_value_served_while_refreshing_in_background():
+    cache = TTLCache(namespace_ttl={"yahoo": 60}, max_stale={"yahoo": 300})
+    cache.set("yahoo_dxy", "old", stored_at=time.time() - 100)
+    refreshed = threading.Event()
+
+    def fetch():
+        refreshed.set()
+        return "new"
+
+    result = cache.lookup("yahoo_dxy", fetch)
+    assert (result.value, result.status) == ("old", "stale")
+    assert result.age >= 100
+    assert refreshed.wait(5)
+    _wait_until(lambda: cache.lookup("yahoo_dxy", fetch).status == "hit")
+    assert cache.lookup("yahoo_dxy", fetch).value == "new"
+
+
+def test_entry_past_max_stale_blocks_on_refetch():
+    cache = TTLCache(namespace_ttl={"yahoo": 60}, max_stale={"yahoo": 300})
+    cache.set("yahoo_dxy", "old", stored_at=time.time() - 400)
+    result = cache.lookup("yahoo_dxy", lambda: "new")
+    assert (result.value, result.status) == ("new", "miss")
+
+
+def test_namespace_without_max_stale_never_serves_stale():
+    cache = TTLCache(namespace_ttl={"cny_mid": 60, "yahoo": 60}, max_stale={"yahoo": 300})
+    cache.set("cny_mid", "yesterday", stored_at=time.time() - 100)
+    result = cache.lookup("cny_mid", lambda: "today")
+    assert (result.value, result.status) == ("today", "miss")
+
+
+def test_failed_background_refresh_keeps_old_value():
+    cache = TTLCache(namespace_ttl={"yahoo": 60}, max_stale={"yahoo": 300})
+    cache.set("yahoo_dxy", "old", stored_at=time.time() - 100)
+
+    def fail():
+        raise RuntimeError("upstream down")
+
+    assert cache.lookup("yahoo_dxy", fail).status == "stale"
+    _wait_until(lambda: cache.stats()["refresh_errors"] == 1)
+    # 旧值未被异常覆盖：再次访问仍返回旧值，并重新触发后台刷新
+    result = cache.lookup("yahoo_dxy", lambda: "new")
+    assert (result.value, result.status) == ("old", "stale")
+
+
+# ----------------------------------------------------------------------------
+# 磁盘层与跨进程回源租约（每个 DiskCacheTier 实例有独立的 owner，模拟不同进程）
+# ----------------------------------------------------------------------------
+
+def _tier(tmp_path, **options):
+    options.setdefault("poll_interval", 0.02)
+    return DiskCacheTier(str(tmp_path / "cache.db"), **options)
+
+
+def test_disk_tier_shared_between_caches(tmp_path):
+    first = TTLCache(namespace_ttl={"fred": 300}, disk=_tier(tmp_path))
+    first.lookup("fred_us10y", lambda: {"value": 4.1})
+
+    second = TTLCache(namespace_ttl={"fred": 300}, disk=_tier(tmp_path))
+    result = second.lookup("fred_us10y", lambda: pytest.fail("磁盘层有效时不应回源"))
+    assert (result.value, result.status) == ({"value": 4.1}, "disk")
+    assert second.lookup("fred_us10y", lambda: None).status == "hit"
+
+
+def test_expired_disk_entry_is_refetched(tmp_path):
+    tier = _tier(tmp_path)
+    tier.put("fred_us10y", "old", time.time() - 400)
+    cache = TTLCache(namespace_ttl={"fred": 300}, disk=tier)
+    result = cache.lookup("fred_us10y", lambda: "new")
+    assert (result.value, result.status) == ("new", "miss")
+    assert tier.get("fred_us10y")[0] == "new"
+
+
+def test_none_is_not_written_to_disk(tmp_path):
+    tier = _tier(tmp_path)
+    TTLCache(disk=tier).lookup("hibor", lambda: None)
+    assert tier.get("hibor") is None
+
+
+def test_lease_is_exclusive_until_released_or_expired(tmp_path):
+    holder = _tier(tmp_path, lease_seconds=30)
+    other = _tier(tmp_path, lease_seconds=30)
+    assert holder.acquire_lease("fred_vix")
+    assert holder.acquire_lease("fred_vix")          # 持有者可续约
+    assert not other.acquire_lease("fred_vix")
+    holder.release_lease("fred_vix")
+    assert other.acquire_lease("fred_vix")
+
+    short = _tier(tmp_path, lease_seconds=0.05)
+    assert short.acquire_lease("fred_ffr")
+    assert not other.acquire_lease("fred_ffr")
+    time.sleep(0.1)
+    assert other.acquire_lease("fred_ffr")            # 租约过期（持有进程崩溃）后可被接管
+
+
+def test_waits_for_lease_holder_instead_of_fetching(tmp_path):
+    holder = _tier(tmp_path)
+    assert holder.acquire_lease("news_policy")
+    cache = TTLCache(namespace_ttl={"news": 600}, disk=_tier(tmp_path, lease_seconds=5))
+
+    def _finish():
+        time.sleep(0.1)
+        holder.put("news_policy", ["headline"], time.time())
+        holder.release_lease("news_policy")
+
+    writer = threading.Thread(target=_finish)
+    writer.start()
+    result = cache.lookup("news_policy", lambda: pytest.fail("租约被占用时应等待持有者写入"))
+    writer.join()
+    assert (result.value, result.status) == (["headline"], "disk")
@@ -0,0 +1,122 @@
+# tests/test_circuit_breaker.py - 熔断器状态转换与自适应超时
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class _Clock:
+    """替换 time.monotonic，手动推进冷却期"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+def _fail():
+    raise ConnectionError("timeout")
+
+
+def _trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("yahoo", failure_threshold=3, cooldown_seconds=60)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+    assert breaker.state == CLOSED
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    assert breaker.state == OPEN
+    assert breaker.is_open
+
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: pytest.fail("熔断期间不应调用上游"))
+    stats = breaker.stats()
+    assert (stats["trips"], stats["rejected"], stats["failures"]) == (1, 1, 3)
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker("yahoo", failure_threshold=3)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+    assert breaker.call(lambda: "ok") == "ok"
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+    assert breaker.state == CLOSED
+
+
+def test_is_failure_counts_invalid_results(clock):
+    breaker = CircuitBreaker("safe", failure_threshold=2)
+    for _ in range(2):
+        assert breaker.call(lambda: None, is_failure=lambda result: result is None) is None
+    assert breaker.state == OPEN
+
+
+def test_half_open_allows_single_trial_then_closes(clock):
+    breaker = CircuitBreaker("hkma", failure_threshold=1, cooldown_seconds=60)
+    _trip(breaker)
+    clock.now += 59
+    assert breaker.state == OPEN
+    clock.now += 1
+    assert breaker.state == HALF_OPEN
+
+    assert breaker.allow()
+    assert not breaker.allow()          # 试探请求进行中，其余调用被拒绝
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker("hkma", failure_threshold=3, cooldown_seconds=60)
+    _trip(breaker)
+    clock.now += 60
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)              # 半开状态一次失败即重新熔断
+    assert breaker.state == OPEN
+    assert breaker.stats()["trips"] == 2
+    clock.now += 30
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+
+
+def test_timeout_tightens_to_p95_but_never_loosens():
+    breaker = CircuitBreaker("fred", min_samples=5, timeout_multiplier=3.0, min_timeout=2.0)
+    assert breaker.timeout(15) == 15                     # 样本不足
+    for latency in (0.5, 0.6, 0.7, 0.8, 1.0):
+        breaker.record_success(latency)
+    assert breaker.p95() == 1.0
+    assert breaker.timeout(15) == 3.0
+    assert breaker.timeout((5, 30)) == (3.0, 3.0)
+    assert breaker.timeout(2.5) == 2.5                   # 不超过配置值
+
+    fast = CircuitBreaker("eastmoney", min_samples=1, min_timeout=2.0)
+    fast.record_success(0.01)
+    assert fast.timeout(10) == 2.0                       # 不低于 min_timeout
+
+
+def test_get_breaker_shares_instances_and_applies_defaults(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    monkeypatch.setattr(circuit_breaker, "_defaults", {})
+    circuit_breaker.configure(failure_threshold=7)
+    breaker = circuit_breaker.get_breaker("perplexity")
+    assert circuit_breaker.get_breaker("perplexity") is breaker
+    assert breaker.failure_threshold == 7
+    assert circuit_breaker.all_breakers() == {"perplexity": breaker}
@@ -0,0 +1,74 @@
+# tests/test_conversation_memory.py - 追问记忆的预算与增量压缩（按字符数计 Token，结果可精确预期）
+
+from conversation_memory import ConversationMemory
+from prompt_templates import CONVERSATION_SUMMARY_ACK
+
+
+def _memory(**options):
+    options.setdefault("count_tokens", len)
+    return ConversationMemory(**options)
+
+
+def test_recent_turns_sent_verbatim_within_budget():
+    memory = _memory(history_tokens=100)
+    memory.add("港元呢？", "USD/HKD 在 7.78 附近。")
+    memory.add("HIBOR 呢？", "隔夜 HIBOR 4.1%。")
+    assert memory.messages() == [
+        {"role": "user", "content": "港元呢？"},
+        {"role": "assistant", "content": "USD/HKD 在 7.78 附近。"},
+        {"role": "user", "content": "HIBOR 呢？"},
+        {"role": "assistant", "content": "隔夜 HIBOR 4.1%。"},
+    ]
+    assert memory.stats()["compacted"] == 0
+
+
+def test_oldest_turn_compacted_when_over_budget():
+    memory = _memory(history_tokens=60, summary_tokens=200, excerpt_chars=10)
+    memory.add("第一问", "## 结论\n\n**人民币**中间价小幅走强，交易区间收窄。")
+    memory.add("第二问", "美元指数回落到 99 附近。")
+    memory.add("第三问", "港元仍处于弱方区间附近。")
+
+    messages = memory.messages()
+    assert messages[0]["content"].endswith("- 问：第一问 → 答：结论 人民币 中间价…")
+    assert messages[1] == {"role": "assistant", "content": CONVERSATION_SUMMARY_ACK}
+    assert [m["content"] for m in messages[2::2]] == ["第二问", "第三问"]
+    assert memory.used_tokens() <= 60
+    assert memory.stats() == {"turns": 3, "verbatim_turns": 2, "summary_lines": 1,
+                              "compacted": 1, "history_tokens": memory.used_tokens()}
+
+
+def test_summary_lines_are_not_rewritten():
+    memory = _memory(history_tokens=40, summary_tokens=1000, excerpt_chars=5)
+    for i in range(3):
+        memory.add(f"问题{i}", "回答" * 10)
+    first = memory.messages()[0]["content"]
+    memory.add("问题3", "回答" * 10)
+    assert memory.messages()[0]["content"].startswith(first)   # 增量压缩：只追加新摘要行
+
+
+def test_history_stays_bounded_as_conversation_grows():
+    memory = _memory(history_tokens=200, summary_tokens=80, excerpt_chars=20)
+    for i in range(50):
+        memory.add(f"第{i}个问题是什么", "这是一段比较长的回答，" * 5)
+        assert memory.used_tokens() <= 200
+    stats = memory.stats()
+    assert stats["turns"] == 50
+    assert stats["compacted"] + stats["verbatim_turns"] == 50
+    assert sum(len(line) for line in memory.messages()[0]["content"].splitlines()[1:]) <= 80
+
+
+def test_single_oversized_turn_is_compacted():
+    memory = _memory(history_tokens=50, excerpt_chars=10)
+    memory.add("展开说说", "很长的回答" * 100)
+    assert memory.stats()["verbatim_turns"] == 0
+    assert memory.used_tokens() <= 50
+    assert len(memory.turns) == 1     # 页面展示仍保留完整问答
+
+
+def test_clear_resets_everything():
+    memory = _memory(history_tokens=10)
+    memory.add("问题", "回答" * 20)
+    memory.clear()
+    assert len(memory) == 0
+    assert memory.messages() == []
+    assert memory.stats()["compacted"] == 0
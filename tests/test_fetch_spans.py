@@ -0,0 +1,43 @@
+# tests/test_fetch_spans.py - 取数记录：缓存状态、尝试次数、字节数与失败原因
+
+import pytest
+
+import data_retriever
+from cache import TTLCache
+from data_retriever import DataContext, _cached_fetch, _trace_attempt, _trace_bytes
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(data_retriever, "DATA_CACHE", TTLCache(namespace_ttl={"yahoo": 60}))
+
+
+def test_miss_then_hit_records_attempts_bytes_and_source():
+    ctx = DataContext()
+
+    def fetch():
+        _trace_attempt()
+        _trace_attempt()
+        _trace_bytes(512)
+        return 99.1
+
+    assert _cached_fetch(ctx, "yahoo_dxy", fetch) == 99.1
+    assert _cached_fetch(ctx, "yahoo_dxy", fetch) == 99.1
+
+    miss, hit = ctx.fetch_spans
+    assert (miss["cache"], miss["attempts"], miss["bytes"], miss["source"]) == ("miss", 2, 512, "Yahoo")
+    assert (hit["cache"], hit["attempts"], hit["bytes"]) == ("hit", 0, None)
+    assert miss["error"] is None and miss["duration_ms"] >= 0
+
+
+def test_failed_fetch_records_error_span_and_raises():
+    ctx = DataContext()
+
+    def fetch():
+        raise ConnectionError("upstream down")
+
+    with pytest.raises(ConnectionError):
+        _cached_fetch(ctx, "yahoo_dxy", fetch)
+    span, = ctx.fetch_spans
+    assert span["cache"] == "miss" and span["attempts"] == 1
+    assert span["error"] == "upstream down"
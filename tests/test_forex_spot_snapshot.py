@@ -0,0 +1,47 @@
+# tests/test_forex_spot_snapshot.py - 东方财富行情快照：按代码 / 名称查表与共享下载
+
+import threading
+import time
+
+import pandas as pd
+
+import data_retriever
+from cache import TTLCache
+from data_retriever import DataContext, ForexSpotSnapshot, get_forex_spot_snapshot
+
+FRAME = pd.DataFrame({
+    "代码": ["USDCNH", "USDHKD", "EURUSD"],
+    "名称": ["美元兑离岸人民币", "美元兑港元", "欧元兑美元"],
+    "最新价": ["7.2601", 7.8123, 1.0712],
+})
+
+
+def test_lookup_by_code_and_name_with_substring_fallback():
+    snapshot = ForexSpotSnapshot(FRAME)
+    assert snapshot.price_by_code("usdcnh") == 7.2601
+    assert snapshot.price_by_code("HKD") == 7.8123                 # 子串匹配
+    assert snapshot.price_by_name("欧元兑美元") == 1.0712
+    assert snapshot.price_by_name("港元") == 7.8123
+    assert snapshot.price_by_code("GBPUSD") is None
+    assert snapshot.by_name("英镑") is None
+
+
+def test_concurrent_consumers_share_one_download(monkeypatch):
+    monkeypatch.setattr(data_retriever, "DATA_CACHE", TTLCache(namespace_ttl={"forex_spot": 60}))
+    downloads = []
+
+    def fetch():
+        downloads.append(1)
+        time.sleep(0.05)
+        return ForexSpotSnapshot(FRAME)
+    monkeypatch.setattr(data_retriever, "_fetch_forex_spot_snapshot", fetch)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_forex_spot_snapshot(DataContext())))
+               for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(downloads) == 1
+    assert results[0] is results[1] is results[2]
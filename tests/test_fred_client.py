@@ -0,0 +1,67 @@
+# tests/test_fred_client.py - FRED 增量拉取：observation_start 窗口与重叠区合并
+
+import pandas as pd
+import pytest
+
+from fred_client import FredSeriesClient, latest_value
+
+
+class FakeFred:
+    """按 observation_start 切片返回的 fredapi 替身，记录每次请求的起始日期"""
+
+    def __init__(self, series):
+        self.series = series
+        self.starts = []
+
+    def get_series(self, series_id, observation_start=None):
+        self.starts.append(observation_start)
+        if observation_start is None:
+            return self.series.copy()
+        return self.series[self.series.index >= observation_start].copy()
+
+
+def _series(start, values):
+    return pd.Series(values, index=pd.bdate_range(start, periods=len(values)), dtype=float)
+
+
+@pytest.fixture
+def client(tmp_path):
+    client = FredSeriesClient("test-key", str(tmp_path), overlap_days=7)
+    client.fred = FakeFred(_series("2024-01-01", [4.0] * 20))
+    return client
+
+
+def test_first_fetch_downloads_full_history_then_requests_overlap_window(client):
+    first = client.get_series("DGS10")
+    assert client.fred.starts == [None]
+    assert len(first) == 20
+
+    client.get_series("DGS10")
+    assert client.fred.starts[-1] == first.index.max() - pd.Timedelta(days=7)
+
+
+def test_overlap_revisions_win_and_new_observations_are_appended(client):
+    client.get_series("DGS10")
+    revised = client.fred.series.copy()
+    revised.iloc[-1] = 4.25                                    # FRED 修订重叠窗口内的数据
+    revised[revised.index.max() + pd.offsets.BDay(1)] = 4.3   # 新发布的观测值
+    client.fred.series = revised.iloc[-10:]                   # 接口只会返回窗口内的数据
+
+    merged = client.get_series("DGS10")
+    assert len(merged) == 21
+    assert merged.index.is_monotonic_increasing
+    assert merged.iloc[-2:].tolist() == [4.25, 4.3]
+    assert merged.iloc[0] == 4.0                               # 窗口外的本地历史保留
+    assert client.load_local("DGS10").equals(merged)
+
+
+def test_empty_incremental_response_keeps_local_history(client):
+    first = client.get_series("DGS10")
+    client.fred.series = client.fred.series.iloc[:0]
+    assert client.get_series("DGS10").equals(first)
+
+
+def test_latest_value_skips_holiday_placeholders():
+    assert latest_value(pd.Series([4.1, float("nan")])) == 4.1
+    assert latest_value(pd.Series([float("nan")])) is None
+    assert latest_value(None) is None
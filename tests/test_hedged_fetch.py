@@ -0,0 +1,62 @@
+# tests/test_hedged_fetch.py - 对冲请求：落败的数据源不修改调用方的 DataContext
+
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import data_retriever
+from data_retriever import DataContext, _hedged_fetch
+
+
+def _candidate(name, value, delay=0.0, finished=None):
+    def _fetch(ctx):
+        time.sleep(delay)
+        ctx.add_span(f"yahoo_{name}", "miss", time.perf_counter(), 1)
+        ctx.stale_data[f"yahoo_{name}"] = 42
+        if finished is not None:
+            finished.set()
+        return value
+    return name, _fetch
+
+
+def test_primary_within_budget_wins_without_hedging():
+    ctx = DataContext()
+    result, errors = _hedged_fetch(ctx, "dxy", [_candidate("primary", (99.1, "Yahoo")),
+                                                _candidate("backup", (99.2, "东方财富"))], 1.0)
+    assert result == (99.1, "Yahoo")
+    assert errors == []
+    assert [span["key"] for span in ctx.fetch_spans] == ["yahoo_primary"]
+
+
+def test_losing_candidate_does_not_touch_caller_context():
+    ctx = DataContext()
+    loser_done = threading.Event()
+    result, _ = _hedged_fetch(ctx, "dxy", [_candidate("slow", (99.1, "Yahoo"), 0.3, loser_done),
+                                           _candidate("fast", (99.2, "东方财富"))], 0.05)
+    assert result == (99.2, "东方财富")
+    assert loser_done.wait(5)
+    time.sleep(0.05)
+    assert [span["key"] for span in ctx.fetch_spans] == ["yahoo_fast"]
+    assert ctx.stale_data == {"yahoo_fast": 42}
+
+
+def test_failed_candidates_are_reported_and_merged():
+    def _broken(ctx):
+        ctx.add_span("yahoo_broken", "miss", time.perf_counter(), 1, error="timeout")
+        raise ConnectionError("timeout")
+
+    ctx = DataContext()
+    result, errors = _hedged_fetch(ctx, "usdhkd", [("Yahoo", _broken), _candidate("none", None)], 1.0)
+    assert result is None
+    assert errors == ["Yahoo: timeout", "none: 无有效数据"]
+    assert {span["key"] for span in ctx.fetch_spans} == {"yahoo_broken", "yahoo_none"}
+
+
+def test_pool_created_on_first_use():
+    code = "import data_retriever; print(data_retriever._hedge_pool is None)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent,
+                            capture_output=True, text=True, check=True)
+    assert output.stdout.split()[-1] == "True"
+    assert data_retriever._get_hedge_pool() is data_retriever._get_hedge_pool()
@@ -0,0 +1,109 @@
+# tests/test_hibor_store.py - HIBOR 本地存储：分页拉取、增量刷新、期限结构与走势
+
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from hibor_store import HiborStore, fetch_records, records_to_frame, term_structure, trends
+
+
+def _record(day: date, overnight: float, one_month: float = 4.0) -> dict:
+    return {"end_of_day": day.isoformat(), "ir_overnight": overnight,
+            "ir_1week": overnight + 0.1, "ir_1month": one_month}
+
+
+class FakeHkma:
+    """按 from / offset / pagesize 切片返回的金管局替身，记录每次请求的参数"""
+
+    def __init__(self, records):
+        self.records = sorted(records, key=lambda r: r["end_of_day"], reverse=True)
+        self.calls = []
+
+    def __call__(self, params):
+        self.calls.append(params)
+        matched = [r for r in self.records if r["end_of_day"] >= params["from"]]
+        page = matched[params["offset"]:params["offset"] + params["pagesize"]]
+        return {"header": {"success": True}, "result": {"records": page}}
+
+
+def test_fetch_records_pages_until_short_batch():
+    today = date.today()
+    fake = FakeHkma([_record(today - timedelta(days=i), 4.0) for i in range(25)])
+    records = fetch_records(fake, today - timedelta(days=30), page_size=10)
+    assert len(records) == 25
+    assert [call["offset"] for call in fake.calls] == [0, 10, 20]
+
+
+def test_fetch_records_raises_on_failed_page():
+    with pytest.raises(RuntimeError):
+        fetch_records(lambda params: None, date.today())
+
+
+def test_refresh_backfills_then_requests_only_overlap_window(tmp_path):
+    today = date.today()
+    fake = FakeHkma([_record(today - timedelta(days=i), 4.0) for i in range(1, 40)])
+    store = HiborStore(str(tmp_path / "hibor.pkl"), fake, backfill_days=60,
+                       page_size=10, overlap_days=3)
+
+    first = store.refresh()
+    assert len(first) == 39
+    assert fake.calls[0]["from"] == (today - timedelta(days=60)).isoformat()
+
+    # 金管局修订昨天的定盘并发布今天的定盘：增量刷新只请求重叠窗口，新数据优先
+    fake.records = [_record(today, 4.5), _record(today - timedelta(days=1), 4.2)] + fake.records[1:]
+    fake.calls.clear()
+    merged = store.refresh()
+    assert [call["from"] for call in fake.calls] == [(today - timedelta(days=4)).isoformat()]
+    assert len(merged) == 40
+    assert merged["overnight"].iloc[-1] == 4.5
+    assert merged.loc[pd.Timestamp(today - timedelta(days=1)), "overnight"] == 4.2
+    assert store.latest_date() == today
+
+
+def test_failed_refresh_keeps_local_history(tmp_path):
+    today = date.today()
+    fake = FakeHkma([_record(today, 4.0)])
+    store = HiborStore(str(tmp_path / "hibor.pkl"), fake)
+    store.refresh()
+    store.fetch_page = lambda params: None
+    with pytest.raises(RuntimeError):
+        store.refresh()
+    assert store.load_local()["overnight"].tolist() == [4.0]
+
+
+def test_term_structure_and_trends():
+    last = date(2024, 6, 28)
+    frame = records_to_frame([
+        _record(last - timedelta(days=40), 3.0, one_month=4.0),
+        _record(last - timedelta(days=7), 3.5, one_month=4.2),
+        _record(last, 4.0, one_month=4.4),
+    ])
+    assert term_structure(frame)["overnight"] == 4.0
+    assert term_structure(frame)["3m"] is None
+
+    result = trends(frame)
+    assert result["overnight"]["change_1w_bp"] == pytest.approx(50.0)
+    assert result["overnight"]["change_1m_bp"] == pytest.approx(100.0)
+    assert result["overnight"]["avg_1m"] == pytest.approx(3.75)
+    assert result["1m"]["change_1w_bp"] == pytest.approx(20.0)
+    assert term_structure(None) == {} and trends(None) == {}
+
+
+def test_fetch_hibor_keeps_structure_out_of_hkd_data_points(tmp_path, monkeypatch):
+    import data_retriever
+    from data_retriever import DataContext
+
+    today = date.today()
+    store = HiborStore(str(tmp_path / "hibor.pkl"),
+                       FakeHkma([_record(today - timedelta(days=i), 4.0) for i in range(10)]))
+    monkeypatch.setattr(data_retriever, "_hibor_store", lambda: store)
+    monkeypatch.setattr(data_retriever, "_cached_fetch", lambda ctx, key, fetch, ttl=None: fetch())
+
+    ctx = DataContext()
+    data_retriever._fetch_hibor(ctx)
+    assert ctx.hkd == {"hibor_overnight": 4.0, "hibor_1w": 4.1, "hibor_1m": 4.0}
+    assert ctx.hibor["date"] == today.isoformat()
+    assert ctx.hibor["term_structure"]["overnight"] == 4.0
+    assert set(ctx.hibor["trend"]) == {"overnight", "1w", "1m"}
+    assert ctx.to_dict()["data_points"] == 3
@@ -0,0 +1,56 @@
+# tests/test_history_anchors.py - 中间价历史锚点：增量更新与静态锚点不被覆盖
+
+import json
+
+import pandas as pd
+import pytest
+
+import history_anchors
+from config import HISTORY_ANCHORS
+from history_anchors import ANCHOR_PREFIX, AnchorEngine
+
+
+def _frame(start, values):
+    """currency_boc_safe 格式：日期 + 每 100 美元报价"""
+    dates = pd.bdate_range(start, periods=len(values))
+    return pd.DataFrame({"日期": dates.strftime("%Y-%m-%d"), "美元": [v * 100 for v in values]})
+
+
+def test_computed_anchors_use_their_own_namespace(tmp_path):
+    engine = AnchorEngine(lookback_years=5, state_path=str(tmp_path / "anchors.json"))
+    assert engine.update_from_frame(_frame("2022-01-03", [6.4, 7.25, 6.9] * 200))
+    anchors = engine.anchors()
+    assert anchors
+    assert all(key.startswith(ANCHOR_PREFIX) for key in anchors)
+    assert not set(anchors) & set(HISTORY_ANCHORS)
+    assert anchors["USDCNY_MID_2022_HIGH"] == 7.25
+
+
+def test_static_anchors_survive_merge(tmp_path, monkeypatch):
+    engine = AnchorEngine(state_path=str(tmp_path / "anchors.json"))
+    engine.update_from_frame(_frame("2022-01-03", [6.4, 7.25, 6.9] * 200))
+    monkeypatch.setattr(history_anchors, "_engine", engine)
+    merged = history_anchors.get_history_anchors()
+    for key, value in HISTORY_ANCHORS.items():
+        assert merged[key] == value
+    assert merged["USDCNY_MID_AVG_5Y"] == engine.anchors()["USDCNY_MID_AVG_5Y"]
+
+
+def test_legacy_state_keys_are_ignored(tmp_path):
+    path = tmp_path / "anchors.json"
+    path.write_text(json.dumps({"USDCNY_2022_HIGH": 7.2, "USDCNY_MID_AVG_1Y": 7.1}), encoding="utf-8")
+    assert AnchorEngine(state_path=str(path)).anchors() == {"USDCNY_MID_AVG_1Y": 7.1}
+
+
+def test_incremental_update_only_on_new_fixings(tmp_path):
+    engine = AnchorEngine(state_path=str(tmp_path / "anchors.json"))
+    history = _frame("2026-01-05", [7.10, 7.12, 7.08])
+    assert engine.update_from_frame(history)
+    assert not engine.update_from_frame(history)                   # 没有新增定盘
+
+    extended = _frame("2026-01-05", [7.10, 7.12, 7.08, 7.20])
+    assert engine.update_from_frame(extended)
+    anchors = engine.anchors()
+    assert anchors["USDCNY_MID_YTD_HIGH"] == pytest.approx(7.20)
+    assert anchors["USDCNY_MID_ANCHORS_AS_OF"] == "2026-01-08"
+    assert json.loads((tmp_path / "anchors.json").read_text(encoding="utf-8")) == anchors
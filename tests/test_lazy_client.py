@@ -0,0 +1,29 @@
+# tests/test_lazy_client.py - DeepSeek 客户端延迟创建：导入时不加载 openai，首次使用时创建一次
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _run(code: str) -> str:
+    env = dict(os.environ, DEEPSEEK_API_KEY="test-key")
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True).stdout.strip()
+
+
+def test_importing_report_modules_does_not_load_openai():
+    code = ("import sys, config, data_retriever, report_generator; "
+            "report_generator.ReportGenerator(); print('openai' in sys.modules)")
+    assert _run(code) == "False"
+
+
+def test_client_is_created_once_on_first_use():
+    pytest.importorskip("openai")
+    code = ("import sys, config; client = config.get_deepseek_client(); "
+            "print('openai' in sys.modules, client is config.get_deepseek_client())")
+    assert _run(code) == "True True"
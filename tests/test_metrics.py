@@ -0,0 +1,80 @@
+# tests/test_metrics.py - 指标类型、文本格式导出与流式调用的结果分类
+
+from types import SimpleNamespace
+
+import pytest
+
+import metrics
+from metrics import Counter, Histogram, MetricsRegistry, _Metric
+
+
+def test_base_metric_is_abstract():
+    with pytest.raises(TypeError):
+        _Metric("fxfuel_test", "基类")
+
+
+def test_counter_renders_labels_and_rejects_decrease():
+    counter = Counter("fxfuel_test_total", "测试计数", ("source",))
+    counter.inc(source="fred")
+    counter.inc(2, source='he said "hi"')
+    with pytest.raises(ValueError):
+        counter.inc(-1, source="fred")
+    with pytest.raises(ValueError):
+        counter.inc(source="fred", extra="x")
+    assert counter.render().splitlines() == [
+        "# HELP fxfuel_test_total 测试计数",
+        "# TYPE fxfuel_test_total counter",
+        'fxfuel_test_total{source="fred"} 1',
+        'fxfuel_test_total{source="he said \\"hi\\""} 2',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("fxfuel_test_seconds", "测试耗时", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+    assert list(histogram.samples()) == [
+        'fxfuel_test_seconds_bucket{le="0.1"} 1',
+        'fxfuel_test_seconds_bucket{le="1"} 2',
+        'fxfuel_test_seconds_bucket{le="+Inf"} 3',
+        "fxfuel_test_seconds_sum 5.55",
+        "fxfuel_test_seconds_count 3",
+    ]
+
+
+def test_registry_reuses_metrics_and_rejects_conflicts():
+    registry = MetricsRegistry()
+    counter = registry.counter("fxfuel_test_total", "测试", ("a",))
+    assert registry.counter("fxfuel_test_total", "测试", ("a",)) is counter
+    with pytest.raises(ValueError):
+        registry.gauge("fxfuel_test_total", "测试", ("a",))
+
+
+def _chunk(content=None, usage=None):
+    delta = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)] if content else [], usage=usage)
+
+
+def _first_then_close(stream):
+    """读到第一个分片就停止（页面重跑、用户中止）"""
+    next(stream)
+    stream.close()
+
+
+@pytest.mark.parametrize("consume, outcome", [(list, "ok"), (_first_then_close, "cancelled")])
+def test_instrument_stream_outcomes(consume, outcome):
+    call = f"test_{outcome}"
+    consume(metrics.instrument_stream(call, iter([_chunk("你好"), _chunk("。")])))
+    assert metrics.LLM_REQUESTS.value(call=call, outcome=outcome) == 1
+    assert metrics.LLM_DURATION.count(call=call) == 1
+
+
+def test_instrument_stream_records_errors():
+    def _broken():
+        yield _chunk("你")
+        raise ConnectionError("stream reset")
+
+    with pytest.raises(ConnectionError):
+        list(metrics.instrument_stream("test_error", _broken()))
+    assert metrics.LLM_REQUESTS.value(call="test_error", outcome="error") == 1
+    assert metrics.LLM_REQUESTS.value(call="test_error", outcome="cancelled") == 0
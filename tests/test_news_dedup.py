@@ -0,0 +1,136 @@
+# tests/test_news_dedup.py - MinHash 近似重复合并与跨日新闻索引
+
+import json
+from datetime import date, timedelta
+
+from news_dedup import NewsIndex, get_news_index, merge_duplicates, minhash, similarity, title_key
+
+RRR_POLICY = {
+    "title": "中国人民银行宣布下调存款准备金率0.5个百分点",
+    "summary": "中国人民银行宣布下调金融机构存款准备金率0.5个百分点，释放长期流动性约1万亿元。",
+    "category": "POLICY",
+    "urls": ["https://example.com/pboc"],
+}
+RRR_MACRO = {
+    "title": "央行下调存款准备金率0.5个百分点 释放流动性",
+    "summary": "中国人民银行下调金融机构存款准备金率0.5个百分点，释放长期流动性约1万亿元，支持实体经济。",
+    "category": "MACRO",
+    "urls": ["https://example.com/macro", "https://example.com/pboc"],
+}
+PAYROLLS = {
+    "title": "美国9月非农就业人数大幅增加",
+    "summary": "美国劳工部公布9月非农就业人数增加25万，失业率降至4.1%，美元指数走强。",
+    "category": "MACRO",
+    "urls": ["https://example.com/nfp"],
+}
+
+
+def test_signatures_are_stable_and_estimate_similarity():
+    assert minhash(RRR_POLICY["summary"]) == minhash(RRR_POLICY["summary"])
+    assert minhash("") is None
+    assert similarity(None, minhash("美元")) == 0.0
+    same_story = similarity(minhash(RRR_POLICY["summary"]), minhash(RRR_MACRO["summary"]))
+    different = similarity(minhash(RRR_POLICY["summary"]), minhash(PAYROLLS["summary"]))
+    assert same_story >= 0.45
+    assert different < 0.2
+
+
+def test_title_key_ignores_case_and_punctuation():
+    assert title_key("Fed Holds Rates, Again!") == title_key("fed holds rates again")
+
+
+def test_merge_duplicates_across_categories():
+    merged = merge_duplicates([RRR_POLICY, PAYROLLS, RRR_MACRO])
+    assert len(merged) == 2
+    story, payrolls = merged
+    assert payrolls == PAYROLLS
+    assert story["summary"] == RRR_MACRO["summary"]            # 保留最详细的摘要
+    assert story["category"] == "POLICY/MACRO"                 # 分类按出现顺序取并集
+    assert story["urls"] == ["https://example.com/pboc", "https://example.com/macro"]
+
+
+def test_merge_limits_urls_and_leaves_distinct_news_untouched():
+    items = [dict(RRR_POLICY, urls=["u1", "u2"]), dict(RRR_MACRO, urls=["u3", "u4"])]
+    assert merge_duplicates(items, max_urls=3)[0]["urls"] == ["u1", "u2", "u3"]
+    assert merge_duplicates([RRR_POLICY, PAYROLLS]) == [RRR_POLICY, PAYROLLS]
+    assert merge_duplicates([]) == []
+
+
+def test_identical_titles_merge_even_with_different_summaries():
+    first = {"title": "Fed holds rates steady", "summary": "Powell signals patience.", "category": "MACRO"}
+    second = {"title": "Fed Holds Rates Steady!", "summary": "Treasury yields slip after decision.",
+              "category": "POLICY"}
+    assert similarity(minhash(first["summary"]), minhash(second["summary"])) < 0.45
+    merged = merge_duplicates([first, second])
+    assert len(merged) == 1
+    assert merged[0]["category"] == "MACRO/POLICY"
+
+
+# ----------------------------------------------------------------------------
+# 跨日索引
+# ----------------------------------------------------------------------------
+
+DAY = date(2026, 10, 12)
+
+
+def test_index_marks_stories_seen_on_earlier_days(tmp_path):
+    index = NewsIndex(str(tmp_path / "news_index.json"))
+    assert index.annotate([dict(RRR_POLICY)], DAY) == 0
+
+    same_day = dict(RRR_MACRO)
+    assert index.annotate([same_day], DAY) == 0               # 当天重复采集不算持续报道
+    assert "first_seen" not in same_day
+
+    next_day = [dict(RRR_MACRO), dict(PAYROLLS)]
+    assert index.annotate(next_day, DAY + timedelta(days=1)) == 1
+    assert next_day[0]["first_seen"] == DAY.isoformat()
+    assert "first_seen" not in next_day[1]
+
+
+def test_running_story_kept_past_retention_by_last_seen(tmp_path):
+    index = NewsIndex(str(tmp_path / "news_index.json"), retention_days=3)
+    for offset in range(10):
+        item = dict(RRR_POLICY)
+        index.annotate([item], DAY + timedelta(days=offset))
+    assert item["first_seen"] == DAY.isoformat()
+
+    entries = json.loads((tmp_path / "news_index.json").read_text(encoding="utf-8"))
+    assert len(entries) == 1
+    assert entries[0]["last_seen"] == (DAY + timedelta(days=9)).isoformat()
+
+
+def test_stories_not_seen_within_retention_are_pruned(tmp_path):
+    path = tmp_path / "news_index.json"
+    index = NewsIndex(str(path), retention_days=3)
+    index.annotate([dict(RRR_POLICY)], DAY)
+    item = dict(RRR_POLICY)
+    assert index.annotate([item], DAY + timedelta(days=4)) == 0    # 已移出索引，重新作为新事件
+    assert "first_seen" not in item
+    assert json.loads(path.read_text(encoding="utf-8"))[0]["first_seen"] == (DAY + timedelta(days=4)).isoformat()
+
+
+def test_entries_without_last_seen_fall_back_to_first_seen(tmp_path):
+    path = tmp_path / "news_index.json"
+    path.write_text(json.dumps([{"key": title_key(RRR_POLICY["title"]),
+                                 "signature": list(minhash(RRR_POLICY["title"] + "\n" + RRR_POLICY["summary"])),
+                                 "title": RRR_POLICY["title"], "first_seen": DAY.isoformat()}]), encoding="utf-8")
+    index = NewsIndex(str(path), retention_days=3)
+    item = dict(RRR_POLICY)
+    assert index.annotate([item], DAY + timedelta(days=2)) == 1
+    assert json.loads(path.read_text(encoding="utf-8"))[0]["last_seen"] == (DAY + timedelta(days=2)).isoformat()
+
+
+def test_index_unchanged_when_nothing_new(tmp_path):
+    path = tmp_path / "news_index.json"
+    index = NewsIndex(str(path))
+    index.annotate([dict(RRR_POLICY)], DAY)
+    mtime = path.stat().st_mtime_ns
+    index.annotate([dict(RRR_POLICY)], DAY)
+    assert path.stat().st_mtime_ns == mtime
+
+
+def test_get_news_index_reuses_instance(tmp_path):
+    index = get_news_index(str(tmp_path), retention_days=5)
+    assert get_news_index(str(tmp_path)) is index
+    assert index.retention_days == 5
+    assert index.path == str(tmp_path / "news_index.json")
@@ -0,0 +1,66 @@
+# tests/test_news_ranking.py - 新闻 TF-IDF 相关度与分类配额
+
+from collections import Counter
+
+from news_ranking import news_category, rank_news, score_documents, tokenize
+
+
+def test_tokenize_keeps_codes_and_splits_chinese_into_bigrams():
+    assert tokenize("USD/CNY 中间价") == ["usd/cny", "中间", "间价"]
+    assert tokenize("10Y 美债 收益率") == ["10y", "美债", "收益", "益率"]
+    assert tokenize("港 HIBOR") == ["hibor", "港"]
+    assert tokenize("") == []
+
+
+def test_news_category_from_title_prefix():
+    assert news_category("[POLICY] 央行降准") == "POLICY"
+    assert news_category("[POLICY/MACRO] 央行降准") == "POLICY"     # 跨分类合并按第一个分类计
+    assert news_category("无分类标题") == ""
+
+
+def test_score_prefers_documents_matching_query():
+    query = Counter(tokenize("人民币 中间价"))
+    scores = score_documents(["人民币中间价上调", "美国非农就业数据", ""], query)
+    assert scores[0] > 0
+    assert scores[1] == 0.0
+    assert scores[2] == 0.0
+
+
+def test_sublinear_tf_limits_repetition():
+    query = Counter(tokenize("中间价"))
+    once, repeated = score_documents(["中间价 美元 非农 就业", "中间价 " * 20 + "美元 非农 就业"], query)
+    assert repeated < 2 * once
+
+
+def test_indicator_news_ranked_above_unrelated():
+    titles = ["[MACRO] 某公司发布新款手机", "[CNY] 人民币兑美元中间价上调"]
+    details = ["新品发布会在上海举行", "USD/CNY 中间价报 7.1052，离岸人民币 CNH 同步走强"]
+    assert rank_news(titles, details, min_per_category=0) == [1, 0]
+
+
+def test_quota_covers_every_category_before_filling_by_score():
+    titles = [
+        "[CNY] 人民币中间价上调，USD/CNY 走强",
+        "[CNY] 离岸人民币 CNH 升值，中间价稳定",
+        "[CNY] 人民币汇率中间价连续上调",
+        "[POLICY] 地方政府发布文旅消费券",
+        "[MACRO] 某公司发布新款手机",
+    ]
+    details = ["人民币 中间价 USD/CNY"] * 3 + ["消费券发放", "新品发布会"]
+    order = rank_news(titles, details, min_per_category=1)
+    assert sorted(order) == list(range(5))
+    # 每个分类的最佳新闻先入选，低相关度的 POLICY / MACRO 也在前三位
+    assert {news_category(titles[i]) for i in order[:3]} == {"CNY", "POLICY", "MACRO"}
+    assert order[3:] == [i for i in order[3:] if news_category(titles[i]) == "CNY"]
+
+    by_score = rank_news(titles, details, min_per_category=0)
+    assert {news_category(titles[i]) for i in by_score[:3]} == {"CNY"}
+
+
+def test_ties_keep_original_order():
+    titles = ["[CNY] 甲", "[CNY] 乙", "[CNY] 丙"]
+    assert rank_news(titles, ["", "", ""], min_per_category=0) == [0, 1, 2]
+
+
+def test_missing_details_are_tolerated():
+    assert sorted(rank_news(["[CNY] 人民币中间价", "[MACRO] 美联储"], [])) == [0, 1]
@@ -0,0 +1,54 @@
+# tests/test_prefetcher.py - 预取调度：提前量、发布时间表条目、空闲跳过与重试间隔
+
+import time
+
+from cache import TTLCache
+from prefetcher import Prefetcher
+
+
+class FakeCache:
+    """entries() 返回固定条目、refresh_ahead 只记录调用的缓存替身"""
+
+    def __init__(self, entries):
+        self._entries = entries
+        self.refreshed = []
+
+    def entries(self):
+        return self._entries
+
+    def refresh_ahead(self, key):
+        self.refreshed.append(key)
+        return True
+
+
+def test_run_once_refreshes_entries_within_lead_and_skips_idle_ones():
+    cache = FakeCache([
+        ("forex_spot", 60, 5, 10),             # lead = min(30, 60 × 0.2) = 12 秒内 -> 刷新
+        ("yahoo_dxy", 60, 20, 10),             # 剩余 20 秒 > 12 -> 不刷新
+        ("news_macro", 600, 10, 7200),         # 超过 idle_seconds 没人查询 -> 不刷新
+        ("cny_mid", 3600, 10, 10),             # 按发布时间表过期：发布前不提前刷新
+        ("hibor", 3600, -1, 10),               # 已过发布时刻 -> 刷新
+    ])
+    prefetcher = Prefetcher(cache, scheduled_keys={"cny_mid", "hibor"}, idle_seconds=3600)
+    assert prefetcher.run_once() == ["forex_spot", "hibor"]
+
+
+def test_retry_interval_limits_repeated_triggers():
+    cache = FakeCache([("forex_spot", 60, 1, 0)])
+    prefetcher = Prefetcher(cache, retry_seconds=60)
+    assert prefetcher.run_once() == ["forex_spot"]
+    assert prefetcher.run_once() == []
+    assert cache.refreshed == ["forex_spot"]
+
+
+def test_refresh_ahead_replaces_value_without_blocking_readers():
+    cache = TTLCache(namespace_ttl={"forex_spot": 1})
+    values = iter(["v1", "v2"])
+    fetch = lambda: next(values)
+    assert cache.lookup("forex_spot", fetch).value == "v1"
+
+    assert Prefetcher(cache, lead_seconds=1, lead_fraction=1.0).run_once() == ["forex_spot"]
+    deadline = time.time() + 5
+    while cache.lookup("forex_spot", fetch).value != "v2" and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.lookup("forex_spot", fetch).value == "v2"
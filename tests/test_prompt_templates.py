@@ -0,0 +1,36 @@
+# tests/test_prompt_templates.py - 追问消息：同一份报告的不同问题共享逐字节相同的前缀
+
+import json
+
+from prompt_templates import get_chat_followup_messages, get_followup_messages
+
+DATA = {"report_date": "2024-06-28", "cny": {"usdcny_mid": 7.1052}, "news": ["中间价持稳"],
+        "fetch_spans": [{"key": "cny_mid", "ms": 12.3}]}
+REPORT = "## 本周外汇市场\n中间价 7.1052。"
+HISTORY = [{"role": "user", "content": "HIBOR 呢？"}, {"role": "assistant", "content": "隔夜 4.1%。"}]
+
+
+def _prefix(messages):
+    return json.dumps(messages[:3], ensure_ascii=False)
+
+
+def test_followup_prefix_is_identical_across_questions_and_history():
+    first = get_followup_messages(json.dumps(DATA, ensure_ascii=False), REPORT, "美元指数怎么看？")
+    # 取数耗时属于诊断字段，重新序列化后不同也不影响前缀
+    data = dict(DATA, fetch_spans=[{"key": "cny_mid", "ms": 99.9}])
+    second = get_followup_messages(json.dumps(data, ensure_ascii=False, indent=2), REPORT,
+                                   "港元呢？", HISTORY)
+
+    assert _prefix(first) == _prefix(second)
+    assert "fetch_spans" not in first[1]["content"]
+    assert second[3:5] == HISTORY
+    assert second[-1]["role"] == "user" and "港元呢？" in second[-1]["content"]
+
+
+def test_chat_followup_prefix_is_identical_across_questions():
+    first = get_chat_followup_messages(REPORT, "[1] 新华社", "中间价为什么持稳？")
+    second = get_chat_followup_messages(REPORT, "[1] 新华社", "下周关注什么？", HISTORY)
+
+    assert _prefix(first) == _prefix(second)
+    assert "中间价为什么持稳？" not in _prefix(first)
+    assert len(second) == len(first) + len(HISTORY)
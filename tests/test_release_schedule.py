@@ -0,0 +1,98 @@
+# tests/test_release_schedule.py - 按发布时间表计算缓存有效期（2026-10-16 为周五）
+
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from cache import TTLCache
+from config import CACHE_MAX_STALE, RELEASE_SCHEDULE
+from release_schedule import ReleaseSchedule, build_schedules, schedule_expiry
+
+SHANGHAI = ZoneInfo("Asia/Shanghai")
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def _ts(year, month, day, hour, minute, tz):
+    return datetime(year, month, day, hour, minute, tzinfo=tz).timestamp()
+
+
+@pytest.fixture
+def cny_mid():
+    return ReleaseSchedule(tz="Asia/Shanghai", release_time="09:15", poll_seconds=300)
+
+
+def test_fresh_fixing_valid_until_next_business_day_release(cny_mid):
+    stored_at = _ts(2026, 10, 16, 10, 0, SHANGHAI)
+    ttl = cny_mid.ttl(date(2026, 10, 16), stored_at)
+    assert stored_at + ttl == _ts(2026, 10, 19, 9, 15, SHANGHAI)    # 跳过周末到周一 9:15
+
+
+def test_before_release_previous_fixing_expires_at_release_time(cny_mid):
+    stored_at = _ts(2026, 10, 16, 9, 0, SHANGHAI)
+    ttl = cny_mid.ttl(date(2026, 10, 15), stored_at)
+    assert ttl == 15 * 60
+
+
+def test_lagging_value_after_release_polls(cny_mid):
+    stored_at = _ts(2026, 10, 16, 10, 0, SHANGHAI)
+    assert cny_mid.ttl(date(2026, 10, 15), stored_at) == 300
+    assert cny_mid.ttl(None, stored_at) == 300
+
+
+def test_weekend_expects_fridays_fixing(cny_mid):
+    saturday = datetime(2026, 10, 17, 12, 0, tzinfo=SHANGHAI)
+    assert cny_mid.expected_latest(saturday) == date(2026, 10, 16)
+    assert cny_mid.last_release(saturday) == datetime(2026, 10, 16, 9, 15, tzinfo=SHANGHAI)
+
+
+def test_lagged_daily_series_expects_previous_business_day():
+    us10y = ReleaseSchedule(tz="America/New_York", release_time="16:30", lag_days=1)
+    monday_evening = datetime(2026, 10, 19, 17, 0, tzinfo=NEW_YORK)
+    assert us10y.expected_latest(monday_evening) == date(2026, 10, 16)
+    monday_morning = datetime(2026, 10, 19, 9, 0, tzinfo=NEW_YORK)
+    assert us10y.expected_latest(monday_morning) == date(2026, 10, 15)
+
+
+def test_monthly_series_released_on_first_business_day():
+    ffr = ReleaseSchedule(tz="America/New_York", release_time="16:00", frequency="monthly")
+    at = datetime(2026, 10, 15, 12, 0, tzinfo=NEW_YORK)
+    assert ffr.expected_latest(at) == date(2026, 9, 1)
+    # 11 月 1 日是周日，下一次发布顺延到周一
+    assert ffr.next_release(at) == datetime(2026, 11, 2, 16, 0, tzinfo=NEW_YORK)
+    stored_at = at.timestamp()
+    assert stored_at + ffr.ttl(date(2026, 9, 1), stored_at) == ffr.next_release(at).timestamp()
+
+
+def test_unknown_frequency_rejected():
+    with pytest.raises(ValueError):
+        ReleaseSchedule(tz="Asia/Shanghai", release_time="09:15", frequency="weekly")
+
+
+def test_schedule_expiry_falls_back_to_polling_on_bad_values(cny_mid):
+    ttl = schedule_expiry(cny_mid, lambda value: value["date"])
+    stored_at = _ts(2026, 10, 16, 10, 0, SHANGHAI)
+    assert ttl(None, stored_at) == 300
+    assert ttl({"no_date": 1}, stored_at) == 300
+    assert ttl({"date": date(2026, 10, 16)}, stored_at) > 2 * 86400
+
+
+def test_cached_fixing_expires_once_release_time_passes(cny_mid):
+    cache = TTLCache(namespace_ttl={"cny_mid": 3600})
+    ttl = schedule_expiry(cny_mid, lambda value: value)
+    # 周四定盘在周五 9:15 之后不再有效，即使固定 TTL 或过期后台刷新会认为它仍可用
+    cache.set("cny_mid", date(2026, 10, 15), ttl, stored_at=_ts(2026, 10, 15, 10, 0, SHANGHAI))
+    result = cache.lookup("cny_mid", lambda: date(2026, 10, 16), ttl)
+    assert (result.value, result.status) == (date(2026, 10, 16), "miss")
+
+
+def test_configured_schedules_build():
+    schedules = build_schedules(RELEASE_SCHEDULE)
+    assert set(schedules) == set(RELEASE_SCHEDULE)
+    assert schedules["fred_ffr"].frequency == "monthly"
+
+
+def test_scheduled_keys_never_served_stale():
+    cache = TTLCache(max_stale=CACHE_MAX_STALE)
+    for key in RELEASE_SCHEDULE:
+        assert cache.max_stale_for(key) == 0, key
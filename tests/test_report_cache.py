@@ -0,0 +1,104 @@
+# tests/test_report_cache.py - 报告指纹与报告缓存
+
+import json
+import os
+import time
+
+import pytest
+
+from report_cache import SCHEMA_VERSION, ReportCache, report_fingerprint, stable_report_data
+
+PROMPTS = {"system": "你是外汇分析师", "user": "数据：{}"}
+CONFIG = {"temperature": 0.3, "max_tokens": 4000, "top_p": 1.0, "stream": True}
+
+
+def test_fingerprint_depends_on_prompts_model_and_generation_params():
+    base = report_fingerprint(PROMPTS, "deepseek-chat", CONFIG)
+    assert base == report_fingerprint(dict(PROMPTS), "deepseek-chat", dict(CONFIG))
+    assert base != report_fingerprint({**PROMPTS, "user": "数据：{1}"}, "deepseek-chat", CONFIG)
+    assert base != report_fingerprint(PROMPTS, "deepseek-reasoner", CONFIG)
+    assert base != report_fingerprint(PROMPTS, "deepseek-chat", {**CONFIG, "temperature": 0.7})
+    # 不影响输出的配置项不参与指纹
+    assert base == report_fingerprint(PROMPTS, "deepseek-chat", {**CONFIG, "stream": False})
+
+
+def test_stable_report_data_drops_collection_details():
+    data = {
+        "snapshot": "2026-10-16 10:00:00",
+        "report_date": "2026-10-16",
+        "cny": {"usdcny_mid": 7.1052},
+        "data_sources": {"dxy": "Yahoo(ICE)（缓存数据，42秒前，后台刷新中）", "usdhkd": "东方财富"},
+        "fetch_spans": [{"key": "yahoo_DX-Y.NYB", "duration_ms": 12.5}],
+        "errors": ["港元(Yahoo: timeout)"],
+    }
+    stable = stable_report_data(data)
+    assert stable == {
+        "report_date": "2026-10-16",
+        "cny": {"usdcny_mid": 7.1052},
+        "data_sources": {"dxy": "Yahoo(ICE)", "usdhkd": "东方财富"},
+    }
+    assert data["data_sources"]["dxy"].endswith("后台刷新中）")      # 不修改原数据
+
+
+def _collect(snapshot, usdcny_mid=7.1052, dxy_source="Yahoo(ICE)"):
+    """按 retrieve_all_data 的收尾步骤构建一次采集结果（数值 + 来源标注 + 快照存储的历史摘要）"""
+    from data_retriever import DataContext, record_snapshot
+    ctx = DataContext()
+    ctx.snapshot = snapshot
+    ctx.cny["usdcny_mid"] = usdcny_mid
+    ctx.global_fx["dxy"] = 99.12
+    ctx.data_sources["dxy"] = dxy_source
+    ctx.add_span("yahoo_DX-Y.NYB", "hit", ctx._started, 0)
+    record_snapshot(ctx)
+    return ctx
+
+
+def test_same_market_data_from_different_collections_shares_fingerprint(tmp_path, monkeypatch):
+    import report_generator
+    from snapshot_store import get_snapshot_store
+    monkeypatch.setitem(report_generator.STORAGE_CONFIG, "data_dir", str(tmp_path))
+    monkeypatch.setitem(report_generator.REPORT_CACHE_CONFIG, "enabled", True)
+    # 之前已有一次不同数值的快照，历史摘要中包含 28 天区间
+    get_snapshot_store(str(tmp_path)).append({"usdcny_mid": 7.1200, "dxy": 99.50}, time.time() - 86400)
+
+    first = _collect("2026-10-16 10:00:00")
+    second = _collect("2026-10-16 10:05:00", dxy_source="Yahoo(ICE)（缓存数据，42秒前，后台刷新中）")
+    assert first.history and first.history == second.history
+
+    fingerprint, entry = report_generator.lookup_cached_report(first.to_json())
+    assert entry is None
+    report_generator.store_cached_report(fingerprint, "# 周报", {"passed": True})
+
+    again, entry = report_generator.lookup_cached_report(second.to_json())
+    assert again == fingerprint
+    assert entry["report"] == "# 周报"
+    assert report_generator.lookup_cached_report(second.to_json(), regenerate=True)[1] is None
+
+    changed = _collect("2026-10-16 10:10:00", usdcny_mid=7.1100)
+    assert report_generator.lookup_cached_report(changed.to_json())[0] != fingerprint
+
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    assert cache.get("missing") is None
+    cache.put("abc", "# 周报", {"passed": True}, "deepseek-chat")
+    entry = cache.get("abc")
+    assert (entry["report"], entry["validation"], entry["model"]) == ("# 周报", {"passed": True}, "deepseek-chat")
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+@pytest.mark.parametrize("content", ["{not json", json.dumps({"schema": -1, "report": "x"}),
+                                     json.dumps({"schema": SCHEMA_VERSION, "report": ""})])
+def test_corrupt_or_outdated_entries_are_misses(tmp_path, content):
+    (tmp_path / "abc.json").write_text(content, encoding="utf-8")
+    assert ReportCache(str(tmp_path)).get("abc") is None
+
+
+def test_prune_keeps_newest_entries(tmp_path):
+    cache = ReportCache(str(tmp_path), max_entries=2)
+    for i, fingerprint in enumerate(("a", "b", "c")):
+        cache.put(fingerprint, f"报告{fingerprint}", None, "deepseek-chat")
+        past = time.time() - 100 + i
+        os.utime(tmp_path / f"{fingerprint}.json", (past, past))
+    cache.put("d", "报告d", None, "deepseek-chat")
+    assert sorted(os.listdir(tmp_path)) == ["c.json", "d.json"]
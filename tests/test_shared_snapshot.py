@@ -0,0 +1,123 @@
+# tests/test_shared_snapshot.py - 共享快照：版本、单飞采集与深度冻结
+
+import json
+import threading
+import time
+
+import pytest
+
+from shared_snapshot import SharedSnapshot, freeze, thaw
+
+
+def _collector(results):
+    calls = []
+
+    def collect(progress_callback=None):
+        calls.append(1)
+        return results[min(len(calls), len(results)) - 1]
+    return collect, calls
+
+
+def test_freeze_is_deep_and_detached():
+    source = {"NEWS": ["a"], "HISTORY": {"usdcny": {"range": [7.1, 7.2]}}, "FETCH_SPANS": [{"key": "x"}]}
+    frozen = freeze(source)
+    source["NEWS"].append("b")
+    source["HISTORY"]["usdcny"]["range"][0] = 0
+
+    assert frozen["NEWS"] == ("a",)
+    assert frozen["HISTORY"]["usdcny"]["range"] == (7.1, 7.2)
+    with pytest.raises(TypeError):
+        frozen["FETCH_SPANS"][0]["key"] = "y"
+    with pytest.raises(TypeError):
+        frozen["HISTORY"]["usdcny"]["new"] = 1
+    with pytest.raises(AttributeError):
+        frozen["NEWS"].append("c")
+
+
+def test_thaw_restores_plain_json_structures():
+    source = {"NEWS": ["a"], "HISTORY": {"usdcny": {"range": [7.1, 7.2]}}, "DXY": 99.1}
+    thawed = thaw(freeze(source))
+    assert thawed == source
+    assert json.loads(json.dumps(thawed)) == source
+
+
+def test_get_serves_current_epoch_until_max_age():
+    collect, calls = _collector([{"DXY": 99.0}, {"DXY": 100.0}])
+    snapshot = SharedSnapshot(collect, max_age=300)
+    first = snapshot.get()
+    assert snapshot.get() is first
+    assert first.version == 1 and len(calls) == 1
+
+    snapshot.max_age = 0
+    second = snapshot.get()
+    assert (second.version, second.data["DXY"]) == (2, 100.0)
+
+
+def test_refresh_returns_newer_version_without_collecting():
+    collect, calls = _collector([{"v": 1}, {"v": 2}])
+    snapshot = SharedSnapshot(collect)
+    epoch = snapshot.refresh(0)
+    assert snapshot.refresh(0) is epoch          # 调用方看到的版本已过时：直接返回最新版本
+    assert snapshot.refresh(epoch.version).version == 2
+    assert len(calls) == 2
+
+
+def test_concurrent_refreshes_collect_once():
+    release = threading.Event()
+    calls = []
+
+    def collect(progress_callback=None):
+        calls.append(1)
+        release.wait(5)
+        return {"v": 1}
+
+    snapshot = SharedSnapshot(collect)
+    epochs = []
+    threads = [threading.Thread(target=lambda: epochs.append(snapshot.refresh(0))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while snapshot.stats()["coalesced"] < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len({id(epoch) for epoch in epochs}) == 1
+
+
+def test_failed_collection_keeps_current_epoch():
+    outcomes = [{"v": 1}, RuntimeError("upstream down")]
+
+    def collect(progress_callback=None):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    snapshot = SharedSnapshot(collect)
+    epoch = snapshot.refresh(0)
+    with pytest.raises(RuntimeError):
+        snapshot.refresh(epoch.version)
+    assert snapshot.current() is epoch
+    assert snapshot.stats()["errors"] == 1
+
+
+def test_get_shared_snapshot_warns_when_later_arguments_differ(monkeypatch, capsys):
+    import shared_snapshot
+
+    monkeypatch.setattr(shared_snapshot, "_shared", None)
+    monkeypatch.setattr("metrics.bind_shared_snapshot", lambda stats: None)
+
+    def collect(progress_callback=None):
+        return {}
+    first = shared_snapshot.get_shared_snapshot(collect, 300)
+
+    def collect(progress_callback=None):   # 模拟 Streamlit 重新执行脚本：同名函数的新对象
+        return {}
+    assert shared_snapshot.get_shared_snapshot(collect, 300) is first
+    assert capsys.readouterr().out == ""
+
+    assert shared_snapshot.get_shared_snapshot(collect, 60) is first
+    assert "max_age=60" in capsys.readouterr().out
+    assert first.max_age == 300
@@ -0,0 +1,62 @@
+# tests/test_snapshot_store.py - 采集快照时间序列：去重追加、周环比与区间高低点
+
+import time
+
+from snapshot_store import SnapshotStore
+
+DAY = 86400
+
+
+def _store(tmp_path):
+    return SnapshotStore(str(tmp_path / "snapshots.bin"))
+
+
+def test_append_ignores_non_numeric_and_unknown_indicators(tmp_path):
+    store = _store(tmp_path)
+    written = store.append({"usdcny_mid": 7.1, "dxy": None, "lers_position": "中间区间",
+                            "unknown": 1.0, "usdhkd": True})
+    assert written == 1
+    assert store.series("usdcny_mid").tolist() == [7.1]
+
+
+def test_identical_snapshot_is_not_appended_again(tmp_path):
+    store = _store(tmp_path)
+    now = time.time()
+    assert store.append({"usdcny_mid": 7.1, "dxy": 99.0}, now - 20) == 2
+    assert store.append({"usdcny_mid": 7.1, "dxy": 99.0}, now - 10) == 0     # 全部来自缓存的重复采集
+    assert store.append({"usdcny_mid": 7.1}, now - 5) == 1                   # 指标集合不同仍写入
+    assert store.append({"usdcny_mid": 7.2}, now) == 1
+    assert store.series("usdcny_mid").tolist() == [7.1, 7.1, 7.2]
+    assert store.series("dxy").tolist() == [99.0]
+
+
+def test_week_over_week_uses_last_snapshot_a_week_ago(tmp_path):
+    store = _store(tmp_path)
+    now = time.time()
+    store.append({"usdcny_mid": 7.0}, now - 9 * DAY)
+    store.append({"usdcny_mid": 7.1}, now - 8 * DAY)
+    store.append({"usdcny_mid": 7.2}, now - 1 * DAY)
+    assert store.week_over_week("usdcny_mid", now) == {
+        "latest": 7.2, "week_ago": 7.1, "change": 0.1, "change_pct": 1.41}
+    assert store.week_over_week("dxy", now) is None
+
+
+def test_summary_is_stable_across_repeated_collections(tmp_path):
+    store = _store(tmp_path)
+    now = time.time()
+    store.append({"usdcny_mid": 7.15}, now - 3 * DAY)
+    store.append({"usdcny_mid": 7.10}, now - 2 * DAY)
+    store.append({"usdcny_mid": 7.12}, now - 60)
+    first = store.summary()
+    store.append({"usdcny_mid": 7.12})                   # 重复采集：不追加
+    assert store.summary() == first
+
+    usdcny = first["usdcny_mid"]["28d_range"]
+    assert (usdcny["high"], usdcny["low"]) == (7.15, 7.1)
+    assert "samples" not in usdcny
+
+
+def test_single_sample_has_no_range(tmp_path):
+    store = _store(tmp_path)
+    store.append({"dxy": 99.0})
+    assert store.summary() == {}
@@ -0,0 +1,110 @@
+# tests/test_token_counter.py - 离线 Token 计数与数据 JSON 的预算分配
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import prompt_templates
+import token_counter
+from token_counter import count_tokens, estimate_tokens
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def heuristic(monkeypatch):
+    """未配置 tokenizer：按字符类别估算"""
+    monkeypatch.setitem(token_counter.TOKEN_CONFIG, "tokenizer_path", None)
+    monkeypatch.setattr(token_counter, "_tokenizer", None)
+    monkeypatch.setattr(token_counter, "_tokenizer_loaded", False)
+    token_counter._count_cached.cache_clear()
+    yield
+    token_counter._count_cached.cache_clear()
+
+
+def test_estimate_by_character_class():
+    assert estimate_tokens("人民币") == 2             # 3 × 0.6
+    assert estimate_tokens("USD") == 1                # 单词至少 1 个
+    assert estimate_tokens("depreciation") == 4       # 12 × 0.3
+    assert estimate_tokens("7.1052") == 4             # 7 / . / 105 / 2
+    assert estimate_tokens('{\n  "a": 1}') == 8       # { 换行缩进 " a " : 1 }（空格不计）
+    assert estimate_tokens("") == 0
+
+
+def test_import_does_not_load_tokenizer():
+    code = "import sys, token_counter; print('tokenizers' in sys.modules, token_counter._tokenizer_loaded)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.split() == ["False", "False"]
+
+
+def test_missing_tokenizer_file_falls_back_to_heuristic(heuristic, monkeypatch, tmp_path):
+    monkeypatch.setitem(token_counter.TOKEN_CONFIG, "tokenizer_path", str(tmp_path / "tokenizer.json"))
+    assert count_tokens("美元指数 DXY 99.1") == estimate_tokens("美元指数 DXY 99.1")
+    assert token_counter._tokenizer_loaded
+    assert token_counter.BACKEND == "heuristic"
+
+
+def test_local_tokenizer_used_when_available(heuristic, monkeypatch):
+    class _Encoding:
+        def __init__(self, ids):
+            self.ids = ids
+
+    class _Tokenizer:
+        def encode(self, text, add_special_tokens=True):
+            return _Encoding(list(text))
+
+    loads = []
+    monkeypatch.setattr(token_counter, "_load_tokenizer", lambda: loads.append(1) or _Tokenizer())
+    assert count_tokens("港元汇率") == 4
+    assert count_tokens("HIBOR") == 5
+    assert len(loads) == 1                            # 只在首次计数时加载一次
+    assert token_counter.BACKEND == "deepseek-tokenizer"
+
+
+def test_count_tokens_caches_short_texts_only(heuristic):
+    assert count_tokens(None) == 0
+    count_tokens("短文本")
+    count_tokens("短文本")
+    assert token_counter._count_cached.cache_info().hits == 1
+    count_tokens("长" * (token_counter.CACHE_MAX_CHARS + 1))
+    assert token_counter._count_cached.cache_info().currsize == 1
+
+
+# ----------------------------------------------------------------------------
+# _allocate_budget：核心数据始终保留，新闻按排序逐条填充
+# ----------------------------------------------------------------------------
+
+def _data(news_count):
+    return {
+        "cny": {"usdcny_mid": 7.1052},
+        "macro": {"us10y": 4.1},
+        "news": [f"[CNY] 人民币中间价第{i}条" for i in range(news_count)],
+        "news_detail": [f"人民币中间价与美元指数走势分析{i}" * 5 for i in range(news_count)],
+        "news_sources": [[f"https://example.com/{i}"] for i in range(news_count)],
+    }
+
+
+def test_budget_keeps_everything_when_it_fits(heuristic, monkeypatch):
+    monkeypatch.setitem(prompt_templates.TOKEN_CONFIG, "max_context_tokens", 100000)
+    data = _data(5)
+    assert prompt_templates._allocate_budget(data) is data
+
+
+def test_budget_trims_news_and_keeps_lists_aligned(heuristic, monkeypatch):
+    data = _data(20)
+    core_only = estimate_tokens(prompt_templates._dump({**data, "news": [], "news_detail": [], "news_sources": []}))
+    budget = core_only + 300
+    monkeypatch.setitem(prompt_templates.TOKEN_CONFIG, "max_context_tokens", budget)
+
+    result = prompt_templates._allocate_budget(data)
+    kept = len(result["news"])
+    assert 0 < kept < 20
+    assert len(result["news_detail"]) == len(result["news_sources"]) == kept
+    for title, detail in zip(result["news"], result["news_detail"]):
+        index = data["news"].index(title)
+        assert data["news_detail"][index] == detail
+    assert result["cny"] == data["cny"] and result["macro"] == data["macro"]
+    assert result["_token_note"] == f"新闻按相关度保留{kept}/20条以控制Token"
+    assert estimate_tokens(prompt_templates._dump(result)) <= budget
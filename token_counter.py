@@ -0,0 +1,105 @@
+# token_counter.py - 离线 Token 计数（本地有 DeepSeek tokenizer 时精确计数，否则按字符类别估算），带 LRU 缓存
+
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Optional
+
+from config import TOKEN_CONFIG
+
+
+# 无 tokenizer 时的估算系数（DeepSeek 官方换算：1 个中文字符 ≈ 0.6 token，1 个英文字符 ≈ 0.3 token）
+CJK_TOKENS_PER_CHAR = 0.6
+LATIN_TOKENS_PER_CHAR = 0.3
+DIGITS_PER_TOKEN = 3          # 数字按 1~3 位一组切分
+# JSON 标点（引号、冒号、括号等）大多单独成 token；换行 + 缩进算一个
+_TOKEN_PATTERN = re.compile(
+    r"(?P<cjk>[　-〿㐀-䶿一-鿿＀-￯]+)"
+    r"|(?P<latin>[A-Za-z]+)"
+    r"|(?P<digits>\d+)"
+    r"|(?P<newline>\n[ \t]*)"
+    r"|(?P<space>[ \t]+)"
+    r"|(?P<other>.)",
+    re.DOTALL,
+)
+
+
+_tokenizer: Any = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+BACKEND = "heuristic"
+
+
+def _load_tokenizer() -> Any:
+    """
+    加载本地的 DeepSeek tokenizer.json（TOKEN_CONFIG["tokenizer_path"]，需安装 tokenizers）
+
+    只读取磁盘上已有的文件，从不联网下载；未配置、文件不存在或 tokenizers 未安装时返回 None，改用估算。
+    """
+    path = TOKEN_CONFIG.get("tokenizer_path")
+    if not path or not os.path.isfile(path):
+        return None
+    try:
+        from tokenizers import Tokenizer
+        return Tokenizer.from_file(path)
+    except Exception as e:
+        print(f"⚠️ 无法加载 tokenizer {path}，改用估算: {e}")
+        return None
+
+
+def _get_tokenizer() -> Any:
+    """首次计数时才加载（导入本模块不读文件、不导入 tokenizers）"""
+    global _tokenizer, _tokenizer_loaded, BACKEND
+    if not _tokenizer_loaded:
+        with _tokenizer_lock:
+            if not _tokenizer_loaded:
+                _tokenizer = _load_tokenizer()
+                BACKEND = "deepseek-tokenizer" if _tokenizer is not None else "heuristic"
+                _tokenizer_loaded = True
+    return _tokenizer
+
+
+def estimate_tokens(text: str) -> int:
+    """按字符类别估算 Token 数（中文 / 英文单词 / 数字 / JSON 标点分别计算）"""
+    total = 0.0
+    for match in _TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        length = match.end() - match.start()
+        if kind == "cjk":
+            total += length * CJK_TOKENS_PER_CHAR
+        elif kind == "latin":
+            total += max(1.0, length * LATIN_TOKENS_PER_CHAR)
+        elif kind == "digits":
+            total += -(-length // DIGITS_PER_TOKEN)
+        elif kind in ("newline", "other"):
+            total += 1
+        # 单词之间的空格并入下一个单词，不单独计数
+    return int(round(total))
+
+
+# 超过该长度的文本（整份数据 JSON 等）每次都不同，不进入缓存，避免大字符串长期占用内存
+CACHE_MAX_CHARS = 8192
+
+
+def _count(text: str) -> int:
+    tokenizer = _get_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    return estimate_tokens(text)
+
+
+_count_cached = lru_cache(maxsize=TOKEN_CONFIG.get("count_cache_size", 4096))(_count)
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """
+    文本的 Token 数
+
+    新闻摘要、报告、追问历史在多次组装提示词时会被反复计数，不超过 CACHE_MAX_CHARS 的文本按内容缓存结果。
+    """
+    if not text:
+        return 0
+    if len(text) > CACHE_MAX_CHARS:
+        return _count(text)
+    return _count_cached(text)